@@ -0,0 +1,371 @@
+"""
+回测流程基准测试
+
+用确定性的合成K线和进程内的MongoDB替代品(mongomock)离线测量各环节的
+吞吐(bars/s)、单根K线耗时与峰值内存，结果可保存为基准JSON，
+之后的运行与基准对比，超过阈值的退化会被标出并以非零状态码退出。
+
+用法:
+    python -m benchmarks.bench
+    python -m benchmarks.bench --sizes 10000,100000,1000000,5000000 --stages replay,indicators
+    python -m benchmarks.bench --save-baseline
+"""
+import argparse
+import contextlib
+import io
+import json
+import logging
+import multiprocessing
+import platform
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import numpy as np
+
+try:
+    import resource
+except ImportError:
+    # Windows 没有 resource 模块，峰值内存改由 GetProcessMemoryInfo 获取
+    resource = None
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+SYMBOL = "BTCUSDT"
+START = datetime(2024, 1, 1)
+SETTING = {"fast_window": 5, "slow_window": 10, "rsi_window": 6, "rsi_entry": 40}
+
+
+def get_peak_rss_mb() -> float:
+    """当前进程的峰值常驻内存(MB)，Windows 下为峰值工作集"""
+    if resource is None:
+        return get_peak_working_set() / 2 ** 20
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以KB为单位，macOS 以字节为单位
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def get_peak_working_set() -> int:
+    """Windows 下当前进程的峰值工作集(字节)"""
+    import ctypes
+    from ctypes import wintypes
+
+    class ProcessMemoryCounters(ctypes.Structure):
+        _fields_ = [
+            ("cb", wintypes.DWORD),
+            ("PageFaultCount", wintypes.DWORD),
+            ("PeakWorkingSetSize", ctypes.c_size_t),
+            ("WorkingSetSize", ctypes.c_size_t),
+            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t),
+            ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+            ("PagefileUsage", ctypes.c_size_t),
+            ("PeakPagefileUsage", ctypes.c_size_t),
+        ]
+
+    counters = ProcessMemoryCounters()
+    counters.cb = ctypes.sizeof(counters)
+    process = ctypes.windll.kernel32.GetCurrentProcess()
+    if not ctypes.windll.psapi.GetProcessMemoryInfo(process, ctypes.byref(counters), counters.cb):
+        raise ctypes.WinError()
+    return counters.PeakWorkingSetSize
+
+
+def get_mock_collection():
+    """进程内的MongoDB集合替代品"""
+    try:
+        import mongomock
+    except ImportError:
+        raise ImportError("基准测试需要 mongomock: pip install mongomock")
+    return mongomock.MongoClient().crypto_trading.market_data
+
+
+def make_engine(**kwargs):
+    """创建不输出常规日志的回测引擎"""
+    from src.backtest.backtest_engine import BacktestEngine
+    return BacktestEngine(log_levels={"engine": logging.WARNING}, quiet=True, log_to_file=False, **kwargs)
+
+
+def write_store(size: int, work_dir: str) -> datetime:
+    """生成合成K线写入本地存储，返回结束时间"""
+    from src.data.bar_store import BarStore
+    from src.data.synthetic import generate_bars
+
+    BarStore(work_dir).save(SYMBOL, "1m", BarStore.dataframe_to_columns(generate_bars(size, START)))
+    return START + timedelta(minutes=size)
+
+
+def bench_save_to_database(size: int, work_dir: str) -> Dict:
+    """
+    DataFetcher.save_to_database 写入空集合
+
+    mongomock 的唯一索引在每次插入时线性扫描，测得的是替代品本身的开销，这里跳过建索引；
+    写入空集合时不会触发重复键分支，测量的代码路径不变。
+    """
+    from src.data.data_fetcher import DataFetcher
+    from src.data.synthetic import generate_bars
+
+    df = generate_bars(size, START)
+    with contextlib.redirect_stdout(io.StringIO()):
+        fetcher = DataFetcher(exchange=object())
+    fetcher.collection = get_mock_collection()
+    fetcher.indexes_ready = True
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        counts = fetcher.save_to_database(df, SYMBOL, "1m")
+    return {"seconds": time.perf_counter() - start, "inserted": counts["inserted"]}
+
+
+def bench_load_mongo(size: int, work_dir: str) -> Dict:
+    """BacktestEngine.load_bar_data 从MongoDB读取"""
+    from src.data.synthetic import generate_bars
+
+    df = generate_bars(size, START)
+    df["symbol"] = SYMBOL
+    df["interval"] = "1m"
+    df["datetime"] = df["datetime"].dt.to_pydatetime()
+    collection = get_mock_collection()
+    collection.insert_many(df.to_dict("records"))
+
+    engine = make_engine()
+    engine.collection = collection
+
+    start = time.perf_counter()
+    bars = engine.load_bar_data(SYMBOL, START, START + timedelta(minutes=size))
+    return {"seconds": time.perf_counter() - start, "bars": len(bars)}
+
+
+def bench_load_store(size: int, work_dir: str) -> Dict:
+    """BacktestEngine.load_bar_data 从本地存储读取，并逐根遍历"""
+    end = write_store(size, work_dir)
+    engine = make_engine(data_source="store", store_path=work_dir)
+
+    start = time.perf_counter()
+    bars = engine.load_bar_data(SYMBOL, START, end)
+    for _ in bars:
+        pass
+    return {"seconds": time.perf_counter() - start, "bars": len(bars)}
+
+
+def bench_replay(size: int, work_dir: str) -> Dict:
+    """事件驱动回放(engine.new_bar + 策略 on_bar)，单独统计 on_bar 耗时"""
+    from src.strategies.trading_strategy import HighFrequencyStrategy
+
+    class TimedStrategy(HighFrequencyStrategy):
+        on_bar_ns = 0
+
+        def on_bar(self, bar):
+            start = time.perf_counter_ns()
+            super().on_bar(bar)
+            TimedStrategy.on_bar_ns += time.perf_counter_ns() - start
+
+    end = write_store(size, work_dir)
+    engine = make_engine(data_source="store", store_path=work_dir)
+    bars = engine.load_bar_data(SYMBOL, START, end)
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        engine.run_backtest(TimedStrategy, SETTING, SYMBOL, START, end, bars=bars)
+    return {
+        "seconds": time.perf_counter() - start,
+        "on_bar_seconds": TimedStrategy.on_bar_ns / 1e9,
+        "trades": len(engine.engine.get_all_trades()),
+    }
+
+
+def bench_indicators(size: int, work_dir: str) -> Dict:
+    """策略 on_bar 中的增量指标更新与计算"""
+    from src.data.bar_array import BarArray
+    from src.data.bar_store import BarStore
+    from src.data.synthetic import generate_bars
+    from src.strategies.indicators import IncrementalArrayManager
+
+    bars = BarArray.from_columns(SYMBOL, BarStore.dataframe_to_columns(generate_bars(size, START)))
+    bars = list(bars)
+    am = IncrementalArrayManager(100)
+
+    start = time.perf_counter()
+    for bar in bars:
+        am.update_bar(bar)
+        if am.inited:
+            am.sma(SETTING["fast_window"])
+            am.sma(SETTING["slow_window"])
+            am.rsi(SETTING["rsi_window"])
+    return {"seconds": time.perf_counter() - start}
+
+
+def bench_vectorized(size: int, work_dir: str) -> Dict:
+    """向量化回测(信号、撮合与统计)"""
+    from src.backtest.vectorized import VectorizedBacktester
+    from src.data.bar_store import BarStore
+    from src.data.synthetic import generate_bars
+
+    data = BarStore.dataframe_to_columns(generate_bars(size, START))
+    backtester = VectorizedBacktester()
+
+    start = time.perf_counter()
+    result = backtester.run(data, SETTING)
+    return {"seconds": time.perf_counter() - start, "trades": len(result.trades)}
+
+
+def bench_statistics(size: int, work_dir: str) -> Dict:
+    """calculate_statistics 在给定成交上计算全部统计指标"""
+    from src.backtest.statistics import calculate_statistics
+    from src.backtest.vectorized import VectorizedBacktester
+    from src.data.bar_store import BarStore
+    from src.data.synthetic import generate_bars
+    from vnpy.trader.constant import Direction
+
+    data = BarStore.dataframe_to_columns(generate_bars(size, START))
+    trades = VectorizedBacktester().run(data, SETTING).trades
+    index = np.searchsorted(data["datetime"], trades["datetime"].to_numpy(dtype="datetime64[ns]").astype(np.int64))
+    volume = np.where(trades["direction"] == Direction.LONG, 1.0, -1.0) * trades["volume"].to_numpy()
+
+    start = time.perf_counter()
+    calculate_statistics(data["datetime"], data["close"], index, trades["price"].to_numpy(), volume, 1_000_000, 0.001)
+    return {"seconds": time.perf_counter() - start, "trades": len(trades)}
+
+
+# 各环节及是否依赖MongoDB替代品(规模受 --db-bars 限制)
+STAGES: Dict[str, Callable] = {
+    "save_to_database": bench_save_to_database,
+    "load_mongo": bench_load_mongo,
+    "load_store": bench_load_store,
+    "replay": bench_replay,
+    "indicators": bench_indicators,
+    "vectorized": bench_vectorized,
+    "statistics": bench_statistics,
+}
+DB_STAGES = ("save_to_database", "load_mongo")
+
+
+def run_case(stage: str, size: int) -> Dict:
+    """在独立进程中运行一个环节，峰值内存互不影响"""
+    with tempfile.TemporaryDirectory() as work_dir:
+        result = STAGES[stage](size, work_dir)
+
+    seconds = result.pop("seconds")
+    return {
+        "stage": stage,
+        "size": size,
+        "seconds": seconds,
+        "bars_per_sec": size / seconds if seconds > 0 else float("inf"),
+        "us_per_bar": seconds / size * 1e6,
+        "peak_rss_mb": get_peak_rss_mb(),
+        **result
+    }
+
+
+def run_benchmarks(stages: List[str], sizes: List[int], db_bars: int) -> List[Dict]:
+    """依次运行各环节与规模，每个组合使用新的子进程"""
+    results = []
+    context = multiprocessing.get_context("spawn")
+
+    for stage in stages:
+        stage_sizes = sorted({min(size, db_bars) for size in sizes}) if stage in DB_STAGES else sizes
+        for size in stage_sizes:
+            with ProcessPoolExecutor(1, mp_context=context) as executor:
+                result = executor.submit(run_case, stage, size).result()
+            results.append(result)
+            print(
+                f"{stage:<18}{size:>10,}  {result['seconds']:>9.3f}s  "
+                f"{result['bars_per_sec']:>14,.0f} bars/s  {result['us_per_bar']:>8.2f} us/bar  "
+                f"峰值内存 {result['peak_rss_mb']:>8.1f}MB"
+            )
+    return results
+
+
+def get_baseline_path(name: str) -> Path:
+    return BASELINE_DIR / f"{name}.json"
+
+
+def save_baseline(results: List[Dict], name: str) -> Path:
+    """保存基准结果"""
+    path = get_baseline_path(name)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    data = {
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=4, ensure_ascii=False)
+    return path
+
+
+def compare_with_baseline(results: List[Dict], name: str, threshold: float) -> List[str]:
+    """
+    与基准对比，返回退化描述列表
+
+    吞吐低于基准 (1 - threshold) 倍或峰值内存高于基准 (1 + threshold) 倍视为退化。
+    """
+    path = get_baseline_path(name)
+    if not path.exists():
+        print(f"没有找到基准文件: {path}")
+        return []
+
+    with open(path, "r", encoding="utf-8") as f:
+        baseline = {(r["stage"], r["size"]): r for r in json.load(f)["results"]}
+
+    regressions = []
+    for result in results:
+        base = baseline.get((result["stage"], result["size"]))
+        if not base:
+            continue
+
+        case = f"{result['stage']} {result['size']:,}"
+        if result["bars_per_sec"] < base["bars_per_sec"] * (1 - threshold):
+            regressions.append(
+                f"{case}: 吞吐 {result['bars_per_sec']:,.0f} bars/s，基准 {base['bars_per_sec']:,.0f} bars/s"
+            )
+        if result["peak_rss_mb"] > base["peak_rss_mb"] * (1 + threshold):
+            regressions.append(
+                f"{case}: 峰值内存 {result['peak_rss_mb']:.1f}MB，基准 {base['peak_rss_mb']:.1f}MB"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="回测流程基准测试")
+    parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                        help="K线数量，逗号分隔，如 10000,100000,1000000,5000000")
+    parser.add_argument("--stages", default=",".join(STAGES), help=f"测试环节，可选: {','.join(STAGES)}")
+    parser.add_argument("--db-bars", type=int, default=100_000,
+                        help="MongoDB相关环节的最大K线数量(mongomock写入和查询较慢)")
+    parser.add_argument("--baseline", default="default", help="基准名称")
+    parser.add_argument("--save-baseline", action="store_true", help="将本次结果保存为基准")
+    parser.add_argument("--threshold", type=float, default=0.2, help="判定退化的相对阈值")
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    stages = args.stages.split(",")
+    for stage in stages:
+        if stage not in STAGES:
+            parser.error(f"未知的测试环节: {stage}")
+
+    results = run_benchmarks(stages, sizes, args.db_bars)
+
+    if args.save_baseline:
+        path = save_baseline(results, args.baseline)
+        print(f"\n基准已保存: {path}")
+        return
+
+    regressions = compare_with_baseline(results, args.baseline, args.threshold)
+    if regressions:
+        print(f"\n发现 {len(regressions)} 项性能退化(阈值 {args.threshold:.0%}):")
+        for regression in regressions:
+            print(f"  {regression}")
+        sys.exit(1)
+    print("\n未发现性能退化")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,41 @@
+import argparse
 from datetime import datetime
 from src.data.data_fetcher import DataFetcher
+from src.data.sync import IncrementalSync
+from src.utils.log import setup_logging
 import pandas as pd
 
+def sync(args):
+    """增量同步：只下载数据库中缺失的K线，可定时运行"""
+    fetcher = DataFetcher()
+    syncer = IncrementalSync(fetcher)
+    start = pd.Timestamp(args.start).to_pydatetime() if args.start else None
+
+    if args.every:
+        syncer.run_forever(args.symbol, args.interval, start, args.every)
+    else:
+        start = start or syncer.get_last_datetime(args.symbol, args.interval)
+        if start is None:
+            print("数据库中没有数据，请用 --start 指定起始时间")
+            return
+        end = pd.Timestamp(args.end).to_pydatetime() if args.end else None
+        syncer.sync(args.symbol, args.interval, start, end)
+
 def main():
+    parser = argparse.ArgumentParser(description="获取BTC/USDT历史K线")
+    parser.add_argument("--sync", action="store_true", help="增量同步模式，只补齐缺失的K线")
+    parser.add_argument("--symbol", default="BTCUSDT")
+    parser.add_argument("--interval", default="1m")
+    parser.add_argument("--start", help="同步起始时间，默认从库中最后一根K线开始")
+    parser.add_argument("--end", help="同步结束时间，默认到当前时间")
+    parser.add_argument("--every", type=int, help="定时同步的间隔秒数")
+    args = parser.parse_args()
+    setup_logging()
+
+    if args.sync:
+        sync(args)
+        return
+
     try:
         print("开始获取BTC/USDT数据...")
         
@@ -1,59 +1,342 @@
+"""
+量化交易系统命令行入口
+
+    python main.py fetch --start 2024-01-01 --end 2024-02-01
+    python main.py sync --every 60
+    python main.py backtest --start 2024-01-01 --end 2024-01-07
+    python main.py backtest --start 2024-01-01 --end 2024-06-01 --checkpoint btc_hf
+    python main.py optimize --param fast_window=3,5,8 --param slow_window=10,20,30
+    python main.py inspect --source store
+    python main.py validate --source store
+    python main.py gui --backtest
+    python main.py startup backtest
+
+各子命令只在执行时导入自己用到的模块：回测不会加载 Qt 和 ccxt，
+只用本地存储时也不会加载 pymongo。startup 子命令在新的解释器中统计各子命令的导入耗时。
+"""
+import argparse
 import json
-from datetime import datetime
-from src.data.data_fetcher import DataFetcher
-from src.strategies.trading_strategy import HighFrequencyStrategy
-from src.backtest.backtest_engine import BacktestEngine
-from src.gui.main_window import MainWindow
-from src.risk_management.risk_manager import RiskManager
-from PyQt5.QtWidgets import QApplication
 import sys
+from datetime import datetime
 
-def main():
-    # 加载配置
-    with open("config/config.json", "r") as f:
-        config = json.load(f)
-    
-    # 初始化各个模块
-    data_fetcher = DataFetcher(
-        config['binance']['api_key'],
-        config['binance']['secret_key'],
-        config['binance']['test_net']
-    )
-    
-    risk_manager = RiskManager(config['trading'])
-    
-    # 获取更长时间的历史数据
-    data = data_fetcher.fetch_history(
-        symbol="BTC/USDT",  # 注意：CCXT使用/分隔符
-        interval="1m",
-        start_time="2024-01-01",
-        end_time="2025-01-31"
+# 各子命令依赖的模块，startup 子命令据此统计导入耗时
+COMMAND_MODULES = {
+    "fetch": ["src.data.data_fetcher"],
+    "sync": ["src.data.data_fetcher", "src.data.sync"],
+    "backtest": ["src.backtest.backtest_engine", "src.strategies.trading_strategy"],
+    "optimize": ["src.backtest.backtest_engine", "src.strategies.trading_strategy"],
+    "inspect": ["src.data.bar_store", "pymongo"],
+    "validate": ["src.data.validator", "pymongo"],
+    "gui": ["src.backtest.backtest_engine", "src.strategies.trading_strategy", "src.gui.main_window"],
+}
+
+# 回测结果中输出的统计指标：(名称, 字段, 格式)
+STATISTICS_FIELDS = [
+    ("总收益率", "total_return", "{:.2f}%"),
+    ("年化收益率", "annual_return", "{:.2f}%"),
+    ("夏普比率", "sharpe_ratio", "{:.2f}"),
+    ("索提诺比率", "sortino_ratio", "{:.2f}"),
+    ("卡玛比率", "calmar_ratio", "{:.2f}"),
+    ("最大回撤", "max_drawdown", "{:.2f}%"),
+    ("最长回撤天数", "max_drawdown_duration", "{:.1f}"),
+    ("成交笔数", "total_trades", "{}"),
+    ("胜率", "win_rate", "{:.2f}%"),
+    ("盈亏比", "profit_factor", "{:.2f}"),
+    ("换手率", "turnover", "{:.2f}"),
+]
+
+
+def parse_time(text: str) -> datetime:
+    return datetime.fromisoformat(text)
+
+
+def parse_setting(text: str) -> dict:
+    """策略参数，JSON字符串或JSON文件路径"""
+    if not text:
+        return {}
+    if text.lstrip().startswith("{"):
+        return json.loads(text)
+    with open(text, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def parse_grid(params: list) -> dict:
+    """将 name=v1,v2,v3 形式的参数转换为参数网格"""
+    grid = {}
+    for param in params:
+        name, _, values = param.partition("=")
+        if not values:
+            raise ValueError(f"参数格式应为 name=v1,v2,...: {param}")
+        grid[name] = [json.loads(value) for value in values.split(",")]
+    return grid
+
+
+def print_statistics(statistics):
+    if statistics is None:
+        print("没有成交，无法计算统计指标")
+        return
+
+    print("\n====== 回测结果 ======")
+    for label, name, fmt in STATISTICS_FIELDS:
+        print(f"{label}: {fmt.format(getattr(statistics, name))}")
+
+
+def make_engine(args):
+    from src.backtest.backtest_engine import BacktestEngine
+
+    return BacktestEngine(data_source=args.source, store_path=args.store, quiet=args.quiet)
+
+
+def fetch(args):
+    """下载历史K线并保存到MongoDB"""
+    from src.data.data_fetcher import DataFetcher
+    from src.utils.log import setup_logging
+
+    setup_logging()
+    fetcher = DataFetcher()
+    data = fetcher.fetch_history(args.symbol, args.interval, args.start, args.end)
+    if data is None or data.empty:
+        print("没有获取到数据")
+        return 1
+    fetcher.save_to_database(data, args.symbol.replace("/", ""), args.interval)
+
+
+def sync(args):
+    """增量同步：只下载数据库中缺失的K线，可定时运行"""
+    from src.data.data_fetcher import DataFetcher
+    from src.data.sync import IncrementalSync
+    from src.utils.log import setup_logging
+
+    setup_logging()
+    syncer = IncrementalSync(DataFetcher())
+    start = parse_time(args.start) if args.start else None
+
+    if args.every:
+        syncer.run_forever(args.symbol, args.interval, start, args.every)
+        return
+
+    start = start or syncer.get_last_datetime(args.symbol, args.interval)
+    if start is None:
+        print("数据库中没有数据，请用 --start 指定起始时间")
+        return 1
+    end = parse_time(args.end) if args.end else None
+    syncer.sync(args.symbol, args.interval, start, end)
+
+
+def backtest(args):
+    """单品种回测"""
+    from src.strategies.trading_strategy import HighFrequencyStrategy
+
+    engine = make_engine(args)
+    setting = parse_setting(args.setting)
+    start, end = parse_time(args.start), parse_time(args.end)
+
+    if args.ticks:
+        engine.run_tick_backtest(HighFrequencyStrategy, setting, args.symbol, start, end, interval=args.interval)
+    else:
+        engine.run_backtest(
+            HighFrequencyStrategy, setting, args.symbol, start, end,
+            interval=args.interval, stream=args.stream, profile=args.profile, cache=not args.no_cache,
+            checkpoint=args.checkpoint
+        )
+    print_statistics(engine.calculate_performance())
+
+
+def optimize(args):
+    """参数网格优化"""
+    from src.strategies.trading_strategy import HighFrequencyStrategy
+
+    engine = make_engine(args)
+    grid = parse_grid(args.param)
+    results = engine.run_optimization(
+        HighFrequencyStrategy, grid, args.symbol, parse_time(args.start), parse_time(args.end),
+        target=args.target, mode=args.mode, max_workers=args.workers,
+        interval=args.interval, cache=not args.no_cache
     )
-    
-    # 转换symbol格式并保存到数据库
-    data_fetcher.save_to_database(data, "BTCUSDT", "1m")
-    
-    # 回测使用相同的时间段
-    backtest = BacktestEngine()
-    start = datetime(2023, 1, 1)
-    end = datetime(2024, 4, 12)
-    
-    result = backtest.run(
-        HighFrequencyStrategy,
-        {},
-        "BTCUSDT",
-        start,
-        end
+
+    print(f"\n====== 按 {args.target} 排序的前 {args.top} 组参数 ======")
+    for setting, statistics in results[:args.top]:
+        value = getattr(statistics, args.target) if statistics else None
+        print(f"{setting}: {value if value is None else round(value, 4)}")
+
+
+def inspect(args):
+    """查看K线数据的条数与时间范围"""
+    if args.source == "store":
+        from src.data.bar_store import BarStore, to_datetimes
+
+        meta = BarStore(args.store).get_meta(args.symbol, args.interval)
+        if not meta or not meta["count"]:
+            print(f"本地存储中没有 {args.symbol} {args.interval} 的数据")
+            return 1
+        first, last = to_datetimes([meta["start"], meta["end"]])
+        count = meta["count"]
+    else:
+        from pymongo import MongoClient
+
+        collection = MongoClient("localhost", 27017).crypto_trading.market_data
+        query = {"symbol": args.symbol, "interval": args.interval}
+        count = collection.count_documents(query)
+        if not count:
+            print(f"MongoDB中没有 {args.symbol} {args.interval} 的数据")
+            return 1
+        first = collection.find_one(query, sort=[("datetime", 1)])["datetime"]
+        last = collection.find_one(query, sort=[("datetime", -1)])["datetime"]
+
+    print(f"{args.symbol} {args.interval}: {count} 条K线")
+    print(f"第一条数据时间: {first}")
+    print(f"最后一条数据时间: {last}")
+
+
+def validate(args):
+    """检查K线数据质量，缺口写入缺口索引"""
+    from src.data.bar_store import BarStore
+    from src.data.validator import DataValidator, GapIndex
+
+    collection = None
+    if args.source == "mongo":
+        from pymongo import MongoClient
+
+        collection = MongoClient("localhost", 27017).crypto_trading.market_data
+
+    validator = DataValidator(collection, BarStore(args.store), GapIndex(args.gap_index))
+    report = validator.validate(
+        args.symbol, args.interval, args.source,
+        parse_time(args.start) if args.start else None,
+        parse_time(args.end) if args.end else None
     )
-    
-    print("回测结果：", result)
-    
-    # 启动GUI
+    print(report.summary())
+    return 0 if report.ok else 1
+
+
+def gui(args):
+    """在图形界面中显示K线，可选同时显示回测盈亏曲线"""
+    import pandas as pd
+    from PyQt5.QtWidgets import QApplication
+    from src.gui.main_window import MainWindow
+
+    engine = make_engine(args)
+    start, end = parse_time(args.start), parse_time(args.end)
+    bars = engine.load_bar_data(args.symbol, start, end, args.interval)
+
     app = QApplication(sys.argv)
     window = MainWindow()
-    window.update_price_chart(data)
+    window.update_price_chart(pd.DataFrame({
+        "datetime": pd.to_datetime(bars.columns["datetime"]),
+        "close": bars.columns["close"],
+    }))
+
+    if args.backtest:
+        from src.strategies.trading_strategy import HighFrequencyStrategy
+
+        daily = engine.run_backtest(
+            HighFrequencyStrategy, parse_setting(args.setting), args.symbol, start, end,
+            bars=bars, interval=args.interval
+        )
+        if daily is not None:
+            window.update_pnl_chart(pd.DataFrame({
+                "datetime": pd.to_datetime(pd.Series(daily.index)),
+                "cumulative_pnl": daily["net_pnl"].cumsum().to_numpy(),
+            }))
+
     window.show()
-    sys.exit(app.exec_())
+    return app.exec_()
+
+
+def startup(args):
+    """各子命令冷启动的导入耗时"""
+    from src.utils.startup import measure_imports
+
+    for command in args.commands or list(COMMAND_MODULES):
+        if command not in COMMAND_MODULES:
+            print(f"未知的子命令: {command}")
+            return 1
+        report = measure_imports(COMMAND_MODULES[command])
+        print(f"\n[{command}] {report.format(args.top)}")
+
+
+COMMANDS = {
+    "fetch": fetch,
+    "sync": sync,
+    "backtest": backtest,
+    "optimize": optimize,
+    "inspect": inspect,
+    "validate": validate,
+    "gui": gui,
+    "startup": startup,
+}
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="量化交易系统")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_data_options(command, start: str = None, end: str = None):
+        command.add_argument("--symbol", default="BTCUSDT")
+        command.add_argument("--interval", default="1m")
+        command.add_argument("--start", default=start, help="起始时间，如 2024-01-01")
+        command.add_argument("--end", default=end, help="结束时间(不含)")
+
+    def add_engine_options(command):
+        command.add_argument("--source", choices=["mongo", "store"], default="mongo", help="K线数据来源")
+        command.add_argument("--store", default="data/bars", help="本地列式存储目录")
+        command.add_argument("--setting", help="策略参数，JSON字符串或JSON文件路径")
+        command.add_argument("--quiet", action="store_true", help="关闭逐K线/委托/成交日志")
+
+    command = subparsers.add_parser("fetch", help="下载历史K线到MongoDB")
+    add_data_options(command, "2024-01-01", "2025-01-31")
+
+    command = subparsers.add_parser("sync", help="增量同步缺失的K线")
+    add_data_options(command)
+    command.add_argument("--every", type=int, help="定时同步的间隔秒数")
+
+    command = subparsers.add_parser("backtest", help="单品种回测")
+    add_data_options(command, "2024-01-01", "2024-01-07")
+    add_engine_options(command)
+    command.add_argument("--stream", action="store_true", help="流式回放，不在内存中保留完整K线序列")
+    command.add_argument("--ticks", action="store_true", help="使用本地Tick存储做Tick级回测")
+    command.add_argument("--profile", action="store_true", help="输出策略回调与引擎各环节耗时")
+    command.add_argument("--no-cache", action="store_true", help="不使用回测结果缓存")
+    command.add_argument("--checkpoint", help="检查点名称，从上次回放结束处续跑并在结束时更新")
+
+    command = subparsers.add_parser("optimize", help="参数网格优化")
+    add_data_options(command, "2024-01-01", "2024-01-07")
+    add_engine_options(command)
+    command.add_argument("--param", action="append", required=True, help="参数取值，如 fast_window=3,5,8")
+    command.add_argument("--target", default="total_return", help="排序的统计指标")
+    command.add_argument("--mode", choices=["vectorized", "event"], default="vectorized")
+    command.add_argument("--workers", type=int, help="进程数，默认为CPU核数")
+    command.add_argument("--top", type=int, default=10)
+    command.add_argument("--no-cache", action="store_true", help="不使用回测结果缓存")
+
+    command = subparsers.add_parser("inspect", help="查看K线数据的条数与时间范围")
+    command.add_argument("--symbol", default="BTCUSDT")
+    command.add_argument("--interval", default="1m")
+    command.add_argument("--source", choices=["mongo", "store"], default="mongo")
+    command.add_argument("--store", default="data/bars")
+
+    command = subparsers.add_parser("validate", help="检查K线数据质量并更新缺口索引")
+    add_data_options(command)
+    command.add_argument("--source", choices=["mongo", "store"], default="mongo")
+    command.add_argument("--store", default="data/bars")
+    command.add_argument("--gap-index", default="data/gaps.json", help="缺口索引文件")
+
+    command = subparsers.add_parser("gui", help="图形界面")
+    add_data_options(command, "2024-01-01", "2024-01-07")
+    add_engine_options(command)
+    command.add_argument("--backtest", action="store_true", help="运行回测并显示盈亏曲线")
+
+    command = subparsers.add_parser("startup", help="各子命令冷启动的导入耗时")
+    command.add_argument("commands", nargs="*", help=f"要统计的子命令({'/'.join(COMMAND_MODULES)})，默认全部")
+    command.add_argument("--top", type=int, default=10, help="每个子命令列出的包数")
+
+    return parser
+
+
+def main(argv: list = None) -> int:
+    args = build_parser().parse_args(argv)
+    return COMMANDS[args.command](args) or 0
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    sys.exit(main())
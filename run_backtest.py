@@ -42,20 +42,26 @@ def main():
             setting=setting,
             symbol="BTCUSDT",
             start=start,
-            end=end
+            end=end,
+            cache=True  # 策略代码、参数和数据都未变化时直接使用上次的结果
         )
         
         # 输出回测结果
         if result is not None:
             print("\n====== 回测结果 ======")
             # 获取回测统计指标
-            statistics = engine.calculate_statistics(result)
+            statistics = engine.calculate_performance()
             if statistics:
-                print(f"总收益率: {statistics['total_return']:.2f}%")
-                print(f"年化收益率: {statistics['annual_return']:.2f}%")
-                print(f"夏普比率: {statistics['sharpe_ratio']:.2f}")
-                print(f"最大回撤: {statistics['max_drawdown']:.2f}%")
-                print(f"胜率: {statistics['win_rate']:.2f}%")
+                print(f"总收益率: {statistics.total_return:.2f}%")
+                print(f"年化收益率: {statistics.annual_return:.2f}%")
+                print(f"夏普比率: {statistics.sharpe_ratio:.2f}")
+                print(f"索提诺比率: {statistics.sortino_ratio:.2f}")
+                print(f"卡玛比率: {statistics.calmar_ratio:.2f}")
+                print(f"最大回撤: {statistics.max_drawdown:.2f}%")
+                print(f"最长回撤天数: {statistics.max_drawdown_duration:.1f}")
+                print(f"胜率: {statistics.win_rate:.2f}%")
+                print(f"盈亏比: {statistics.profit_factor:.2f}")
+                print(f"换手率: {statistics.turnover:.2f}")
                 
                 # 添加详细的交易统计
                 print("\n====== 交易明细 ======")
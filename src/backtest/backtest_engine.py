@@ -1,155 +1,404 @@
-from datetime import datetime
-import sys
-import logging
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+import tempfile
 from pathlib import Path
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional, Tuple
 from vnpy.trader.object import BarData, OrderData, TradeData
-from vnpy.trader.constant import Exchange, Interval, Status, Direction
+from vnpy.trader.constant import Exchange, Interval, Offset, Status, Direction
 from vnpy_ctastrategy.backtesting import BacktestingEngine, CtaTemplate, BacktestingMode
-from pymongo import MongoClient
 import pandas as pd
 import numpy as np
+from src.data.bar_array import BarArray, BarView
+from src.data.bar_store import BarStore, to_datetimes, to_timestamp
+from src.data.resample import BASE_INTERVAL, BarResampler, resample_bars
+from src.data.downloader import TIMEFRAME_MS
+from src.data.stream import DailyCloseRecorder, prefetch
+from src.data.tick_store import TickStore, aggregate_ticks
+from src.data.validator import GapIndex
+from src.backtest.statistics import BacktestStatistics, build_equity, calculate_statistics, round_trip_pnl
+from src.backtest.vectorized import VectorizedBacktester, close_prices
+from src.backtest.optimizer import ParameterOptimizer, generate_settings, iter_cached_results, rank_results
+from src.backtest.walk_forward import WalkForwardOptimizer, WalkForwardResult, split_folds
+from src.backtest.portfolio import PortfolioBacktester, PortfolioResult
+from src.backtest.tick_replay import TickReplayer
+from src.backtest.result_cache import CachedResult, ResultCache, make_key, strategy_fingerprint
+from src.backtest.checkpoint import BacktestCheckpoint, CheckpointStore, merge_prices
+from src.risk_management.monte_carlo import MonteCarloAnalyzer, MonteCarloResult
+from src.risk_management.risk_manager import RiskManager
+from src.utils.log import CATEGORIES, get_logger, setup_logging
+from src.utils.profiler import Profiler
+
+# K线周期字符串对应的vnpy周期(vnpy没有5m/15m/4h，按分钟/小时归类)
+INTERVAL_MAP = {
+    "1m": Interval.MINUTE,
+    "5m": Interval.MINUTE,
+    "15m": Interval.MINUTE,
+    "1h": Interval.HOUR,
+    "4h": Interval.HOUR,
+    "1d": Interval.DAILY,
+}
+
+# 启用性能分析时计时的引擎方法与策略回调
+PROFILED_ENGINE_METHODS = (
+    "new_bar",
+    "cross_limit_order",
+    "cross_stop_order",
+    "update_daily_close",
+    "send_order",
+    "cancel_order",
+    "run_backtesting",
+    "calculate_result",
+)
+PROFILED_STRATEGY_METHODS = ("on_bar", "on_order", "on_trade", "on_stop_order")
+
 
 class BacktestEngine:
-    def __init__(self):
-        """初始化回测引擎"""
+    def __init__(self, data_source: str = "mongo", store_path: str = "data/bars",
+                 log_levels: Dict[str, int] = None, quiet: bool = False, log_to_file: bool = True,
+                 tick_store_path: str = "data/ticks", cache_path: str = "data/cache",
+                 gap_index_path: str = "data/gaps.json", checkpoint_path: str = "data/backtest_checkpoints"):
+        """
+        初始化回测引擎
+
+        data_source: K线数据来源，"mongo" 从MongoDB读取，"store" 从本地列式存储读取
+        tick_store_path: Tick级回测使用的本地压缩Tick存储目录
+        cache_path: 回测结果缓存目录
+        gap_index_path: DataValidator 维护的缺口索引，加载的区间内有已知缺口时给出提示
+        checkpoint_path: 回测检查点目录，续跑时从中读取上次回放结束时的状态
+        log_levels/quiet/log_to_file: 日志配置，见 setup_logging
+        """
         self.engine = BacktestingEngine()
-        self.client = MongoClient('localhost', 27017)
-        self.db = self.client.crypto_trading
-        self.collection = self.db.market_data
+        # MongoDB在首次访问 collection 时才连接，只用本地存储时不加载 pymongo
+        self.client = None
+        self.db = None
+        self._collection = None
+        self.mongo_reader = None
+
+        if data_source not in ("mongo", "store"):
+            raise ValueError(f"不支持的数据来源: {data_source}")
+        self.data_source = data_source
+        self.bar_store = BarStore(store_path)
+        self.resampler = BarResampler(self.bar_store)
+        self.tick_store = TickStore(tick_store_path)
+        self.result_cache = ResultCache(cache_path)
+        self.cached_result: Optional[CachedResult] = None
+        self.gap_index = GapIndex(gap_index_path)
+        self.checkpoints = CheckpointStore(checkpoint_path)
+        # 计算盯市权益用的价格(datetime/close)：逐K线收盘，或流式回放时的每日收盘
+        self.equity_prices: Optional[Dict[str, np.ndarray]] = None
+        self.equity_per_bar = True
         
         # 设置引擎基础参数
         self.init_capital = 1_000_000  # 初始资金100万
         self.contract_multiplier = 1    # 合约乘数
         self.commission_rate = 0.001    # 手续费率 0.1%
         self.price_tick = 0.01         # 价格精度
+        self.slippage = 0              # 滑点
 
-        self.setup_logging()
+        self.logger = get_logger("engine")
+        self.setup_logging(log_levels, quiet, log_to_file)
 
-    def setup_logging(self):
-        """配置日志系统"""
-        # 创建logs目录
-        log_dir = Path("d:/MFE5210/logs")
-        log_dir.mkdir(exist_ok=True)
-        
-        # 生成日志文件名
-        log_filename = f"backtest_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
-        log_file = log_dir / log_filename
-        
-        # 配置根日志记录器
-        logger = logging.getLogger()
-        logger.setLevel(logging.INFO)
-        
-        # 创建文件处理器
-        file_handler = logging.FileHandler(
-            filename=log_file,
-            mode='a',
-            encoding='utf-8'
-        )
-        
-        # 创建控制台处理器
-        console_handler = logging.StreamHandler(sys.stdout)
-        
-        # 设置日志格式
-        formatter = logging.Formatter(
-            '%(asctime)s - %(message)s',
-            datefmt='%Y-%m-%d %H:%M:%S'
-        )
-        file_handler.setFormatter(formatter)
-        console_handler.setFormatter(formatter)
-        
-        # 添加处理器
-        logger.addHandler(file_handler)
-        logger.addHandler(console_handler)
-        
-        print(f"日志文件保存在: {log_file}")
+    @property
+    def collection(self):
+        """market_data 集合，首次访问时连接MongoDB"""
+        if self._collection is None:
+            from pymongo import MongoClient
 
-    def load_bar_data(self, symbol: str, start: datetime, end: datetime) -> List[BarData]:
-        query = {
-            "symbol": symbol,
-            "datetime": {
-                "$gte": start,
-                "$lt": end
-            }
-        }
-        
-        cursor = self.collection.find(query).sort("datetime", 1)
-        bars = []
-        
-        print(f"开始加载{symbol}的历史数据...")
-        
-        for doc in cursor:
-            # 打印第一条数据用于调试
-            if len(bars) == 0:
-                print("首条数据样例:")
-                print(doc)
-                
-            bar = BarData(
-                symbol=doc["symbol"],
-                exchange=Exchange.LOCAL,
-                datetime=doc["datetime"],
-                interval=Interval.MINUTE,
-                volume=float(doc["volume"]),
-                open_price=float(doc["open"]),
-                high_price=float(doc["high"]),
-                low_price=float(doc["low"]),
-                close_price=float(doc["close"]),
-                gateway_name="BACKTEST"
-            )
-            bars.append(bar)
-        
-        print(f"数据加载完成，共{len(bars)}条K线")
+            self.client = MongoClient('localhost', 27017)
+            self.db = self.client.crypto_trading
+            self._collection = self.db.market_data
+        return self._collection
+
+    @collection.setter
+    def collection(self, collection):
+        self._collection = collection
+        self.mongo_reader = None
+
+    def setup_logging(self, log_levels: Dict[str, int] = None, quiet: bool = False,
+                      log_to_file: bool = True):
+        """
+        配置日志系统
+
+        log_levels: 各类别(engine/bar/order/trade)的日志级别
+        quiet: 静默模式，回测热路径上的逐K线/委托/成交日志全部关闭
+        log_to_file: 是否在 logs 目录下生成日志文件
+        """
+        log_file = None
+        if log_to_file:
+            # 生成日志文件名
+            log_filename = f"backtest_{datetime.now().strftime('%Y%m%d_%H%M%S')}.log"
+            log_file = Path("logs") / log_filename
+
+        setup_logging(log_levels, quiet, log_file)
+
+        if log_file:
+            self.logger.info(f"日志文件保存在: {log_file}")
+
+    def load_bar_data(self, symbol: str, start: datetime, end: datetime,
+                      interval: str = BASE_INTERVAL) -> BarArray:
+        """
+        加载K线数据，返回列式K线容器
+
+        interval: K线周期，1m以外的周期由1分钟K线聚合而来
+        """
+        self.warn_gaps(symbol, start, end)
+        if self.data_source == "store":
+            return self.load_bar_data_from_store(symbol, start, end, interval)
+
+        self.logger.info(f"开始加载{symbol} {interval}的历史数据...")
+
+        data = self.load_mongo_columns(symbol, start, end)
+        if interval != BASE_INTERVAL:
+            # MongoDB中只有1分钟K线，读取后在内存中聚合
+            data = resample_bars(data, interval)
+        bars = self.make_bar_array(symbol, data, interval)
+
+        self.logger.info(f"数据加载完成，共{len(bars)}条K线")
         
         # 打印首尾数据时间用于验证
         if bars:
-            print(f"数据时间范围: {bars[0].datetime} 到 {bars[-1].datetime}")
+            self.logger.info("首条数据样例:\n%s", bars[0])
+            self.logger.info(f"数据时间范围: {bars[0].datetime} 到 {bars[-1].datetime}")
         
         return bars
 
-    def run_backtest(self, strategy_class, setting: Dict, symbol: str, start: datetime, end: datetime):
-        """运行回测"""
-        print("\n正在初始化回测引擎...")
+    def warn_gaps(self, symbol: str, start: datetime, end: datetime):
+        """缺口索引中 [start, end) 内有1分钟K线缺口时给出提示"""
+        gaps = self.gap_index.get_gaps(symbol, BASE_INTERVAL, to_timestamp(start), to_timestamp(end))
+        if not gaps:
+            return
+
+        step = TIMEFRAME_MS[BASE_INTERVAL] * 1_000_000
+        missing = sum((gap_end - gap_start) // step for gap_start, gap_end in gaps)
+        longest = to_datetimes(np.array(max(gaps, key=lambda gap: gap[1] - gap[0])))
+        self.logger.warning(
+            f"{symbol} 回测区间内有 {len(gaps)} 个已知数据缺口，共缺失 {missing} 根1分钟K线，"
+            f"最长缺口 {longest[0]} 到 {longest[1]}"
+        )
+
+    def load_mongo_columns(self, symbol: str, start: datetime, end: datetime,
+                           batch_size: int = 50_000) -> Dict[str, np.ndarray]:
+        """从MongoDB读取 [start, end) 内的1分钟K线列数组"""
+        if self.mongo_reader is None:
+            from src.data.mongo_reader import MongoBarReader
+
+            self.mongo_reader = MongoBarReader(self.collection)
+        return self.mongo_reader.read(symbol, BASE_INTERVAL, start, end, batch_size=batch_size)
+
+    def load_bar_arrays(self, symbol: str, start: datetime, end: datetime,
+                        interval: str = BASE_INTERVAL) -> Dict[str, np.ndarray]:
+        """
+        从本地列式存储加载K线列数组(内存映射视图，不复制数据)
+
+        1m以外的周期读取重采样缓存，1分钟数据有更新时先增量刷新缓存。
+        """
+        return self.resampler.load(symbol, interval, start, end)
+
+    def make_bar_array(self, symbol: str, data: Dict[str, np.ndarray],
+                       interval: str = BASE_INTERVAL) -> BarArray:
+        """将K线列数组包装为列式K线容器，不复制数据"""
+        return BarArray.from_columns(symbol, data, INTERVAL_MAP[interval])
+
+    def load_bar_data_from_store(self, symbol: str, start: datetime, end: datetime,
+                                 interval: str = BASE_INTERVAL) -> BarArray:
+        """从本地列式存储加载K线数据"""
+        self.logger.info(f"开始从本地存储加载{symbol} {interval}的历史数据...")
+
+        data = self.load_bar_arrays(symbol, start, end, interval)
+        bars = self.make_bar_array(symbol, data, interval)
+
+        self.logger.info(f"数据加载完成，共{len(bars)}条K线")
+        if bars:
+            self.logger.info(f"数据时间范围: {bars[0].datetime} 到 {bars[-1].datetime}")
+
+        return bars
+
+    def iter_bar_chunks(self, symbol: str, start: datetime, end: datetime,
+                        interval: str = BASE_INTERVAL, chunk_size: int = 10_000) -> Iterator[BarArray]:
+        """
+        分块读取K线，每块最多 chunk_size 根
+
+        本地存储按内存映射切片逐块读入内存；MongoDB按与K线周期对齐的时间窗口逐段查询，
+        聚合周期时每个桶都完整落在一个窗口内。
+        """
+        if self.data_source == "store":
+            data = self.load_bar_arrays(symbol, start, end, interval)
+            for i in range(0, len(data["datetime"]), chunk_size):
+                chunk = {name: np.array(array[i:i + chunk_size]) for name, array in data.items()}
+                yield self.make_bar_array(symbol, chunk, interval)
+            return
+
+        step = TIMEFRAME_MS[interval] * 1_000_000
+        window = timedelta(milliseconds=TIMEFRAME_MS[interval] * chunk_size)
+        window_start = start
+        while window_start < end:
+            window_end = window_start + window
+            if window_end < end:
+                # 窗口结束时间向下对齐到周期边界(按UTC分桶)，起始时间未对齐时桶也不会被切开
+                window_end -= timedelta(microseconds=to_timestamp(window_end) % step // 1000)
+            else:
+                window_end = end
+            data = self.load_mongo_columns(symbol, window_start, window_end, chunk_size)
+            window_start = window_end
+
+            if not len(data["datetime"]):
+                continue
+            if interval != BASE_INTERVAL:
+                data = resample_bars(data, interval, complete_only=window_end >= end)
+            yield self.make_bar_array(symbol, data, interval)
+
+    def stream_bar_data(self, symbol: str, start: datetime, end: datetime,
+                        interval: str = BASE_INTERVAL, chunk_size: int = 10_000,
+                        prefetch_chunks: int = 2) -> Iterator[BarView]:
+        """
+        流式读取K线
+
+        后台线程预读至多 prefetch_chunks 块，内存占用与回测区间长度无关。
+        """
+        self.warn_gaps(symbol, start, end)
+        return prefetch(self.iter_bar_chunks(symbol, start, end, interval, chunk_size), prefetch_chunks)
+
+    def run_backtest(self, strategy_class, setting: Dict, symbol: str, start: datetime, end: datetime,
+                     bars: BarArray = None, interval: str = BASE_INTERVAL,
+                     stream: bool = False, chunk_size: int = 10_000, profile: bool = False,
+                     cache: bool = False, checkpoint: str = None):
+        """
+        运行回测
+
+        bars: 可选，直接传入已加载的K线(BarArray 或 BarData 列表)，不再重复读取数据
+        interval: K线周期，如 1m/5m/15m/1h/4h/1d
+        stream: 流式回放，分块读取K线并在后台预读，不在内存中保留完整K线序列；
+            此时统计指标按逐日盯市权益计算
+        profile: 统计策略回调与引擎各环节的耗时，回测结束时输出报告
+        cache: 使用回测结果缓存，策略代码、参数、引擎参数和K线数据都未变化时直接返回上次的结果；
+            直接传入 bars 时不使用缓存
+        checkpoint: 检查点名称，存在同一策略代码、参数、引擎参数、品种、周期和起始时间的检查点时，
+            恢复其状态并只回放之后新增的K线，结果与完整重跑一致；回放结束时更新检查点。
+            续跑后统计指标按逐日盯市权益计算；直接传入 bars 时只保存不续跑
+        """
+        self.cached_result = None
+        if cache and bars is None:
+            key = make_key(
+                **self.cache_key_parts(strategy_class, symbol, start, end, interval, "event"),
+                setting=setting
+            )
+            cached = self.result_cache.get(key)
+            if cached is not None:
+                self.logger.info(f"命中回测结果缓存: {key[:12]}")
+                self.restore_cached_result(cached, symbol)
+                return cached.daily
+
+            df = self.run_backtest(strategy_class, setting, symbol, start, end, None, interval,
+                                   stream, chunk_size, profile, checkpoint=checkpoint)
+            self.result_cache.put(key, self.collect_result(df))
+            return df
+
+        self.profiler = None
+        if not profile:
+            return self.replay(strategy_class, setting, symbol, start, end, bars, interval, stream, chunk_size,
+                               checkpoint)
+
+        self.profiler = Profiler()
+        for method_name in ("load_bar_data", "stream_bar_data"):
+            self.profiler.wrap(self, method_name)
+        for method_name in PROFILED_ENGINE_METHODS:
+            self.profiler.wrap(self.engine, method_name, f"engine.{method_name}")
+        for category in CATEGORIES:
+            self.profiler.wrap(get_logger(category), "info", f"log.{category}")
+
+        try:
+            return self.replay(strategy_class, setting, symbol, start, end, bars, interval, stream, chunk_size,
+                               checkpoint)
+        finally:
+            self.profiler.unwrap_all()
+            self.logger.info("\n=== 性能分析(耗时包含嵌套调用) ===\n%s", self.profiler.report())
+
+    def replay(self, strategy_class, setting: Dict, symbol: str, start: datetime, end: datetime,
+               bars: BarArray = None, interval: str = BASE_INTERVAL,
+               stream: bool = False, chunk_size: int = 10_000, checkpoint: str = None):
+        """回测主流程，参数见 run_backtest"""
+        self.logger.info("\n正在初始化回测引擎...")
+
+        # 清除上一次回测的订单、成交和逐日结果
+        self.engine.clear_data()
         
         # 设置初始资金
-        initial_capital = 1_000_000
+        initial_capital = self.init_capital
         
         # 设置回测参数
         self.engine.set_parameters(
             vt_symbol=f"{symbol}.LOCAL",
-            interval=Interval.MINUTE,
+            interval=INTERVAL_MAP[interval],
             start=start,
             end=end,
-            rate=0.001,
-            slippage=0,
-            size=1,
-            pricetick=0.01,
+            rate=self.commission_rate,
+            slippage=self.slippage,
+            size=self.contract_multiplier,
+            pricetick=self.price_tick,
             capital=initial_capital  # 使用变量确保一致性
         )
         
-        print(f"初始资金设置为: {initial_capital:,}")
+        self.logger.info(f"初始资金设置为: {initial_capital:,}")
         
         # 添加策略
         self.strategy = self.engine.add_strategy(strategy_class, setting)
+
+        # 从检查点续跑时恢复状态，只加载检查点之后的K线；
+        # 需在安装性能分析包装之前恢复，策略属性中保存的回调(如 bg.on_bar)指向策略原有的方法
+        resumed = None
+        load_start = start
+        per_bar = bars is not None or not stream
+        if checkpoint:
+            key = self.checkpoint_key(strategy_class, setting, symbol, start, interval)
+            if bars is None:
+                resumed = self.load_checkpoint(checkpoint, key, end, per_bar)
+            if resumed:
+                resumed.restore(self.engine)
+                load_start = resumed.last_datetime + timedelta(milliseconds=TIMEFRAME_MS[interval])
+
+        if self.profiler:
+            for method_name in PROFILED_STRATEGY_METHODS:
+                self.profiler.wrap(self.engine.strategy, method_name, f"strategy.{method_name}")
         
         # 启用交易
         self.engine.strategy.trading = True
         
         # 检查引擎状态
-        print("\n检查回测引擎状态:")
-        print(f"交易对: {symbol}")
-        print(f"初始资金: {self.engine.capital:,.2f}")
-        print(f"手续费率: {self.engine.rate}")
+        self.logger.info("\n检查回测引擎状态:")
+        self.logger.info(f"交易对: {symbol}")
+        self.logger.info(f"初始资金: {self.engine.capital:,.2f}")
+        self.logger.info(f"手续费率: {self.engine.rate}")
         
         # 加载数据
-        bars = self.load_bar_data(symbol, start, end)
-        if not bars:
-            return None
+        self.equity_prices = None
+        self.equity_per_bar = per_bar
+        if bars is None and stream:
+            recorder = DailyCloseRecorder()
+            bars = recorder.record(self.stream_bar_data(symbol, load_start, end, interval, chunk_size))
+            self.bars = None
+        else:
+            if bars is None:
+                bars = self.load_bar_data(symbol, load_start, end, interval)
+            if not bars and not resumed:
+                return None
+            self.bars = bars
             
-        print("\n开始回测运行...")
+        self.logger.info("\n开始回测运行...")
         
         # 运行K线回放
         for bar in bars:
             self.engine.new_bar(bar)
+
+        if self.bars is None:
+            if not recorder.last_bar and not resumed:
+                return None
+            self.equity_prices = recorder.to_arrays()
+        else:
+            self.equity_prices = close_prices(self.bars)
+
+        if checkpoint:
+            count = len(self.bars) if self.bars is not None else recorder.count
+            self.save_checkpoint(checkpoint, key, symbol, interval, start, count, resumed)
         
         # 完成回测
         self.engine.run_backtesting()
@@ -162,9 +411,9 @@ class BacktestEngine:
             # 获取所有交易记录
             trades = self.engine.get_all_trades()
             if trades:
-                print(f"\n=== 交易统计 ===")
-                print(f"总成交笔数: {len(trades)}")
-                print(f"初始资金: {initial_capital:,.2f}")
+                self.logger.info(f"\n=== 交易统计 ===")
+                self.logger.info(f"总成交笔数: {len(trades)}")
+                self.logger.info(f"初始资金: {initial_capital:,.2f}")
                 
                 # 计算每笔交易后的余额
                 current_balance = initial_capital
@@ -177,73 +426,502 @@ class BacktestEngine:
                     else:
                         current_balance += (trade_value - commission)
                         
-                print(f"最终资金: {current_balance:,.2f}")
-                print(f"总收益率: {((current_balance - initial_capital) / initial_capital * 100):.2f}%")
+                self.logger.info(f"最终资金: {current_balance:,.2f}")
+                self.logger.info(f"总收益率: {((current_balance - initial_capital) / initial_capital * 100):.2f}%")
                 
                 return df
 
         return None
 
-    def calculate_statistics(self, df) -> Dict[str, float]:
-        """计算回测统计指标"""
-        # 获取所有交易
-        trades = self.engine.get_all_trades()
-        if not trades:
+    def checkpoint_key(self, strategy_class, setting: Dict, symbol: str, start: datetime,
+                       interval: str) -> str:
+        """检查点的键，与结果缓存不同，不含结束时间和数据版本：新增数据后仍可续跑"""
+        return make_key(
+            code=strategy_fingerprint(strategy_class),
+            strategy=f"{strategy_class.__module__}.{strategy_class.__qualname__}",
+            symbol=symbol,
+            start=start,
+            interval=interval,
+            mode="checkpoint",
+            engine=self.engine_parameters(),
+            source=self.data_source,
+            setting=setting
+        )
+
+    def load_checkpoint(self, name: str, key: str, end: datetime,
+                        per_bar: bool) -> Optional[BacktestCheckpoint]:
+        """
+        读取可用于续跑到 end 的检查点，不可用时返回None(完整重跑)
+
+        per_bar: 本次是否一次加载K线；检查点需以相同方式回放，保存的盯市价格才能与本次的拼接
+        """
+        checkpoint = self.checkpoints.get(name)
+        if checkpoint is None:
             return None
-            
-        # 初始化变量
-        initial_capital = self.engine.capital
-        final_capital = self.engine.capital
-        open_price = 0  # 用于记录开仓价格
-        win_count = 0   # 记录盈利笔数
-        
-        # 计算每笔交易的收益
-        for trade in trades:
-            trade_value = trade.price * trade.volume
-            commission = trade_value * self.engine.rate
-            
-            if trade.direction == Direction.LONG:
-                open_price = trade.price  # 记录开仓价格
-                final_capital -= (trade_value + commission)
-            else:  # SHORT - 平仓
-                if open_price > 0:  # 确保有开仓价格
-                    # 如果平仓价格高于开仓价格，则为盈利交易
-                    if trade.price > open_price:
-                        win_count += 1
-                final_capital += (trade_value - commission)
-        
-        # 计算各项指标
-        total_days = (trades[-1].datetime - trades[0].datetime).days
-        total_return = (final_capital - initial_capital) / initial_capital * 100
-        annual_return = total_return * 365 / total_days if total_days > 0 else 0
-        win_rate = (win_count / (len(trades) // 2)) * 100 if trades else 0  # 除以2因为每对交易包含开仓和平仓
-        
-        # 计算最大回撤
-        max_drawdown = 0
-        peak = initial_capital
-        current_capital = initial_capital
-        
-        for trade in trades:
-            trade_value = trade.price * trade.volume
-            commission = trade_value * self.engine.rate
-            
-            if trade.direction == Direction.LONG:
-                current_capital -= (trade_value + commission)
-            else:
-                current_capital += (trade_value - commission)
-                
-            drawdown = (peak - current_capital) / peak * 100
-            max_drawdown = max(max_drawdown, drawdown)
-            peak = max(peak, current_capital)
-        
+        if checkpoint.key != key:
+            self.logger.warning(f"检查点 {name} 的策略代码、参数或回测设置已变化，完整重跑")
+            return None
+        if checkpoint.per_bar != per_bar:
+            self.logger.warning(f"检查点 {name} 与本次回测的回放方式(一次加载/流式)不同，完整重跑")
+            return None
+        if checkpoint.last_datetime >= end:
+            self.logger.info(f"检查点 {name} 已回放到 {checkpoint.last_datetime}，不早于结束时间，完整重跑")
+            return None
+
+        self.logger.info(
+            f"从检查点 {name} 续跑: 已回放 {checkpoint.bar_count:,} 根K线，截至 {checkpoint.last_datetime}"
+        )
+        return checkpoint
+
+    def save_checkpoint(self, name: str, key: str, symbol: str, interval: str, start: datetime,
+                        count: int, resumed: Optional[BacktestCheckpoint]):
+        """
+        K线回放结束后保存检查点
+
+        count: 本次回放的K线数
+
+        续跑时本次只回放了新增的K线，盯市价格与检查点中保存的拼接后，
+        统计指标与完整回测按相同的价格计算。
+        """
+        prices = self.equity_prices
+        if resumed:
+            prices = merge_prices(resumed.prices, prices, self.equity_per_bar)
+            self.equity_prices = prices
+
+        if self.engine.datetime is None:
+            return
+        bar_count = (resumed.bar_count if resumed else 0) + count
+        self.checkpoints.put(
+            name,
+            BacktestCheckpoint.capture(
+                self.engine, key, symbol, interval, start, bar_count, prices, self.equity_per_bar
+            )
+        )
+        self.logger.info(f"已保存检查点 {name}，截至 {self.engine.datetime}")
+
+    def engine_parameters(self) -> Dict[str, float]:
+        """影响回测结果的引擎参数"""
         return {
-            "total_return": total_return,
-            "annual_return": annual_return,
-            "sharpe_ratio": 0.0,  # 需要日收益率数据才能计算
-            "max_drawdown": max_drawdown,
-            "win_rate": win_rate
+            "rate": self.commission_rate,
+            "slippage": self.slippage,
+            "size": self.contract_multiplier,
+            "pricetick": self.price_tick,
+            "capital": self.init_capital,
         }
 
+    def set_engine_parameters(self, parameters: Dict[str, float]):
+        """按 engine_parameters 的格式设置引擎参数，供优化等工作进程与主进程保持一致"""
+        self.commission_rate = parameters.get("rate", self.commission_rate)
+        self.slippage = parameters.get("slippage", self.slippage)
+        self.contract_multiplier = parameters.get("size", self.contract_multiplier)
+        self.price_tick = parameters.get("pricetick", self.price_tick)
+        self.init_capital = parameters.get("capital", self.init_capital)
+
+    @contextmanager
+    def local_store(self, symbols: List[str], start: datetime, end: datetime) -> Iterator[str]:
+        """
+        供工作进程内存映射读取的本地存储目录
+
+        数据来源为本地存储时直接使用；MongoDB数据先落地到临时目录，只加载一次，退出时删除。
+        """
+        if self.data_source == "store":
+            yield str(self.bar_store.root)
+            return
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            store = BarStore(tmp_dir)
+            for symbol in symbols:
+                store.import_from_mongo(self.collection, symbol, BASE_INTERVAL, start, end)
+            yield tmp_dir
+
+    def get_data_version(self, symbol: str, start: datetime, end: datetime) -> Dict:
+        """
+        K线数据的版本标记，数据变化后随之改变
+
+        本地存储取1分钟分区的版本号(重采样周期由其派生)；
+        MongoDB 取写入时维护的版本号，并加上区间内的K线条数。
+        """
+        if self.data_source == "store":
+            meta = self.bar_store.get_meta(symbol, BASE_INTERVAL) or {}
+            return {"version": meta.get("version"), "count": meta.get("count")}
+
+        from src.data.market_data import get_data_version
+
+        count = self.collection.count_documents({
+            "symbol": symbol,
+            "interval": BASE_INTERVAL,
+            "datetime": {"$gte": start, "$lte": end}
+        })
+        return {"version": get_data_version(self.collection, symbol, BASE_INTERVAL), "count": count}
+
+    def cache_key_parts(self, strategy_class, symbol: str, start: datetime, end: datetime,
+                        interval: str, mode: str) -> Dict:
+        """回测结果缓存键中除参数以外的部分"""
+        # 向量化回测的交易逻辑在 VectorizedBacktester 中
+        code_class = VectorizedBacktester if mode == "vectorized" else strategy_class
+        return {
+            "code": strategy_fingerprint(code_class),
+            "strategy": f"{strategy_class.__module__}.{strategy_class.__qualname__}" if strategy_class else None,
+            "symbol": symbol,
+            "start": start,
+            "end": end,
+            "interval": interval,
+            "mode": mode,
+            "engine": self.engine_parameters(),
+            "source": self.data_source,
+            "data": self.get_data_version(symbol, start, end),
+        }
+
+    def collect_result(self, df: Optional[pd.DataFrame]) -> CachedResult:
+        """整理本次回测的成交、逐日结果与统计指标，用于写入缓存"""
+        trades = self.engine.get_all_trades()
+        trades = pd.DataFrame({
+            "datetime": [trade.datetime for trade in trades],
+            "direction": [1 if trade.direction == Direction.LONG else -1 for trade in trades],
+            "price": [trade.price for trade in trades],
+            "volume": [trade.volume for trade in trades],
+        })
+
+        daily = None
+        if df is not None:
+            daily = df.drop(columns=["trades"], errors="ignore")
+
+        statistics = self.calculate_performance()
+        return CachedResult(trades, daily, statistics.to_dict() if statistics else None)
+
+    def restore_cached_result(self, cached: CachedResult, symbol: str):
+        """用缓存结果恢复成交记录，使 get_all_trades/calculate_performance 可以照常调用"""
+        self.engine.clear_data()
+        self.bars = None
+        self.equity_prices = None
+        self.cached_result = cached
+
+        if cached.trades is None:
+            return
+
+        trades = cached.trades
+        datetimes = to_datetimes(trades["datetime"].to_numpy(dtype="datetime64[ns]").astype(np.int64))
+        rows = zip(datetimes, trades["direction"].tolist(), trades["price"].tolist(), trades["volume"].tolist())
+        for i, (dt, direction, price, volume) in enumerate(rows):
+            trade = TradeData(
+                symbol=symbol,
+                exchange=Exchange.LOCAL,
+                orderid=str(i + 1),
+                tradeid=str(i + 1),
+                direction=Direction.LONG if direction > 0 else Direction.SHORT,
+                offset=Offset.NONE,
+                price=price,
+                volume=volume,
+                datetime=dt,
+                gateway_name=self.engine.gateway_name
+            )
+            self.engine.trades[trade.vt_tradeid] = trade
+
+    def run_tick_backtest(self, strategy_class, setting: Dict, symbol: str, start: datetime, end: datetime,
+                          ticks: Dict[str, np.ndarray] = None, interval: str = BASE_INTERVAL):
+        """
+        Tick级回测
+
+        Tick聚合为 interval 周期的K线推送给策略的 on_bar，委托按之后的Tick的买一卖一价撮合，
+        能反映K线内部的成交时间和价格。
+        ticks: 可选，直接传入Tick列数组，否则从本地Tick存储读取
+        """
+        self.logger.info("\n正在初始化Tick级回测...")
+        self.cached_result = None
+        if ticks is None:
+            ticks = self.tick_store.load(symbol, start, end)
+        if not len(ticks["datetime"]):
+            self.logger.warning(f"没有 {symbol} 的Tick数据")
+            return None
+
+        bar_columns, starts = aggregate_ticks(ticks, interval)
+        self.bars = self.make_bar_array(symbol, bar_columns, interval)
+        self.equity_prices = close_prices(self.bars)
+        self.equity_per_bar = True
+
+        self.engine.clear_data()
+        self.engine.tick = None
+        self.engine.set_parameters(
+            vt_symbol=f"{symbol}.LOCAL",
+            interval=INTERVAL_MAP[interval],
+            start=start,
+            end=end,
+            rate=self.commission_rate,
+            slippage=self.slippage,
+            size=self.contract_multiplier,
+            pricetick=self.price_tick,
+            capital=self.init_capital,
+            mode=BacktestingMode.TICK
+        )
+        self.engine.add_strategy(strategy_class, setting)
+        self.strategy = self.engine.strategy
+        self.engine.strategy.trading = True
+
+        replayer = TickReplayer(self.engine, ticks, self.bars, starts)
+        replayer.run()
+        self.logger.info(
+            f"Tick数: {len(ticks['datetime']):,}，K线数: {len(self.bars):,}，"
+            f"参与撮合的Tick数: {replayer.crossed:,}"
+        )
+
+        self.engine.run_backtesting()
+        df = self.engine.calculate_result()
+        self.logger.info(f"总成交笔数: {len(self.engine.get_all_trades())}")
+        return df
+
+    def get_trade_arrays(self) -> Optional[Tuple[Dict[str, np.ndarray], np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        本次回测的K线列数组与成交数组
+
+        返回 (K线列数组, 成交所在K线位置, 成交价格, 带方向的成交数量)，没有成交时返回None；
+        流式回放时K线列数组只有每日收盘。
+        """
+        trades = self.engine.get_all_trades()
+        data = self.equity_prices
+        if not trades or data is None:
+            return None
+
+        trade_datetimes = np.array([to_timestamp(trade.datetime) for trade in trades], dtype=np.int64)
+        if self.equity_per_bar:
+            # K线时间为起始时间，Tick级回测的成交落在K线内部，归入所在的K线
+            trade_index = np.maximum(np.searchsorted(data["datetime"], trade_datetimes, "right") - 1, 0)
+        else:
+            trade_index = np.searchsorted(data["datetime"], trade_datetimes)
+        trade_price = np.array([trade.price for trade in trades])
+        trade_volume = np.array([
+            trade.volume if trade.direction == Direction.LONG else -trade.volume
+            for trade in trades
+        ])
+        return data, trade_index, trade_price, trade_volume
+
+    def calculate_equity(self) -> Optional[pd.Series]:
+        """逐K线盯市权益曲线，没有成交时返回None"""
+        arrays = self.get_trade_arrays()
+        if arrays is None:
+            return None
+
+        data, trade_index, trade_price, trade_volume = arrays
+        equity = build_equity(
+            data["close"], trade_index, trade_price, trade_volume,
+            self.init_capital, self.engine.rate, self.engine.size, self.engine.slippage
+        )
+        return pd.Series(equity, index=pd.to_datetime(np.asarray(data["datetime"])))
+
+    def calculate_performance(self) -> Optional[BacktestStatistics]:
+        """
+        按逐K线盯市权益一次向量化计算全部统计指标
+
+        需在 run_backtest 之后调用，没有成交时返回None；流式回放时按逐日盯市权益计算。
+        """
+        if self.cached_result is not None:
+            statistics = self.cached_result.statistics
+            return BacktestStatistics(**statistics) if statistics else None
+
+        arrays = self.get_trade_arrays()
+        if arrays is None:
+            return None
+
+        data, trade_index, trade_price, trade_volume = arrays
+        return calculate_statistics(
+            data["datetime"],
+            data["close"],
+            trade_index,
+            trade_price,
+            trade_volume,
+            self.init_capital,
+            self.engine.rate,
+            self.engine.size,
+            slippage=self.engine.slippage
+        )
+
+    def get_returns(self, kind: str = "trade") -> Optional[np.ndarray]:
+        """
+        本次回测的收益率序列，没有成交时返回None
+
+        kind: "trade" 为每笔完整交易的净盈亏占开仓前权益的比例，
+              "daily" 为逐日盯市权益的日收益率
+        """
+        arrays = self.get_trade_arrays()
+        if arrays is None:
+            return None
+
+        if kind == "trade":
+            _, _, trade_price, trade_volume = arrays
+            pnl = round_trip_pnl(trade_price, trade_volume, self.engine.rate, self.engine.size, self.engine.slippage)
+            # 两笔交易之间空仓，开仓前权益即初始资金加上之前各笔盈亏
+            before = self.init_capital + np.concatenate([[0], np.cumsum(pnl)[:-1]])
+            return pnl / before
+        if kind == "daily":
+            daily = self.calculate_equity().resample("1D").last().dropna()
+            equity = np.concatenate([[self.init_capital], daily.to_numpy()])
+            return np.diff(equity) / equity[:-1]
+        raise ValueError(f"不支持的收益率类型: {kind}")
+
+    def run_monte_carlo(self, kind: str = "trade", paths: int = 10_000, block_size: int = 1,
+                        confidence_level: float = 0.95, seed: int = 42,
+                        max_workers: int = None) -> Optional[MonteCarloResult]:
+        """
+        对本次回测的收益率做蒙特卡洛重抽样，需在 run_backtest 之后调用
+
+        block_size > 1 时使用分块重抽样；结果由 seed 唯一确定
+        """
+        returns = self.get_returns(kind)
+        if returns is None or len(returns) < 2:
+            self.logger.warning("收益率样本不足，跳过蒙特卡洛分析")
+            return None
+
+        analyzer = MonteCarloAnalyzer(returns, self.init_capital, confidence_level, block_size, seed)
+        result = analyzer.run(paths, max_workers=max_workers)
+
+        low, high = result.confidence_interval("max_drawdown")
+        self.logger.info(f"蒙特卡洛路径数: {paths}，样本数: {len(returns)}")
+        self.logger.info(f"最大回撤95%置信区间: {low:.2f}% ~ {high:.2f}%")
+        low, high = result.confidence_interval("total_return")
+        self.logger.info(f"总收益率95%置信区间: {low:.2f}% ~ {high:.2f}%")
+        return result
+
+    def calculate_statistics(self, df) -> Dict[str, float]:
+        """计算回测统计指标，返回字典"""
+        statistics = self.calculate_performance()
+        return statistics.to_dict() if statistics else None
+
+    def iter_optimization(self, strategy_class, grid: Dict[str, List], symbol: str,
+                          start: datetime, end: datetime, mode: str = "vectorized",
+                          max_workers: int = None, interval: str = BASE_INTERVAL,
+                          cache: bool = False) -> Iterator[Tuple[Dict, Optional[BacktestStatistics]]]:
+        """
+        多进程参数优化，按完成顺序逐个返回 (参数, 统计指标)
+
+        grid: 参数网格，如 {"fast_window": [3, 5], "slow_window": [10, 20]}
+        mode: "vectorized" 使用向量化回测，"event" 使用事件驱动回测
+        cache: 使用回测结果缓存，之前算过的参数组直接返回
+        """
+        settings = generate_settings(grid)
+        self.logger.info(f"参数组合数: {len(settings)}")
+
+        result_cache = None
+        cache_parts = None
+        if cache:
+            result_cache = self.result_cache
+            cache_parts = self.cache_key_parts(strategy_class, symbol, start, end, interval, mode)
+            # 先在缓存中查找，全部命中时不需要读取K线
+            misses = []
+            yield from iter_cached_results(result_cache, cache_parts, settings, misses)
+            self.logger.info(f"缓存命中: {len(settings) - len(misses)}，需要计算: {len(misses)}")
+            if not misses:
+                return
+            settings = misses
+
+        # Mongo数据先落地为本地列式存储，工作进程通过内存映射共享同一份数据
+        with self.local_store([symbol], start, end) as store_path:
+            optimizer = ParameterOptimizer(
+                store_path,
+                symbol,
+                start,
+                end,
+                mode=mode,
+                engine_setting=self.engine_parameters(),
+                strategy_class=strategy_class,
+                max_workers=max_workers,
+                interval=interval,
+                cache=result_cache,
+                cache_parts=cache_parts
+            )
+            yield from optimizer.iter_results(settings)
+
+    def run_optimization(self, strategy_class, grid: Dict[str, List], symbol: str,
+                         start: datetime, end: datetime, target: str = "total_return",
+                         mode: str = "vectorized", max_workers: int = None,
+                         interval: str = BASE_INTERVAL,
+                         cache: bool = False) -> List[Tuple[Dict, Optional[BacktestStatistics]]]:
+        """多进程参数优化，返回按目标指标排序的结果"""
+        results = []
+        best = None
+
+        for setting, statistics in self.iter_optimization(
+            strategy_class, grid, symbol, start, end, mode, max_workers, interval, cache
+        ):
+            results.append((setting, statistics))
+            if statistics and (best is None or getattr(statistics, target) > getattr(best[1], target)):
+                best = (setting, statistics)
+                self.logger.info(f"[{len(results)}] 当前最优 {target}={getattr(statistics, target):.4f}: {setting}")
+
+        return rank_results(results, target)
+
+    def run_walk_forward(self, strategy_class, grid: Dict[str, List], symbol: str,
+                         start: datetime, end: datetime, train_days: int = 30, test_days: int = 7,
+                         target: str = "sharpe_ratio", mode: str = "vectorized",
+                         interval: str = BASE_INTERVAL, warmup_bars: int = 100,
+                         max_workers: int = None) -> WalkForwardResult:
+        """
+        滚动优化：每 test_days 天向前滚动一次，用之前 train_days 天的数据优化参数，
+        在随后 test_days 天上检验，返回各窗口结果与拼接后的样本外权益曲线
+        """
+        folds = split_folds(start, end, train_days, test_days)
+        settings = generate_settings(grid)
+        self.logger.info(f"窗口数: {len(folds)}，每个窗口参数组合数: {len(settings)}")
+
+        # 与参数优化相同，Mongo数据先落地为本地列式存储，只加载一次
+        with self.local_store([symbol], start, end) as store_path:
+            optimizer = WalkForwardOptimizer(
+                store_path,
+                symbol,
+                settings,
+                target=target,
+                mode=mode,
+                engine_setting=self.engine_parameters(),
+                strategy_class=strategy_class,
+                interval=interval,
+                warmup_bars=warmup_bars,
+                max_workers=max_workers
+            )
+            result = optimizer.run(folds)
+
+        if result.statistics:
+            self.logger.info(
+                f"样本外总收益率: {result.statistics.total_return:.2f}%，"
+                f"夏普比率: {result.statistics.sharpe_ratio:.2f}，"
+                f"最大回撤: {result.statistics.max_drawdown:.2f}%"
+            )
+        return result
+
+    def run_portfolio(self, symbols: List[str], setting: Dict, start: datetime, end: datetime,
+                      risk_config: Dict = None, interval: str = BASE_INTERVAL,
+                      order_volume: float = None, max_workers: int = None) -> PortfolioResult:
+        """
+        多品种组合回测：所有品种共用 init_capital 资金池，开仓委托经 RiskManager 检查
+
+        risk_config: RiskManager 配置，默认与 config.json 中 trading 部分一致
+        order_volume: 固定下单数量；为None时按 risk_limit 占当前权益的比例下单
+        """
+        risk_manager = RiskManager(risk_config or {"risk_limit": 0.02, "max_positions": 3})
+        self.logger.info(f"组合回测品种数: {len(symbols)}，参数: {setting}")
+
+        # 与参数优化相同，Mongo数据先落地为本地列式存储
+        with self.local_store(symbols, start, end) as store_path:
+            backtester = PortfolioBacktester(
+                store_path,
+                symbols,
+                setting,
+                risk_manager,
+                capital=self.init_capital,
+                rate=self.commission_rate,
+                pricetick=self.price_tick,
+                interval=interval,
+                order_volume=order_volume,
+                max_workers=max_workers
+            )
+            result = backtester.run(start, end)
+
+        self.logger.info(f"成交笔数: {len(result.trades)}，被拒绝的开仓委托: {result.rejected}")
+        if result.statistics:
+            self.logger.info(
+                f"组合总收益率: {result.statistics.total_return:.2f}%，"
+                f"夏普比率: {result.statistics.sharpe_ratio:.2f}，"
+                f"最大回撤: {result.statistics.max_drawdown:.2f}%"
+            )
+        return result
+
     def get_strategy(self):
         """获取当前正在运行的策略实例"""
         return getattr(self, 'strategy', None)
\ No newline at end of file
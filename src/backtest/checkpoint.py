@@ -0,0 +1,158 @@
+import io
+import os
+import pickle
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+from vnpy_ctastrategy.backtesting import BacktestingEngine
+
+# 检查点格式或回放流程变化时递增，使旧检查点全部失效
+CHECKPOINT_VERSION = 2
+
+DAY_NS = 86_400 * 1_000_000_000
+
+# 保存的 BacktestingEngine 状态；订单、成交和逐日结果一次序列化，保留它们之间共享的对象
+ENGINE_FIELDS = (
+    "stop_order_count", "stop_orders", "active_stop_orders",
+    "limit_order_count", "limit_orders", "active_limit_orders",
+    "trade_count", "trades", "daily_results", "datetime", "capital",
+)
+
+
+def merge_prices(old: Dict[str, np.ndarray], new: Dict[str, np.ndarray],
+                 per_bar: bool) -> Dict[str, np.ndarray]:
+    """
+    拼接续跑前后的盯市价格
+
+    逐K线价格直接拼接；每日收盘在检查点最后一天未走完时以续跑的收盘为准。
+    """
+    if not len(new["datetime"]):
+        return old
+    if per_bar:
+        keep = slice(None)
+    else:
+        keep = old["datetime"] // DAY_NS < new["datetime"][0] // DAY_NS
+    return {name: np.concatenate([old[name][keep], new[name]]) for name in ("datetime", "close")}
+
+
+def strategy_state(strategy) -> Dict:
+    """
+    策略实例上需要保存的属性
+
+    策略变量、指标缓冲区、持仓和活动委托等都在实例属性中，整体保存即可覆盖自定义状态；
+    策略类的 checkpoint_excluded 中列出的属性(如日志配置)和安装在实例上的方法包装不保存。
+    """
+    excluded = set(getattr(strategy, "checkpoint_excluded", ()))
+    cls = type(strategy)
+    return {
+        key: value for key, value in vars(strategy).items()
+        if key not in excluded and not (callable(value) and hasattr(cls, key))
+    }
+
+
+class StatePickler(pickle.Pickler):
+    """引擎与策略实例本身只记录引用，恢复时指向新创建的实例(如 BarGenerator 中回调的 on_bar)"""
+
+    def __init__(self, file, refs: Dict[str, object]):
+        super().__init__(file, pickle.HIGHEST_PROTOCOL)
+        self.refs = {id(obj): name for name, obj in refs.items()}
+
+    def persistent_id(self, obj):
+        return self.refs.get(id(obj))
+
+
+class StateUnpickler(pickle.Unpickler):
+    def __init__(self, file, refs: Dict[str, object]):
+        super().__init__(file)
+        self.refs = refs
+
+    def persistent_load(self, pid):
+        return self.refs[pid]
+
+
+@dataclass
+class BacktestCheckpoint:
+    """
+    回测回放到某根K线之后的完整状态
+
+    key: 策略代码、参数、引擎参数、品种、周期和起始时间组成的键，不一致时不能续跑
+    last_datetime: 最后一根已回放K线的时间，续跑从下一根K线开始
+    state: 引擎的订单、成交、逐日结果、资金，以及策略实例属性(策略变量、指标缓冲区、持仓、活动委托等)
+    prices: 截至 last_datetime 的盯市价格(datetime/close)，与完整回测计算统计指标时使用的相同：
+            一次加载时为逐K线收盘，流式回放时为每日收盘，由 per_bar 区分
+    """
+
+    key: str
+    symbol: str
+    interval: str
+    start: datetime
+    last_datetime: datetime
+    bar_count: int
+    state: bytes
+    prices: Dict[str, np.ndarray]
+    per_bar: bool
+    version: int = CHECKPOINT_VERSION
+
+    @classmethod
+    def capture(cls, engine: BacktestingEngine, key: str, symbol: str, interval: str,
+                start: datetime, bar_count: int, prices: Dict[str, np.ndarray],
+                per_bar: bool) -> "BacktestCheckpoint":
+        """
+        保存引擎与策略的当前状态
+
+        需在 run_backtesting/calculate_result 之前调用：calculate_result 会把成交写入逐日结果。
+        """
+        buffer = io.BytesIO()
+        StatePickler(buffer, {"engine": engine, "strategy": engine.strategy}).dump({
+            "engine": {name: getattr(engine, name) for name in ENGINE_FIELDS},
+            "strategy": strategy_state(engine.strategy),
+        })
+        # 逐K线价格可能是本地存储的内存映射视图，转为普通数组保存
+        prices = {name: np.array(prices[name]) for name in ("datetime", "close")}
+        return cls(key, symbol, interval, start, engine.datetime, bar_count, buffer.getvalue(), prices, per_bar)
+
+    def restore(self, engine: BacktestingEngine):
+        """将状态恢复到已设置参数并 add_strategy 的引擎及其新建的策略实例上"""
+        strategy = engine.strategy
+        state = StateUnpickler(io.BytesIO(self.state), {"engine": engine, "strategy": strategy}).load()
+        for name, value in state["engine"].items():
+            setattr(engine, name, value)
+        strategy.__dict__.update(state["strategy"])
+
+
+class CheckpointStore:
+    """按名称保存回测检查点，每个名称一个文件"""
+
+    def __init__(self, root: str = "data/backtest_checkpoints"):
+        self.root = Path(root)
+
+    def get_path(self, name: str) -> Path:
+        return self.root / f"{name}.pkl"
+
+    def get(self, name: str) -> Optional[BacktestCheckpoint]:
+        """读取检查点，不存在、已损坏或格式版本不同时返回None"""
+        try:
+            with open(self.get_path(name), "rb") as f:
+                checkpoint = pickle.load(f)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+            return None
+
+        if not isinstance(checkpoint, BacktestCheckpoint) or checkpoint.version != CHECKPOINT_VERSION:
+            return None
+        return checkpoint
+
+    def put(self, name: str, checkpoint: BacktestCheckpoint):
+        path = self.get_path(name)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+        # 先写临时文件再替换，中途退出不会留下写了一半的检查点
+        tmp_path = path.with_name(f"{name}.{os.getpid()}.tmp")
+        with open(tmp_path, "wb") as f:
+            pickle.dump(checkpoint, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)
+
+    def delete(self, name: str):
+        self.get_path(name).unlink(missing_ok=True)
@@ -0,0 +1,198 @@
+import itertools
+import logging
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from src.backtest.result_cache import CachedResult, ResultCache, make_key
+from src.backtest.statistics import BacktestStatistics
+from src.data.bar_store import BarStore
+from src.data.resample import BASE_INTERVAL, BarResampler
+
+# 工作进程内的全局状态，由 _init_worker 在进程启动时设置一次
+_worker_state: Dict = {}
+
+
+def generate_settings(grid: Dict[str, List]) -> List[Dict]:
+    """
+    展开参数网格
+
+    同时给出 fast_window 和 slow_window 时，跳过 fast_window >= slow_window 的组合。
+    """
+    names = list(grid.keys())
+    settings = []
+    for values in itertools.product(*(grid[name] for name in names)):
+        setting = dict(zip(names, values))
+        if "fast_window" in setting and "slow_window" in setting:
+            if setting["fast_window"] >= setting["slow_window"]:
+                continue
+        settings.append(setting)
+    return settings
+
+
+def rank_results(results: List[Tuple[Dict, Optional[BacktestStatistics]]],
+                 target: str) -> List[Tuple[Dict, Optional[BacktestStatistics]]]:
+    """按目标指标从高到低排序，没有成交的结果排在最后"""
+    return sorted(
+        results,
+        key=lambda result: getattr(result[1], target) if result[1] else float("-inf"),
+        reverse=True
+    )
+
+
+def iter_cached_results(cache: ResultCache, cache_parts: Dict, settings: List[Dict],
+                        misses: List[Dict]) -> Iterator[Tuple[Dict, Optional[BacktestStatistics]]]:
+    """返回缓存中已有的结果，未命中的参数组加入 misses"""
+    for setting in settings:
+        cached = cache.get(make_key(**cache_parts, setting=setting))
+        if cached is None:
+            misses.append(setting)
+        else:
+            statistics = cached.statistics
+            yield setting, BacktestStatistics(**statistics) if statistics else None
+
+
+def _init_worker(store_path: str, symbol: str, start: datetime, end: datetime,
+                 mode: str, engine_setting: Dict, strategy_class, interval: str):
+    """
+    工作进程初始化
+
+    K线以内存映射方式从本地存储打开，各进程共享操作系统页缓存，
+    任务本身只传递参数字典。
+    """
+    _worker_state["mode"] = mode
+    _worker_state["symbol"] = symbol
+    _worker_state["start"] = start
+    _worker_state["end"] = end
+    _worker_state["strategy_class"] = strategy_class
+    _worker_state["interval"] = interval
+
+    if mode == "vectorized":
+        from src.backtest.vectorized import VectorizedBacktester
+        _worker_state["data"] = BarResampler(BarStore(store_path)).load(symbol, interval, start, end)
+        _worker_state["backtester"] = VectorizedBacktester(**engine_setting)
+    else:
+        from src.backtest.backtest_engine import BacktestEngine
+        engine = BacktestEngine(
+            data_source="store", store_path=store_path,
+            log_levels={"engine": logging.WARNING}, quiet=True, log_to_file=False
+        )
+        engine.set_engine_parameters(engine_setting)
+        _worker_state["engine"] = engine
+        _worker_state["bars"] = engine.load_bar_data(symbol, start, end, interval)
+
+
+def _run_setting(setting: Dict) -> Tuple[Dict, Optional[BacktestStatistics]]:
+    """在工作进程中运行一组参数"""
+    if _worker_state["mode"] == "vectorized":
+        result = _worker_state["backtester"].run(_worker_state["data"], setting)
+        return setting, result.statistics
+
+    engine = _worker_state["engine"]
+    df = engine.run_backtest(
+        _worker_state["strategy_class"],
+        setting,
+        _worker_state["symbol"],
+        _worker_state["start"],
+        _worker_state["end"],
+        bars=_worker_state["bars"],
+        interval=_worker_state["interval"]
+    )
+    if df is None:
+        return setting, None
+    return setting, engine.calculate_performance()
+
+
+class ParameterOptimizer:
+    """
+    多进程参数优化
+
+    K线只加载一次并写入本地列式存储，工作进程通过内存映射只读共享，
+    不随任务序列化传输；结果按完成顺序流式返回。
+    """
+
+    def __init__(
+        self,
+        store_path: str,
+        symbol: str,
+        start: datetime,
+        end: datetime,
+        mode: str = "vectorized",
+        engine_setting: Dict = None,
+        strategy_class=None,
+        max_workers: int = None,
+        interval: str = BASE_INTERVAL,
+        cache: ResultCache = None,
+        cache_parts: Dict = None
+    ):
+        """
+        cache: 可选，结果缓存；命中的参数组直接返回，不再提交给工作进程
+        cache_parts: 缓存键中除参数以外的部分(策略代码、数据版本等)，见 BacktestEngine.cache_key_parts
+        """
+        if mode not in ("vectorized", "event"):
+            raise ValueError(f"不支持的优化模式: {mode}")
+
+        self.store_path = store_path
+        self.symbol = symbol
+        self.start = start
+        self.end = end
+        self.mode = mode
+        self.engine_setting = engine_setting or {}
+        self.strategy_class = strategy_class
+        self.max_workers = max_workers or os.cpu_count()
+        self.interval = interval
+        self.cache = cache
+        self.cache_parts = cache_parts or {}
+
+    def iter_results(self, settings: List[Dict]) -> Iterator[Tuple[Dict, Optional[BacktestStatistics]]]:
+        """按完成顺序逐个返回 (参数, 统计指标)"""
+        if self.cache is None:
+            yield from self.run_settings(settings)
+            return
+
+        misses = []
+        yield from iter_cached_results(self.cache, self.cache_parts, settings, misses)
+        for setting, statistics in self.run_settings(misses):
+            self.cache.put(
+                make_key(**self.cache_parts, setting=setting),
+                CachedResult(None, None, statistics.to_dict() if statistics else None)
+            )
+            yield setting, statistics
+
+    def run_settings(self, settings: List[Dict]) -> Iterator[Tuple[Dict, Optional[BacktestStatistics]]]:
+        """在进程池中运行参数组，按完成顺序返回"""
+        if not settings:
+            return
+
+        # 在主进程中先刷新重采样缓存，工作进程只读
+        if self.interval != BASE_INTERVAL:
+            BarResampler(BarStore(self.store_path)).refresh(self.symbol, self.interval)
+
+        initargs = (
+            self.store_path,
+            self.symbol,
+            self.start,
+            self.end,
+            self.mode,
+            self.engine_setting,
+            self.strategy_class,
+            self.interval
+        )
+
+        workers = min(self.max_workers, len(settings)) or 1
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=initargs) as executor:
+            # 限制在途任务数量，结果积压不会随参数组数增长
+            pending = set()
+            settings = iter(settings)
+
+            for setting in itertools.islice(settings, workers * 2):
+                pending.add(executor.submit(_run_setting, setting))
+
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+
+                for setting in itertools.islice(settings, len(done)):
+                    pending.add(executor.submit(_run_setting, setting))
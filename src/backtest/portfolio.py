@@ -0,0 +1,279 @@
+import heapq
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from vnpy.trader.constant import Direction
+from vnpy.trader.utility import round_to
+
+from src.backtest.statistics import BacktestStatistics, round_trip_pnl, summarize_statistics
+from src.backtest.vectorized import VectorizedBacktester, first_cross_index, next_true_index
+from src.data.bar_store import BarStore
+from src.data.resample import BASE_INTERVAL, BarResampler
+from src.risk_management.risk_manager import RiskManager
+
+# 同一时刻先撮合已有委托，再处理新信号(与 BacktestingEngine.new_bar 的顺序一致)
+FILL, SIGNAL = 0, 1
+
+
+def _prepare_symbol(store_path: str, symbol: str, interval: str, start: datetime, end: datetime,
+                    setting: Dict, array_size: int) -> Tuple[str, np.ndarray, np.ndarray]:
+    """在工作进程中计算单个品种的开平仓信号"""
+    data = BarResampler(BarStore(store_path)).load(symbol, interval, start, end)
+    backtester = VectorizedBacktester(array_size=array_size)
+    signals = backtester.calculate_signals(np.asarray(data["close"], dtype=np.float64), setting)
+    return symbol, signals["entry"], signals["exit"]
+
+
+class PortfolioResult:
+    """
+    组合回测结果
+
+    trades: 全部成交(datetime/symbol/direction/price/volume)
+    equity: 共享资金池的逐K线盯市权益
+    statistics: 组合权益的收益、回撤与交易指标(按品种划分完整交易)
+    rejected: 被风控或资金不足拒绝的开仓委托数
+    """
+
+    def __init__(self, trades: pd.DataFrame, equity: pd.Series,
+                 statistics: Optional[BacktestStatistics], rejected: int):
+        self.trades = trades
+        self.equity = equity
+        self.statistics = statistics
+        self.rejected = rejected
+
+
+class PortfolioBacktester:
+    """
+    多品种组合回测(HighFrequencyStrategy 逻辑)
+
+    各品种的指标和信号在进程池中并行计算；回放时每个品种是一条按时间排序的事件流
+    (信号、委托成交)，用堆按时间合并，所有品种共用一个资金池，
+    每笔开仓委托都要经过 RiskManager.check_order。
+    撮合规则与 VectorizedBacktester 相同：收盘价挂限价单，之后的K线穿价成交。
+    """
+
+    def __init__(
+        self,
+        store_path: str,
+        symbols: List[str],
+        setting: Dict,
+        risk_manager: RiskManager,
+        capital: float = 1_000_000,
+        rate: float = 0.001,
+        pricetick: float = 0.01,
+        array_size: int = 100,
+        interval: str = BASE_INTERVAL,
+        order_volume: float = None,
+        volume_step: float = 0.0001,
+        max_workers: int = None
+    ):
+        """
+        order_volume: 固定下单数量；为None时按 risk_manager.risk_limit 占当前权益的比例计算
+        volume_step: 按比例计算数量时的最小变动单位
+        """
+        self.store_path = store_path
+        self.symbols = symbols
+        self.setting = setting
+        self.risk_manager = risk_manager
+        self.capital = capital
+        self.rate = rate
+        self.pricetick = pricetick
+        self.array_size = array_size
+        self.interval = interval
+        self.order_volume = order_volume
+        self.volume_step = volume_step
+        self.max_workers = max_workers or os.cpu_count()
+
+    def prepare(self, start: datetime, end: datetime) -> Dict[str, Dict[str, np.ndarray]]:
+        """并行计算各品种信号，K线以内存映射方式打开"""
+        store = BarStore(self.store_path)
+        resampler = BarResampler(store)
+        if self.interval != BASE_INTERVAL:
+            # 先在主进程中刷新重采样缓存，工作进程只读
+            for symbol in self.symbols:
+                resampler.refresh(symbol, self.interval)
+
+        data = {}
+        with ProcessPoolExecutor(min(self.max_workers, len(self.symbols)) or 1) as executor:
+            futures = [
+                executor.submit(
+                    _prepare_symbol, self.store_path, symbol, self.interval,
+                    start, end, self.setting, self.array_size
+                )
+                for symbol in self.symbols
+            ]
+            for future in futures:
+                symbol, entry, exit = future.result()
+                columns = resampler.load(symbol, self.interval, start, end)
+                data[symbol] = {
+                    "datetime": columns["datetime"],
+                    "open": columns["open"],
+                    "high": columns["high"],
+                    "low": columns["low"],
+                    "close": columns["close"],
+                    "next_entry": next_true_index(entry),
+                    "next_exit": next_true_index(exit),
+                }
+        return data
+
+    def run(self, start: datetime, end: datetime) -> PortfolioResult:
+        """运行组合回测"""
+        data = self.prepare(start, end)
+        symbols = [symbol for symbol in self.symbols if len(data[symbol]["datetime"])]
+
+        cash = self.capital
+        reserved = 0.0                      # 未成交买单冻结的资金
+        positions: Dict[str, float] = {}
+        entry_values: Dict[str, float] = {}
+        trades = []
+        rejected = 0
+
+        events = []
+
+        def push(symbol_id: int, ix: int, priority: int, kind: str, price: float = 0, volume: float = 0):
+            symbol = symbols[symbol_id]
+            if ix < len(data[symbol]["datetime"]):
+                heapq.heappush(events, (int(data[symbol]["datetime"][ix]), priority, symbol_id, ix, kind, price, volume))
+
+        def schedule(symbol_id: int, ix: int, kind: str):
+            # 从 ix 开始的下一个开仓/平仓信号
+            next_signal = data[symbols[symbol_id]][f"next_{kind}"]
+            if ix < len(next_signal):
+                push(symbol_id, int(next_signal[ix]), SIGNAL, kind)
+
+        for symbol_id in range(len(symbols)):
+            schedule(symbol_id, 0, "entry")
+
+        while events:
+            _, _, symbol_id, ix, kind, price, volume = heapq.heappop(events)
+            symbol = symbols[symbol_id]
+            columns = data[symbol]
+
+            if kind == "entry":
+                price = round_to(float(columns["close"][ix]), self.pricetick)
+                equity = cash + reserved + sum(entry_values.values())
+
+                if self.order_volume:
+                    volume = self.order_volume
+                else:
+                    target = equity * self.risk_manager.risk_limit / price
+                    volume = math.floor(target / self.volume_step) * self.volume_step
+
+                frozen = price * volume * (1 + self.rate)
+                self.risk_manager.update_capital(equity)
+                if volume <= 0 or frozen > cash or not self.risk_manager.check_order(symbol, price, volume, "buy"):
+                    rejected += 1
+                    schedule(symbol_id, ix + 1, "entry")
+                    continue
+
+                cash -= frozen
+                reserved += frozen
+                # 未成交的买单同样占用持仓名额，避免成交前重复开出超限的仓位
+                self.risk_manager.update_position(symbol, price, volume, "buy")
+                fill_ix = first_cross_index(columns["low"], ix + 1, price, below=True)
+                push(symbol_id, fill_ix, FILL, "buy", price, volume)
+
+            elif kind == "buy":
+                fill_price = min(price, float(columns["open"][ix]))
+                frozen = price * volume * (1 + self.rate)
+                reserved -= frozen
+                cash += frozen - fill_price * volume * (1 + self.rate)
+
+                positions[symbol] = volume
+                entry_values[symbol] = fill_price * volume
+                self.risk_manager.update_position(symbol, fill_price, volume, "buy")
+                trades.append((int(columns["datetime"][ix]), symbol, Direction.LONG, fill_price, volume))
+
+                # 成交当根K线即开始检查平仓信号
+                schedule(symbol_id, ix, "exit")
+
+            elif kind == "exit":
+                price = round_to(float(columns["close"][ix]), self.pricetick)
+                volume = positions[symbol]
+                if not self.risk_manager.check_order(symbol, price, volume, "sell"):
+                    schedule(symbol_id, ix + 1, "exit")
+                    continue
+
+                fill_ix = first_cross_index(columns["high"], ix + 1, price, below=False)
+                push(symbol_id, fill_ix, FILL, "sell", price, volume)
+
+            else:
+                fill_price = max(price, float(columns["open"][ix]))
+                cash += fill_price * volume * (1 - self.rate)
+
+                del positions[symbol]
+                del entry_values[symbol]
+                self.risk_manager.update_position(symbol, fill_price, volume, "sell")
+                trades.append((int(columns["datetime"][ix]), symbol, Direction.SHORT, fill_price, volume))
+
+                schedule(symbol_id, ix, "entry")
+
+        trades = pd.DataFrame(trades, columns=["datetime", "symbol", "direction", "price", "volume"])
+        equity = self.build_equity(data, symbols, trades)
+
+        statistics = None
+        if len(equity) > 1:
+            statistics = self.calculate_statistics(equity, trades)
+        trades["datetime"] = pd.to_datetime(trades["datetime"])
+        return PortfolioResult(trades, equity, statistics, rejected)
+
+    def calculate_statistics(self, equity: pd.Series, trades: pd.DataFrame) -> BacktestStatistics:
+        """组合权益的统计指标，完整交易在各品种内分别按仓位归零划分"""
+        pnl = []
+        for _, symbol_trades in trades.groupby("symbol", sort=False):
+            volume = symbol_trades["volume"].to_numpy(dtype=np.float64)
+            is_long = (symbol_trades["direction"] == Direction.LONG).to_numpy()
+            pnl.append(round_trip_pnl(
+                symbol_trades["price"].to_numpy(dtype=np.float64), np.where(is_long, volume, -volume), self.rate
+            ))
+
+        traded_value = float((trades["price"] * trades["volume"]).sum())
+        return summarize_statistics(
+            equity.index.as_unit("ns").asi8,
+            equity.to_numpy(),
+            self.capital,
+            np.concatenate(pnl) if pnl else np.empty(0),
+            len(trades),
+            traded_value
+        )
+
+    def build_equity(self, data: Dict[str, Dict[str, np.ndarray]], symbols: List[str],
+                     trades: pd.DataFrame) -> pd.Series:
+        """在所有品种K线时间的并集上计算组合盯市权益"""
+        if not symbols:
+            return pd.Series(dtype=float)
+
+        grid = np.unique(np.concatenate([np.asarray(data[symbol]["datetime"]) for symbol in symbols]))
+        n = len(grid)
+
+        volume = trades["volume"].to_numpy(dtype=np.float64)
+        price = trades["price"].to_numpy(dtype=np.float64)
+        is_long = (trades["direction"] == Direction.LONG).to_numpy()
+        signed = np.where(is_long, volume, -volume)
+        grid_index = np.searchsorted(grid, trades["datetime"].to_numpy(dtype=np.int64))
+
+        cash_flow = -signed * price - volume * price * self.rate
+        equity = self.capital + np.cumsum(np.bincount(grid_index, weights=cash_flow, minlength=n))
+
+        for symbol in symbols:
+            mask = (trades["symbol"] == symbol).to_numpy()
+            if not mask.any():
+                continue
+
+            # 收盘价对齐到时间并集，缺失时沿用上一根K线
+            timestamps = np.asarray(data[symbol]["datetime"])
+            positions = np.searchsorted(grid, timestamps)
+            last = np.full(n, -1)
+            last[positions] = np.arange(len(timestamps))
+            last = np.maximum.accumulate(last)
+            close = np.where(last >= 0, np.asarray(data[symbol]["close"])[np.maximum(last, 0)], 0.0)
+
+            pos = np.cumsum(np.bincount(grid_index[mask], weights=signed[mask], minlength=n))
+            equity += pos * close
+
+        return pd.Series(equity, index=pd.to_datetime(grid))
@@ -0,0 +1,234 @@
+import hashlib
+import inspect
+import json
+import os
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+# 回测引擎或缓存格式变化时递增，使旧缓存全部失效
+CACHE_VERSION = 1
+
+# 逐日结果中保存的数值列
+DAILY_COLUMNS = (
+    "close_price", "pre_close", "trade_count", "start_pos", "end_pos", "turnover",
+    "commission", "slippage", "trading_pnl", "holding_pnl", "total_pnl", "net_pnl", "balance"
+)
+
+
+# 源文件指纹缓存：路径 -> ((修改时间, 大小), sha256)
+_file_hashes: Dict[str, Tuple[Tuple[int, int], str]] = {}
+
+
+def file_fingerprint(path: str) -> str:
+    """源文件内容的sha256，文件未修改时直接返回上次的结果"""
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size)
+    cached = _file_hashes.get(path)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    _file_hashes[path] = (signature, digest)
+    return digest
+
+
+def project_modules(names: List[str]) -> List[str]:
+    """names 中的项目内(src.*)模块及其递归引用的项目内模块，按模块名排序"""
+    seen = set()
+    stack = list(names)
+    while stack:
+        name = stack.pop()
+        if name in seen or name.split(".")[0] != "src" or name not in sys.modules:
+            continue
+        seen.add(name)
+        for value in vars(sys.modules[name]).values():
+            # 以 import 引入的模块，或以 from ... import 引入的类和函数所在的模块
+            dependency = value.__name__ if inspect.ismodule(value) else getattr(value, "__module__", None)
+            if isinstance(dependency, str):
+                stack.append(dependency)
+    return sorted(seen)
+
+
+def strategy_fingerprint(strategy_class) -> str:
+    """
+    策略代码指纹
+
+    取策略类及其项目内基类所在的模块，以及这些模块引用的项目内模块(如指标计算)的源文件内容，
+    其中任何代码(包括辅助函数)变化都会改变指纹；
+    vnpy 等第三方代码不计入，依赖版本变化时需要手动清空缓存。
+    """
+    digests = []
+    for name in project_modules([cls.__module__ for cls in strategy_class.__mro__]):
+        try:
+            digests.append(f"{name}:{file_fingerprint(inspect.getsourcefile(sys.modules[name]))}")
+        except (OSError, TypeError):
+            digests.append(name)
+    return hashlib.sha256("\n".join(digests).encode("utf-8")).hexdigest()
+
+
+def make_key(**parts) -> str:
+    """由各组成部分生成缓存键(sha256)"""
+    parts["cache_version"] = CACHE_VERSION
+    text = json.dumps(parts, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CachedResult:
+    """
+    缓存的回测结果
+
+    trades: 成交(datetime/direction/price/volume)，direction 为 1(多)或 -1(空)
+    daily: 逐日盯市结果(不含成交对象列)
+    statistics: BacktestStatistics 的字典形式，没有成交时为None
+    """
+
+    trades: Optional[pd.DataFrame]
+    daily: Optional[pd.DataFrame]
+    statistics: Optional[Dict]
+
+
+class ResultCache:
+    """
+    回测结果的磁盘缓存
+
+    每条结果以缓存键命名保存为一个压缩的 .npz 文件；读取时更新文件修改时间，
+    写入后按修改时间从旧到新淘汰，使总大小不超过 max_bytes、条数不超过 max_entries。
+    """
+
+    def __init__(self, root: str = "data/cache", max_bytes: int = 512 * 1024 * 1024,
+                 max_entries: int = 100_000):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        # 缓存目录的总大小与条数，首次写入时扫描一次，之后增量维护
+        self.total_bytes: Optional[int] = None
+        self.count = 0
+
+    def get_path(self, key: str) -> Path:
+        return self.root / f"{key}.npz"
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        """读取缓存，未命中时返回None"""
+        path = self.get_path(key)
+        try:
+            with np.load(path) as data:
+                arrays = {name: data[name] for name in data.files}
+        except (OSError, ValueError, KeyError):
+            return None
+
+        # 记录最近访问时间，供LRU淘汰
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+
+        trades = None
+        if "trade_datetime" in arrays:
+            trades = pd.DataFrame({
+                "datetime": pd.to_datetime(arrays["trade_datetime"]),
+                "direction": arrays["trade_direction"],
+                "price": arrays["trade_price"],
+                "volume": arrays["trade_volume"],
+            })
+
+        daily = None
+        if "daily_date" in arrays:
+            daily = pd.DataFrame(
+                {name: arrays[f"daily_{name}"] for name in DAILY_COLUMNS if f"daily_{name}" in arrays},
+                index=pd.Index(pd.to_datetime(arrays["daily_date"]).date, name="date")
+            )
+
+        statistics = json.loads(str(arrays["statistics"]))
+        return CachedResult(trades, daily, statistics)
+
+    def put(self, key: str, result: CachedResult):
+        """写入缓存并按需淘汰旧条目"""
+        arrays = {"statistics": np.array(json.dumps(result.statistics))}
+
+        if result.trades is not None:
+            trades = result.trades
+            arrays["trade_datetime"] = pd.to_datetime(trades["datetime"]).to_numpy(dtype="datetime64[ns]").astype(np.int64)
+            arrays["trade_direction"] = trades["direction"].to_numpy(dtype=np.int8)
+            arrays["trade_price"] = trades["price"].to_numpy(dtype=np.float64)
+            arrays["trade_volume"] = trades["volume"].to_numpy(dtype=np.float64)
+
+        if result.daily is not None:
+            daily = result.daily
+            arrays["daily_date"] = pd.to_datetime(pd.Series(daily.index)).to_numpy(dtype="datetime64[ns]").astype(np.int64)
+            for name in DAILY_COLUMNS:
+                if name in daily.columns:
+                    arrays[f"daily_{name}"] = daily[name].to_numpy(dtype=np.float64)
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        if self.total_bytes is None:
+            self.scan()
+
+        path = self.get_path(key)
+        if path.exists():
+            self.total_bytes -= path.stat().st_size
+            self.count -= 1
+
+        # 先写临时文件再替换，并发读取不会看到写了一半的文件
+        tmp_path = path.with_name(f"{key}.{os.getpid()}.tmp.npz")
+        np.savez_compressed(tmp_path, **arrays)
+        os.replace(tmp_path, path)
+
+        self.total_bytes += path.stat().st_size
+        self.count += 1
+        if self.total_bytes > self.max_bytes or self.count > self.max_entries:
+            self.evict()
+
+    def list_entries(self) -> List[Tuple[float, int, Path]]:
+        """全部缓存条目的 (修改时间, 大小, 路径)"""
+        entries = []
+        for path in self.root.glob("*.npz"):
+            if ".tmp" in path.name:
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def scan(self):
+        """重新统计缓存目录的总大小与条数"""
+        entries = self.list_entries()
+        self.total_bytes = sum(size for _, size, _ in entries)
+        self.count = len(entries)
+
+    def evict(self):
+        """按最近访问时间淘汰，留出上限的10%余量，避免之后每次写入都触发淘汰"""
+        entries = self.list_entries()
+        total = sum(size for _, size, _ in entries)
+        count = len(entries)
+        max_bytes = self.max_bytes * 0.9
+        max_entries = int(self.max_entries * 0.9)
+
+        entries.sort(key=lambda entry: entry[0])
+        for _, size, path in entries:
+            if total <= max_bytes and count <= max_entries:
+                break
+            try:
+                path.unlink()
+            except OSError:
+                continue
+            total -= size
+            count -= 1
+
+        self.total_bytes = total
+        self.count = count
+
+    def clear(self):
+        """清空缓存"""
+        for path in self.root.glob("*.npz"):
+            path.unlink(missing_ok=True)
+        self.total_bytes = 0
+        self.count = 0
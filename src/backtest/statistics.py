@@ -0,0 +1,208 @@
+from dataclasses import asdict, dataclass
+from typing import Dict, Optional
+
+import numpy as np
+
+NS_PER_DAY = 86_400 * 1_000_000_000
+
+
+@dataclass
+class BacktestStatistics:
+    """回测统计结果，收益率、回撤、胜率均为百分比"""
+
+    total_bars: int
+    total_days: float
+    capital: float
+    end_balance: float
+    total_return: float
+    annual_return: float
+    sharpe_ratio: float
+    sortino_ratio: float
+    calmar_ratio: float
+    max_drawdown: float
+    max_drawdown_duration: float    # 最长水下时间(天)
+    total_trades: int
+    round_trips: int
+    win_rate: float
+    profit_factor: float
+    turnover: float                 # 累计成交额 / 初始资金
+
+    def to_dict(self) -> Dict[str, float]:
+        return asdict(self)
+
+
+def trade_cash_flow(trade_price: np.ndarray, trade_volume: np.ndarray, rate: float,
+                    size: float = 1, slippage: float = 0) -> np.ndarray:
+    """
+    每笔成交的现金流(含手续费和滑点)
+
+    滑点与 BacktestingEngine 的逐日盯市一致，按每单位成交数量 slippage 计入成本。
+    """
+    value = trade_price * np.abs(trade_volume) * size
+    return -trade_volume * trade_price * size - value * rate - np.abs(trade_volume) * size * slippage
+
+
+def build_equity(
+    close: np.ndarray,
+    trade_index: np.ndarray,
+    trade_price: np.ndarray,
+    trade_volume: np.ndarray,
+    capital: float,
+    rate: float,
+    size: float,
+    slippage: float = 0
+) -> np.ndarray:
+    """
+    由K线收盘价和成交构建逐K线盯市权益
+
+    trade_index 为成交所在K线位置，trade_volume 买入为正、卖出为负。
+    """
+    n = len(close)
+    cash_flow = trade_cash_flow(trade_price, trade_volume, rate, size, slippage)
+
+    cash = capital + np.cumsum(np.bincount(trade_index, weights=cash_flow, minlength=n))
+    pos = np.cumsum(np.bincount(trade_index, weights=trade_volume, minlength=n))
+    return cash + pos * np.asarray(close) * size
+
+
+def round_trip_pnl(trade_price: np.ndarray, trade_volume: np.ndarray,
+                   rate: float, size: float = 1, slippage: float = 0) -> np.ndarray:
+    """以仓位归零划分完整交易，返回每笔完整交易的净盈亏(含手续费和滑点)"""
+    trade_price = np.asarray(trade_price, dtype=np.float64)
+    trade_volume = np.asarray(trade_volume, dtype=np.float64)
+
+    cash_flow = trade_cash_flow(trade_price, trade_volume, rate, size, slippage)
+    closed = np.isclose(np.cumsum(trade_volume), 0)
+
+    round_trips = int(closed.sum())
+    if not round_trips:
+        return np.empty(0)
+    trip_id = np.concatenate([[0], np.cumsum(closed[:-1])])
+    return np.bincount(trip_id, weights=cash_flow)[:round_trips]
+
+
+def calculate_equity_metrics(
+    datetimes: np.ndarray,
+    equity: np.ndarray,
+    capital: float,
+    risk_free: float = 0
+) -> Dict[str, float]:
+    """
+    由逐K线权益计算收益、风险调整收益与回撤指标
+
+    datetimes: K线时间(纳秒时间戳)，年化周期数由K线间隔推算
+    """
+    datetimes = np.asarray(datetimes, dtype=np.int64)
+    equity = np.asarray(equity, dtype=np.float64)
+
+    total_days = (datetimes[-1] - datetimes[0]) / NS_PER_DAY
+    periods_per_year = 365 * NS_PER_DAY / np.median(np.diff(datetimes))
+
+    returns = np.diff(equity) / equity[:-1]
+    excess = returns - risk_free / periods_per_year
+    mean = excess.mean()
+    std = returns.std()
+    downside = np.sqrt(np.mean(np.minimum(excess, 0) ** 2))
+
+    sharpe_ratio = mean / std * np.sqrt(periods_per_year) if std > 0 else 0.0
+    sortino_ratio = mean / downside * np.sqrt(periods_per_year) if downside > 0 else 0.0
+
+    total_return = (equity[-1] / capital - 1) * 100
+    annual_return = total_return * 365 / total_days if total_days > 0 else 0.0
+
+    # 回撤及最长水下时间
+    peak = np.maximum.accumulate(equity)
+    drawdown = (peak - equity) / peak * 100
+    max_drawdown = float(drawdown.max())
+
+    peak_index = np.maximum.accumulate(np.where(equity >= peak, np.arange(len(equity)), 0))
+    max_drawdown_duration = float((datetimes - datetimes[peak_index]).max() / NS_PER_DAY)
+
+    calmar_ratio = annual_return / max_drawdown if max_drawdown > 0 else 0.0
+
+    return {
+        "total_bars": len(datetimes),
+        "total_days": float(total_days),
+        "capital": float(capital),
+        "end_balance": float(equity[-1]),
+        "total_return": float(total_return),
+        "annual_return": float(annual_return),
+        "sharpe_ratio": float(sharpe_ratio),
+        "sortino_ratio": float(sortino_ratio),
+        "calmar_ratio": float(calmar_ratio),
+        "max_drawdown": max_drawdown,
+        "max_drawdown_duration": max_drawdown_duration,
+    }
+
+
+def calculate_statistics(
+    datetimes: np.ndarray,
+    close: np.ndarray,
+    trade_index: np.ndarray,
+    trade_price: np.ndarray,
+    trade_volume: np.ndarray,
+    capital: float,
+    rate: float,
+    size: float = 1,
+    risk_free: float = 0,
+    slippage: float = 0
+) -> Optional[BacktestStatistics]:
+    """
+    一次向量化计算全部回测统计指标
+
+    datetimes: K线时间(纳秒时间戳)
+    close: K线收盘价
+    trade_index/trade_price/trade_volume: 成交所在K线位置、价格、带方向的数量
+    risk_free: 年化无风险利率
+    slippage: 每单位成交数量的滑点成本
+    """
+    datetimes = np.asarray(datetimes, dtype=np.int64)
+    trade_index = np.asarray(trade_index, dtype=np.int64)
+    trade_price = np.asarray(trade_price, dtype=np.float64)
+    trade_volume = np.asarray(trade_volume, dtype=np.float64)
+
+    if len(datetimes) < 2:
+        return None
+
+    equity = build_equity(close, trade_index, trade_price, trade_volume, capital, rate, size, slippage)
+    value = trade_price * np.abs(trade_volume) * size
+    pnl = round_trip_pnl(trade_price, trade_volume, rate, size, slippage)
+    return summarize_statistics(datetimes, equity, capital, pnl, len(trade_index), value.sum(), risk_free)
+
+
+def summarize_statistics(
+    datetimes: np.ndarray,
+    equity: np.ndarray,
+    capital: float,
+    pnl: np.ndarray,
+    total_trades: int,
+    traded_value: float,
+    risk_free: float = 0
+) -> BacktestStatistics:
+    """
+    由逐K线权益和完整交易盈亏汇总全部统计指标
+
+    pnl: 每笔完整交易的净盈亏(见 round_trip_pnl)
+    traded_value: 累计成交额
+    """
+    metrics = calculate_equity_metrics(datetimes, equity, capital, risk_free)
+
+    pnl = np.asarray(pnl, dtype=np.float64)
+    round_trips = len(pnl)
+    if round_trips:
+        profit = pnl[pnl > 0].sum()
+        loss = -pnl[pnl < 0].sum()
+        win_rate = (pnl > 0).sum() / round_trips * 100
+        profit_factor = profit / loss if loss > 0 else float("inf") if profit > 0 else 0.0
+    else:
+        win_rate = 0.0
+        profit_factor = 0.0
+
+    return BacktestStatistics(
+        **metrics,
+        total_trades=int(total_trades),
+        round_trips=round_trips,
+        win_rate=float(win_rate),
+        profit_factor=float(profit_factor),
+        turnover=float(traded_value / capital)
+    )
@@ -0,0 +1,121 @@
+from typing import Dict
+
+import numpy as np
+from vnpy.trader.constant import Direction, Status
+from vnpy_ctastrategy.backtesting import BacktestingEngine
+
+from src.data.bar_array import BarArray
+from src.data.tick_store import TickView, to_datetime
+
+
+class TickReplayer:
+    """
+    Tick级回放
+
+    K线由Tick预先聚合，策略仍在 on_bar 中决策，委托在之后的Tick上按买一卖一价撮合。
+    顺序与 BacktestingEngine.new_tick 配合 BarGenerator 一致：每根K线的第一个Tick先撮合，
+    随后上一根K线走完、推送给 on_bar。
+
+    只有存在活动委托时才需要逐Tick撮合：限价单用向量化查找直接定位第一个可成交的Tick，
+    没有活动委托时整段跳过，因此回放速度主要取决于K线数和成交次数，而非Tick数。
+    存在停止单时退回逐Tick撮合。
+    """
+
+    def __init__(self, engine: BacktestingEngine, ticks: Dict[str, np.ndarray],
+                 bars: BarArray, starts: np.ndarray):
+        self.engine = engine
+        self.timestamps = np.asarray(ticks["datetime"])
+        self.last_price = np.asarray(ticks["last_price"])
+        self.volume = np.asarray(ticks["volume"])
+        self.bid = np.asarray(ticks["bid_price_1"])
+        self.ask = np.asarray(ticks["ask_price_1"])
+        self.bars = bars
+        self.starts = starts
+        self.crossed = 0        # 实际送入引擎撮合的Tick数
+
+    def set_tick(self, ix: int):
+        engine = self.engine
+        engine.tick = TickView(
+            to_datetime(self.timestamps[ix]),
+            float(self.last_price[ix]),
+            float(self.volume[ix]),
+            float(self.bid[ix]),
+            float(self.ask[ix])
+        )
+        engine.datetime = engine.tick.datetime
+
+    def cross(self, ix: int):
+        """用第 ix 个Tick撮合"""
+        self.set_tick(ix)
+        self.engine.cross_limit_order()
+        self.engine.cross_stop_order()
+        self.crossed += 1
+
+    def first_cross(self, lo: int, hi: int) -> int:
+        """[lo, hi) 内第一个能让任一活动限价单成交的Tick位置，没有时返回 hi"""
+        first = hi
+        for order in self.engine.active_limit_orders.values():
+            if order.direction == Direction.LONG:
+                prices = self.ask[lo:first]
+                mask = (prices <= order.price) & (prices > 0)
+            else:
+                prices = self.bid[lo:first]
+                mask = (prices >= order.price) & (prices > 0)
+
+            k = int(mask.argmax()) if len(mask) else 0
+            if len(mask) and mask[k]:
+                first = lo + k
+        return first
+
+    def cross_range(self, lo: int, hi: int):
+        """撮合 [lo, hi) 内的Tick"""
+        engine = self.engine
+        while lo < hi:
+            if not engine.active_limit_orders and not engine.active_stop_orders:
+                return
+
+            # 停止单、刚提交的委托(需推送未成交状态)在下一个Tick上逐个撮合
+            if engine.active_stop_orders or any(
+                order.status == Status.SUBMITTING for order in engine.active_limit_orders.values()
+            ):
+                self.cross(lo)
+                lo += 1
+                continue
+
+            ix = self.first_cross(lo, hi)
+            if ix >= hi:
+                return
+            self.cross(ix)
+            lo = ix + 1
+
+    def close_bar(self, index: int, last_tick: int):
+        """第 index 根K线走完：记录日收盘并推送给策略"""
+        engine = self.engine
+        engine.datetime = to_datetime(self.timestamps[last_tick])
+        engine.update_daily_close(float(self.last_price[last_tick]))
+        if engine.tick is not None:
+            # 策略在收到K线的这个Tick时刻发出委托
+            engine.datetime = engine.tick.datetime
+
+        bar = self.bars[index]
+        engine.bar = bar
+        engine.strategy.on_bar(bar)
+
+    def run(self):
+        """回放全部Tick"""
+        starts = self.starts
+        count = len(self.timestamps)
+
+        for index in range(len(starts)):
+            lo = int(starts[index])
+            hi = int(starts[index + 1]) if index + 1 < len(starts) else count
+
+            # 新K线的第一个Tick先撮合，再结束上一根K线
+            if index:
+                self.cross(lo)
+                self.close_bar(index - 1, lo - 1)
+                lo += 1
+            self.cross_range(lo, hi)
+
+        if len(starts):
+            self.close_bar(len(starts) - 1, count - 1)
@@ -0,0 +1,240 @@
+from datetime import datetime
+from typing import Dict, List, Optional, Union
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from vnpy.trader.constant import Direction
+from vnpy.trader.object import BarData
+from vnpy.trader.utility import round_to
+
+from src.backtest.statistics import BacktestStatistics, build_equity, calculate_statistics
+from src.data.bar_array import BarArray
+from src.data.bar_store import to_datetimes
+from src.strategies.indicators import is_greater, is_less, windowed_rsi_array
+
+
+def bars_to_arrays(bars: Union[BarArray, List[BarData]]) -> Dict[str, np.ndarray]:
+    """将K线转换为列数组，BarArray 直接返回其底层列"""
+    if isinstance(bars, BarArray):
+        return bars.columns
+
+    return {
+        "datetime": pd.to_datetime([bar.datetime for bar in bars]).to_numpy(dtype="datetime64[ns]").astype(np.int64),
+        "open": np.array([bar.open_price for bar in bars], dtype=np.float64),
+        "high": np.array([bar.high_price for bar in bars], dtype=np.float64),
+        "low": np.array([bar.low_price for bar in bars], dtype=np.float64),
+        "close": np.array([bar.close_price for bar in bars], dtype=np.float64),
+        "volume": np.array([bar.volume for bar in bars], dtype=np.float64),
+    }
+
+
+def close_prices(bars: Union[BarArray, List[BarData]]) -> Dict[str, np.ndarray]:
+    """K线的时间与收盘价列，用于计算逐K线盯市权益"""
+    data = bars_to_arrays(bars)
+    return {"datetime": data["datetime"], "close": data["close"]}
+
+
+def rolling_sma(close: np.ndarray, window: int) -> np.ndarray:
+    """滚动均线，前 window-1 个位置为nan"""
+    result = np.full(len(close), np.nan)
+    if len(close) >= window:
+        result[window - 1:] = sliding_window_view(close, window).mean(axis=1)
+    return result
+
+
+def next_true_index(mask: np.ndarray) -> np.ndarray:
+    """对每个位置i，给出 >=i 的第一个True的位置，不存在时为len(mask)"""
+    n = len(mask)
+    index = np.where(mask, np.arange(n), n)
+    return np.minimum.accumulate(index[::-1])[::-1]
+
+
+def first_cross_index(prices: np.ndarray, start: int, price: float, below: bool) -> int:
+    """从start开始查找第一根能成交的K线，不存在时返回len(prices)"""
+    n = len(prices)
+    step = 64
+    while start < n:
+        window = prices[start:start + step]
+        hit = window <= price if below else window >= price
+        if hit.any():
+            return start + int(hit.argmax())
+        start += step
+        step *= 2
+    return n
+
+
+class VectorizedResult:
+    """向量化回测结果"""
+
+    def __init__(self, trades: pd.DataFrame, equity: pd.Series, statistics: Optional[BacktestStatistics]):
+        self.trades = trades
+        self.equity = equity
+        self.statistics = statistics
+
+
+class VectorizedBacktester:
+    """
+    HighFrequencyStrategy 的向量化回测
+
+    指标一次性在整个收盘价数组上计算(与 IncrementalArrayManager 逐根K线的结果一致)，
+    开平仓信号由数组运算得到；
+    状态机只在信号之间跳转(每笔成交一次)，成交规则与 BacktestingEngine
+    的限价单撮合一致：收盘价挂单，下一根及之后的K线穿价成交。
+    """
+
+    def __init__(
+        self,
+        rate: float = 0.001,
+        size: float = 1,
+        pricetick: float = 0.01,
+        capital: float = 1_000_000,
+        array_size: int = 100,
+        slippage: float = 0
+    ):
+        self.rate = rate
+        self.slippage = slippage
+        self.size = size
+        self.pricetick = pricetick
+        self.capital = capital
+        self.array_size = array_size
+
+    def calculate_signals(self, close: np.ndarray, setting: Dict) -> Dict[str, np.ndarray]:
+        """计算指标和开平仓信号"""
+        fast_ma = rolling_sma(close, setting.get("fast_window", 5))
+        slow_ma = rolling_sma(close, setting.get("slow_window", 10))
+        rsi = windowed_rsi_array(close, setting.get("rsi_window", 6), self.array_size)
+
+        # 指标管理器需要 array_size 根K线后才开始产生信号
+        inited = np.zeros(len(close), dtype=bool)
+        inited[self.array_size - 1:] = True
+
+        with np.errstate(invalid="ignore"):
+            # 与策略相同的容差比较，指标的浮点误差不会使两条路径走不同的分支
+            entry = inited & is_less(rsi, setting.get("rsi_entry", 40)) & is_greater(fast_ma, slow_ma)
+            exit = inited & (is_greater(rsi, 50) | is_less(fast_ma, slow_ma))
+
+        return {
+            "fast_ma": fast_ma,
+            "slow_ma": slow_ma,
+            "rsi": rsi,
+            "entry": entry,
+            "exit": exit,
+        }
+
+    def generate_trades(self, data: Dict[str, np.ndarray], signals: Dict[str, np.ndarray]) -> List[tuple]:
+        """按信号跳转状态机，返回 (K线位置, 方向, 价格, 数量) 列表"""
+        open_prices = np.asarray(data["open"])
+        high = np.asarray(data["high"])
+        low = np.asarray(data["low"])
+        close = np.asarray(data["close"])
+        n = len(close)
+
+        next_entry = next_true_index(signals["entry"])
+        next_exit = next_true_index(signals["exit"])
+
+        trades = []
+        ix = 0
+        while ix < n:
+            # 空仓：等待开仓信号，收盘价挂买单
+            signal_ix = next_entry[ix]
+            if signal_ix >= n:
+                break
+            price = round_to(close[signal_ix], self.pricetick)
+            fill_ix = first_cross_index(low, signal_ix + 1, price, below=True)
+            if fill_ix >= n:
+                break
+            trades.append((fill_ix, Direction.LONG, min(price, open_prices[fill_ix]), 1))
+
+            # 持仓：成交当根K线即开始检查平仓信号
+            signal_ix = next_exit[fill_ix]
+            if signal_ix >= n:
+                break
+            price = round_to(close[signal_ix], self.pricetick)
+            fill_ix = first_cross_index(high, signal_ix + 1, price, below=False)
+            if fill_ix >= n:
+                break
+            trades.append((fill_ix, Direction.SHORT, max(price, open_prices[fill_ix]), 1))
+
+            ix = fill_ix
+
+        return trades
+
+    def run(self, data: Dict[str, np.ndarray], setting: Dict) -> VectorizedResult:
+        """运行向量化回测"""
+        close = np.asarray(data["close"], dtype=np.float64)
+        datetimes = pd.DatetimeIndex(np.asarray(data["datetime"]).view("datetime64[ns]"))
+
+        signals = self.calculate_signals(close, setting)
+        trade_list = self.generate_trades(data, signals)
+
+        index = np.array([t[0] for t in trade_list], dtype=np.int64)
+        is_long = np.array([t[1] == Direction.LONG for t in trade_list], dtype=bool)
+        prices = np.array([t[2] for t in trade_list], dtype=np.float64)
+        volumes = np.array([t[3] for t in trade_list], dtype=np.float64)
+
+        trades = pd.DataFrame({
+            "datetime": datetimes[index],
+            "direction": [t[1] for t in trade_list],
+            "price": prices,
+            "volume": volumes,
+        })
+
+        # 逐K线盯市权益与统计指标
+        signed_volumes = np.where(is_long, volumes, -volumes)
+        equity = build_equity(
+            close, index, prices, signed_volumes, self.capital, self.rate, self.size, self.slippage
+        )
+
+        statistics = None
+        if trade_list:
+            statistics = calculate_statistics(
+                np.asarray(data["datetime"]),
+                close,
+                index,
+                prices,
+                signed_volumes,
+                self.capital,
+                self.rate,
+                self.size,
+                slippage=self.slippage
+            )
+        return VectorizedResult(trades, pd.Series(equity, index=datetimes), statistics)
+
+    def cross_check(self, engine, strategy_class, setting: Dict, symbol: str,
+                    start: datetime, end: datetime) -> VectorizedResult:
+        """
+        与事件驱动回测逐笔核对成交
+
+        在同一批K线上分别运行 BacktestEngine.run_backtest 和向量化回测，
+        成交时间、方向、价格、数量任一不一致即抛出 AssertionError。
+        """
+        bars = engine.load_bar_data(symbol, start, end)
+        engine.run_backtest(strategy_class, setting, symbol, start, end, bars=bars)
+        expected = engine.engine.get_all_trades()
+
+        result = self.run(bars_to_arrays(bars), setting)
+        actual = list(zip(
+            to_datetimes(result.trades["datetime"].to_numpy(dtype="datetime64[ns]").astype(np.int64)),
+            result.trades["direction"],
+            result.trades["price"],
+            result.trades["volume"]
+        ))
+
+        for i, (trade, (dt, direction, price, volume)) in enumerate(zip(expected, actual)):
+            if (
+                trade.datetime != dt
+                or trade.direction != direction
+                or abs(trade.price - price) > 1e-9
+                or trade.volume != volume
+            ):
+                raise AssertionError(
+                    f"第{i + 1}笔成交不一致: 事件驱动 {trade.datetime} {trade.direction.value} "
+                    f"{trade.price} x {trade.volume}, 向量化 {dt} {direction.value} {price} x {volume}"
+                )
+
+        if len(expected) != len(actual):
+            raise AssertionError(f"成交笔数不一致: 事件驱动 {len(expected)}, 向量化 {len(actual)}")
+
+        engine.logger.info(f"核对通过，共{len(actual)}笔成交一致")
+        return result
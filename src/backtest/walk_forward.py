@@ -0,0 +1,321 @@
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from vnpy.trader.constant import Direction
+
+from src.backtest.optimizer import rank_results
+from src.backtest.statistics import BacktestStatistics, round_trip_pnl, summarize_statistics
+from src.data.bar_store import BarStore, to_timestamp
+from src.data.resample import BASE_INTERVAL, BarResampler
+from src.utils.log import get_logger
+
+# 工作进程内的全局状态，由 _init_worker 在进程启动时设置一次
+_worker_state: Dict = {}
+
+
+@dataclass
+class WalkForwardFold:
+    """一个滚动窗口：在 [train_start, train_end) 上优化，在 [test_start, test_end) 上检验"""
+
+    index: int
+    train_start: datetime
+    train_end: datetime
+    test_start: datetime
+    test_end: datetime
+
+
+@dataclass
+class WalkForwardResult:
+    """
+    滚动优化结果
+
+    folds: 每个窗口的最优参数与样本内/样本外指标
+    equity: 各样本外区间首尾相接的权益曲线
+    statistics: 拼接后样本外权益的收益与回撤指标，交易指标只统计样本外区间内的成交
+    """
+
+    folds: pd.DataFrame
+    equity: pd.Series
+    statistics: Optional[BacktestStatistics]
+
+
+def split_folds(start: datetime, end: datetime, train_days: int, test_days: int,
+                step_days: int = None) -> List[WalkForwardFold]:
+    """
+    划分滚动窗口
+
+    样本外区间默认首尾相接(step_days = test_days)，最后一个不完整的样本外区间截断到 end。
+    """
+    step = timedelta(days=step_days or test_days)
+    train = timedelta(days=train_days)
+    test = timedelta(days=test_days)
+
+    folds = []
+    train_start = start
+    while train_start + train < end:
+        test_start = train_start + train
+        folds.append(WalkForwardFold(
+            index=len(folds),
+            train_start=train_start,
+            train_end=test_start,
+            test_start=test_start,
+            test_end=min(test_start + test, end)
+        ))
+        train_start += step
+    return folds
+
+
+def _init_worker(store_path: str, symbol: str, interval: str, mode: str,
+                 engine_setting: Dict, strategy_class, settings: List[Dict],
+                 target: str, warmup_bars: int):
+    """
+    工作进程初始化
+
+    整段K线以内存映射方式打开一次，各窗口只在其上切片，不复制也不重复读取。
+    """
+    _worker_state["data"] = BarResampler(BarStore(store_path)).load(symbol, interval)
+    _worker_state["symbol"] = symbol
+    _worker_state["interval"] = interval
+    _worker_state["mode"] = mode
+    _worker_state["settings"] = settings
+    _worker_state["target"] = target
+    _worker_state["warmup_bars"] = warmup_bars
+    _worker_state["strategy_class"] = strategy_class
+    _worker_state["engine_setting"] = engine_setting
+
+    if mode == "vectorized":
+        from src.backtest.vectorized import VectorizedBacktester
+        _worker_state["backtester"] = VectorizedBacktester(**engine_setting)
+    else:
+        from src.backtest.backtest_engine import BacktestEngine
+        engine = BacktestEngine(
+            data_source="store", store_path=store_path,
+            log_levels={"engine": logging.WARNING}, quiet=True, log_to_file=False
+        )
+        engine.set_engine_parameters(engine_setting)
+        _worker_state["engine"] = engine
+
+
+def _slice(start: int, end: int) -> Dict[str, np.ndarray]:
+    """按位置切片K线列数组"""
+    return {name: array[start:end] for name, array in _worker_state["data"].items()}
+
+
+def _evaluate(data: Dict[str, np.ndarray], setting: Dict):
+    """
+    在一段K线上运行一组参数
+
+    返回 (统计指标, 逐K线权益, 成交)，成交为 (时间戳, 价格, 带方向的数量) 三个数组。
+    """
+    if _worker_state["mode"] == "vectorized":
+        result = _worker_state["backtester"].run(data, setting)
+        trades = result.trades
+        volume = trades["volume"].to_numpy(dtype=np.float64)
+        is_long = (trades["direction"] == Direction.LONG).to_numpy()
+        return result.statistics, result.equity, (
+            trades["datetime"].to_numpy(dtype="datetime64[ns]").astype(np.int64),
+            trades["price"].to_numpy(dtype=np.float64),
+            np.where(is_long, volume, -volume),
+        )
+
+    engine = _worker_state["engine"]
+    bars = engine.make_bar_array(_worker_state["symbol"], data, _worker_state["interval"])
+    timestamps = data["datetime"]
+    engine.run_backtest(
+        _worker_state["strategy_class"],
+        setting,
+        _worker_state["symbol"],
+        pd.Timestamp(timestamps[0]).to_pydatetime(),
+        pd.Timestamp(timestamps[-1]).to_pydatetime(),
+        bars=bars,
+        interval=_worker_state["interval"]
+    )
+
+    equity = engine.calculate_equity()
+    if equity is None:
+        # 没有成交，权益保持不变
+        equity = pd.Series(engine.init_capital, index=pd.to_datetime(np.asarray(timestamps)))
+
+    trades = engine.engine.get_all_trades()
+    return engine.calculate_performance(), equity, (
+        np.array([to_timestamp(trade.datetime) for trade in trades], dtype=np.int64),
+        np.array([trade.price for trade in trades], dtype=np.float64),
+        np.array([trade.volume if trade.direction == Direction.LONG else -trade.volume for trade in trades],
+                 dtype=np.float64),
+    )
+
+
+def _test_trades(trades, test_start: int) -> Dict:
+    """
+    样本外区间内的成交数、成交额和完整交易盈亏
+
+    预热区间内开仓、样本外平仓的交易不完整，开头的平仓成交只计入成交数和成交额。
+    """
+    setting = _worker_state["engine_setting"]
+    size = setting.get("size", 1)
+    datetimes, price, volume = trades
+    keep = datetimes >= test_start
+    price, volume = price[keep], volume[keep]
+
+    opened = np.flatnonzero(volume > 0)
+    first = opened[0] if len(opened) else len(volume)
+    pnl = round_trip_pnl(
+        price[first:], volume[first:], setting.get("rate", 0.001), size, setting.get("slippage", 0)
+    )
+    return {
+        "test_trades": len(price),
+        "test_value": float((price * np.abs(volume) * size).sum()),
+        "test_pnl": pnl,
+    }
+
+
+def _run_fold(fold: WalkForwardFold) -> Dict:
+    """在工作进程中完成一个窗口的样本内优化与样本外检验"""
+    timestamps = _worker_state["data"]["datetime"]
+    train_left, train_right, test_left, test_right = np.searchsorted(
+        timestamps,
+        [to_timestamp(fold.train_start), to_timestamp(fold.train_end),
+         to_timestamp(fold.test_start), to_timestamp(fold.test_end)]
+    )
+
+    # 样本内：逐组参数回测，按目标指标选出最优
+    train_data = _slice(train_left, train_right)
+    results = [(setting, _evaluate(train_data, setting)[0]) for setting in _worker_state["settings"]]
+    best_setting, best_statistics = rank_results(results, _worker_state["target"])[0]
+
+    record = {
+        "fold": fold.index,
+        "train_start": fold.train_start,
+        "train_end": fold.train_end,
+        "test_start": fold.test_start,
+        "test_end": fold.test_end,
+        "setting": best_setting,
+        "train_target": getattr(best_statistics, _worker_state["target"]) if best_statistics else None,
+        "test_return": 0.0,
+        "test_trades": 0,
+        "test_value": 0.0,
+        "test_pnl": np.empty(0),
+        "test_returns": None,
+    }
+    if test_right <= test_left:
+        return record
+
+    # 样本外：向前多取预热K线让指标就绪，只统计样本外区间内的权益变化
+    warmup_left = max(0, test_left - _worker_state["warmup_bars"])
+    _, equity, trades = _evaluate(_slice(warmup_left, test_right), best_setting)
+    record.update(_test_trades(trades, int(timestamps[test_left])))
+
+    offset = test_left - warmup_left
+    base = equity.iloc[offset - 1] if offset else equity.iloc[0]
+    test_equity = equity.iloc[offset:]
+    returns = test_equity / test_equity.shift(1, fill_value=base) - 1
+
+    record["test_return"] = float((test_equity.iloc[-1] / base - 1) * 100)
+    record["test_returns"] = returns
+    return record
+
+
+class WalkForwardOptimizer:
+    """
+    并行滚动优化
+
+    历史数据按滚动窗口划分为样本内/样本外区间，每个窗口在样本内优化参数、
+    在紧随其后的样本外区间检验；各窗口在进程池中并行，K线通过本地列式存储的
+    内存映射只加载一次。样本外收益按时间顺序首尾相接，得到一条连续的权益曲线。
+    """
+
+    def __init__(
+        self,
+        store_path: str,
+        symbol: str,
+        settings: List[Dict],
+        target: str = "sharpe_ratio",
+        mode: str = "vectorized",
+        engine_setting: Dict = None,
+        strategy_class=None,
+        interval: str = BASE_INTERVAL,
+        warmup_bars: int = 100,
+        max_workers: int = None
+    ):
+        if mode not in ("vectorized", "event"):
+            raise ValueError(f"不支持的优化模式: {mode}")
+        if target not in BacktestStatistics.__dataclass_fields__:
+            raise ValueError(f"不支持的目标指标: {target}")
+
+        self.store_path = store_path
+        self.symbol = symbol
+        self.settings = settings
+        self.target = target
+        self.mode = mode
+        self.engine_setting = engine_setting or {}
+        self.strategy_class = strategy_class
+        self.interval = interval
+        self.warmup_bars = warmup_bars
+        self.max_workers = max_workers or os.cpu_count()
+        self.capital = self.engine_setting.get("capital", 1_000_000)
+        self.logger = get_logger("engine")
+
+    def run(self, folds: List[WalkForwardFold]) -> WalkForwardResult:
+        """并行运行全部窗口"""
+        if self.interval != BASE_INTERVAL:
+            # 在主进程中先刷新重采样缓存，工作进程只读
+            BarResampler(BarStore(self.store_path)).refresh(self.symbol, self.interval)
+
+        initargs = (
+            self.store_path,
+            self.symbol,
+            self.interval,
+            self.mode,
+            self.engine_setting,
+            self.strategy_class,
+            self.settings,
+            self.target,
+            self.warmup_bars
+        )
+
+        records = []
+        workers = min(self.max_workers, len(folds)) or 1
+        with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=initargs) as executor:
+            futures = [executor.submit(_run_fold, fold) for fold in folds]
+            for future in as_completed(futures):
+                record = future.result()
+                records.append(record)
+                self.logger.info(
+                    "窗口 %s 完成: 最优参数 %s，样本外收益 %.2f%%",
+                    record["fold"], record["setting"], record["test_return"]
+                )
+
+        records.sort(key=lambda record: record["fold"])
+        return self.stitch(records)
+
+    def stitch(self, records: List[Dict]) -> WalkForwardResult:
+        """按时间顺序拼接各窗口的样本外收益"""
+        returns = [record.pop("test_returns") for record in records]
+        returns = [r for r in returns if r is not None and len(r)]
+        pnl = [record.pop("test_pnl") for record in records]
+        traded_value = sum(record.pop("test_value") for record in records)
+
+        folds = pd.DataFrame(records)
+        if not returns:
+            return WalkForwardResult(folds, pd.Series(dtype=float), None)
+
+        returns = pd.concat(returns)
+        equity = self.capital * (1 + returns).cumprod()
+
+        statistics = None
+        if len(equity) > 1:
+            statistics = summarize_statistics(
+                equity.index.as_unit("ns").asi8,
+                equity.to_numpy(),
+                self.capital,
+                np.concatenate(pnl),
+                int(folds["test_trades"].sum()),
+                traded_value
+            )
+        return WalkForwardResult(folds, equity, statistics)
@@ -0,0 +1,165 @@
+from datetime import datetime
+from typing import Dict, Iterator, List, Union
+
+import numpy as np
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import BarData
+
+from src.data.bar_store import BAR_COLUMNS, to_datetimes, to_timestamp
+
+# 逐根遍历时每次批量转换的K线数量
+ITER_CHUNK = 10_000
+
+
+class BarHeader:
+    """一组K线共享的元数据，所有K线视图引用同一个对象"""
+
+    __slots__ = ("symbol", "exchange", "interval", "gateway_name", "vt_symbol")
+
+    def __init__(self, symbol: str, exchange: Exchange = Exchange.LOCAL,
+                 interval: Interval = Interval.MINUTE, gateway_name: str = "BACKTEST"):
+        self.symbol = symbol
+        self.exchange = exchange
+        self.interval = interval
+        self.gateway_name = gateway_name
+        self.vt_symbol = f"{symbol}.{exchange.value}"
+
+
+class BarView:
+    """
+    单根K线的轻量视图
+
+    字段与 BarData 一致，供策略回调和回测引擎撮合使用；
+    symbol/exchange 等元数据从共享的 BarHeader 读取，不在每根K线上重复保存。
+    """
+
+    __slots__ = ("header", "datetime", "open_price", "high_price", "low_price", "close_price", "volume")
+
+    turnover = 0.0
+    open_interest = 0.0
+
+    def __init__(self, header: BarHeader, dt: datetime, open_price: float, high_price: float,
+                 low_price: float, close_price: float, volume: float):
+        self.header = header
+        self.datetime = dt
+        self.open_price = open_price
+        self.high_price = high_price
+        self.low_price = low_price
+        self.close_price = close_price
+        self.volume = volume
+
+    @property
+    def symbol(self) -> str:
+        return self.header.symbol
+
+    @property
+    def exchange(self) -> Exchange:
+        return self.header.exchange
+
+    @property
+    def interval(self) -> Interval:
+        return self.header.interval
+
+    @property
+    def gateway_name(self) -> str:
+        return self.header.gateway_name
+
+    @property
+    def vt_symbol(self) -> str:
+        return self.header.vt_symbol
+
+    def to_bar_data(self) -> BarData:
+        """转换为完整的 BarData 对象"""
+        return BarData(
+            symbol=self.symbol,
+            exchange=self.exchange,
+            datetime=self.datetime,
+            interval=self.interval,
+            volume=self.volume,
+            open_price=self.open_price,
+            high_price=self.high_price,
+            low_price=self.low_price,
+            close_price=self.close_price,
+            gateway_name=self.gateway_name
+        )
+
+    def __repr__(self) -> str:
+        return (
+            f"BarView({self.vt_symbol}, {self.datetime}, o={self.open_price}, h={self.high_price}, "
+            f"l={self.low_price}, c={self.close_price}, v={self.volume})"
+        )
+
+
+class BarArray:
+    """
+    列式K线容器
+
+    datetime(纳秒时间戳)和OHLCV各为一个连续的numpy数组，元数据只保存一份。
+    遍历或按位置取值时才生成 BarView；切片返回共享底层数组的 BarArray。
+    """
+
+    def __init__(self, header: BarHeader, columns: Dict[str, np.ndarray]):
+        self.header = header
+        self.columns = columns
+
+    @classmethod
+    def from_columns(cls, symbol: str, columns: Dict[str, np.ndarray],
+                     interval: Interval = Interval.MINUTE) -> "BarArray":
+        """由列数组(如本地存储的内存映射视图)构建，不复制数据"""
+        return cls(BarHeader(symbol, interval=interval), columns)
+
+    @classmethod
+    def from_bars(cls, bars: List[BarData]) -> "BarArray":
+        """由 BarData 列表构建"""
+        if not bars:
+            raise ValueError("K线列表为空")
+
+        first = bars[0]
+        header = BarHeader(first.symbol, first.exchange, first.interval, first.gateway_name)
+        columns = {
+            "datetime": np.array([to_timestamp(bar.datetime) for bar in bars], dtype=np.int64),
+            "open": np.array([bar.open_price for bar in bars], dtype=np.float64),
+            "high": np.array([bar.high_price for bar in bars], dtype=np.float64),
+            "low": np.array([bar.low_price for bar in bars], dtype=np.float64),
+            "close": np.array([bar.close_price for bar in bars], dtype=np.float64),
+            "volume": np.array([bar.volume for bar in bars], dtype=np.float64),
+        }
+        return cls(header, columns)
+
+    @property
+    def nbytes(self) -> int:
+        """各列占用的字节数"""
+        return sum(self.columns[name].nbytes for name in BAR_COLUMNS)
+
+    def __len__(self) -> int:
+        return len(self.columns["datetime"])
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[BarView, "BarArray"]:
+        if isinstance(index, slice):
+            return BarArray(self.header, {name: array[index] for name, array in self.columns.items()})
+
+        columns = self.columns
+        return BarView(
+            self.header,
+            to_datetimes(columns["datetime"][index:index + 1 or None])[0],
+            float(columns["open"][index]),
+            float(columns["high"][index]),
+            float(columns["low"][index]),
+            float(columns["close"][index]),
+            float(columns["volume"][index])
+        )
+
+    def __iter__(self) -> Iterator[BarView]:
+        """逐根生成K线视图，按块批量转换为Python对象"""
+        header = self.header
+        for i in range(0, len(self), ITER_CHUNK):
+            chunk = {name: array[i:i + ITER_CHUNK] for name, array in self.columns.items()}
+            for values in zip(
+                to_datetimes(chunk["datetime"]),
+                chunk["open"].tolist(),
+                chunk["high"].tolist(),
+                chunk["low"].tolist(),
+                chunk["close"].tolist(),
+                chunk["volume"].tolist()
+            ):
+                yield BarView(header, *values)
@@ -0,0 +1,223 @@
+import json
+import os
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+
+import numpy as np
+import pandas as pd
+
+from src.utils.log import get_logger
+
+logger = get_logger("data")
+
+# 列名与存储类型，datetime 以纳秒时间戳(UTC)保存
+BAR_COLUMNS: Dict[str, type] = {
+    "datetime": np.int64,
+    "open": np.float64,
+    "high": np.float64,
+    "low": np.float64,
+    "close": np.float64,
+    "volume": np.float64,
+}
+
+# meta.json 中保留的最近变更记录条数，供派生数据(如重采样缓存)增量更新
+MAX_CHANGES = 100
+
+
+def to_timestamp(dt) -> int:
+    """将datetime转换为纳秒时间戳"""
+    return int(pd.Timestamp(dt).value)
+
+
+def to_datetimes(timestamps: np.ndarray) -> list:
+    """将纳秒时间戳数组批量转换为datetime列表"""
+    return np.asarray(timestamps).view("datetime64[ns]").astype("datetime64[us]").tolist()
+
+
+class BarStore:
+    """
+    本地列式K线存储
+
+    每个 symbol/interval 一个目录，每列一个 .npy 文件(连续的 float64/int64 数组)，
+    读取时以内存映射方式打开，按时间切片返回视图，不复制磁盘数据。
+
+    每次写入生成带版本号的新列文件(如 close.3.npy)，再替换 meta.json 指向新版本，
+    不覆盖可能仍被内存映射打开的旧文件(Windows 下替换已映射的文件会失败)。
+    之前 load 返回的视图仍指向旧版本的数据，不会看到之后的写入；
+    旧版本文件在下次写入时删除，仍被映射而无法删除的留待以后再清理。
+    """
+
+    def __init__(self, root: str = "data/bars"):
+        self.root = Path(root)
+
+    def get_path(self, symbol: str, interval: str) -> Path:
+        """获取分区目录"""
+        return self.root / symbol / interval
+
+    def get_meta(self, symbol: str, interval: str) -> Optional[Dict]:
+        """读取分区元数据，分区不存在时返回None"""
+        meta_file = self.get_path(symbol, interval) / "meta.json"
+        if not meta_file.exists():
+            return None
+        with open(meta_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    @staticmethod
+    def get_column_file(path: Path, name: str, meta: Dict) -> Path:
+        """列文件路径，早期版本的分区没有 files 字段，列文件不带版本号"""
+        files = meta.get("files")
+        return path / (f"{name}.npy" if files is None else f"{name}.{files}.npy")
+
+    def exists(self, symbol: str, interval: str) -> bool:
+        """分区是否存在"""
+        return self.get_meta(symbol, interval) is not None
+
+    def load(self, symbol: str, interval: str,
+             start: Optional[datetime] = None,
+             end: Optional[datetime] = None) -> Dict[str, np.ndarray]:
+        """
+        加载 [start, end) 区间的K线列数据
+
+        返回的数组是内存映射文件上的切片视图，只读；之后的写入不影响已返回的视图。
+        """
+        path = self.get_path(symbol, interval)
+        meta = self.get_meta(symbol, interval)
+        if meta is None:
+            raise FileNotFoundError(f"本地K线存储中没有 {symbol} {interval} 的数据: {path}")
+
+        columns = {
+            name: np.load(self.get_column_file(path, name, meta), mmap_mode="r")
+            for name in BAR_COLUMNS
+        }
+
+        timestamps = columns["datetime"]
+        left = 0 if start is None else int(np.searchsorted(timestamps, to_timestamp(start), "left"))
+        right = len(timestamps) if end is None else int(np.searchsorted(timestamps, to_timestamp(end), "left"))
+
+        return {name: array[left:right] for name, array in columns.items()}
+
+    def save(self, symbol: str, interval: str, data: Dict[str, np.ndarray],
+             changed_from: Optional[int] = None, extra: Optional[Dict] = None):
+        """
+        整体写入一个分区(覆盖已有数据)
+
+        changed_from: 本次写入中最早发生变化的时间戳，为None时视为全部变化
+        extra: 额外写入元数据的字段
+        """
+        path = self.get_path(symbol, interval)
+        path.mkdir(parents=True, exist_ok=True)
+
+        old_meta = self.get_meta(symbol, interval) or {}
+        version = old_meta.get("version", 0) + 1
+
+        count = len(data["datetime"])
+        new_meta = {"files": version}
+        for name, dtype in BAR_COLUMNS.items():
+            array = np.ascontiguousarray(data[name], dtype=dtype)
+            if len(array) != count:
+                raise ValueError(f"列 {name} 长度({len(array)})与datetime长度({count})不一致")
+
+            # 写入新版本的列文件，先写临时文件再改名，避免中断时留下半个文件
+            column_file = self.get_column_file(path, name, new_meta)
+            tmp_file = column_file.with_name(f"{column_file.name}.tmp")
+            with open(tmp_file, "wb") as f:
+                np.save(f, array)
+            os.replace(tmp_file, column_file)
+
+        timestamps = data["datetime"]
+
+        # 记录每个版本最早变化的位置，全量覆盖记为 None
+        changes = old_meta.get("changes", []) + [[version, changed_from]]
+
+        meta = {
+            "symbol": symbol,
+            "interval": interval,
+            "count": count,
+            "start": int(timestamps[0]) if count else None,
+            "end": int(timestamps[-1]) if count else None,
+            "version": version,
+            "files": version,
+            "changes": changes[-MAX_CHANGES:],
+        }
+        meta.update(extra or {})
+
+        # 元数据替换后新版本才生效，读取方不会看到新旧版本混合的列
+        tmp_file = path / "meta.json.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=4)
+        os.replace(tmp_file, path / "meta.json")
+        self.remove_stale_files(path, meta)
+
+    def remove_stale_files(self, path: Path, meta: Dict):
+        """删除旧版本的列文件，仍被内存映射打开(Windows)的跳过，下次写入时再试"""
+        current = {self.get_column_file(path, name, meta).name for name in BAR_COLUMNS}
+        for file in path.glob("*.npy"):
+            if file.name in current:
+                continue
+            try:
+                file.unlink()
+            except OSError:
+                pass
+
+    def append(self, symbol: str, interval: str, df: pd.DataFrame) -> int:
+        """
+        合并写入一批K线(DataFrame需包含 datetime/open/high/low/close/volume 列)
+
+        与已有数据按时间合并去重(新数据优先)，返回写入后的总条数。
+        写入新版本的列文件，之前 load 返回的视图仍是合并前的数据。
+        """
+        new_data = self.dataframe_to_columns(df)
+
+        if self.exists(symbol, interval):
+            old_data = self.load(symbol, interval)
+            merged = {
+                name: np.concatenate([old_data[name], new_data[name]])
+                for name in BAR_COLUMNS
+            }
+        else:
+            merged = new_data
+
+        # 倒序后取首次出现的位置，使重复时间戳保留新数据
+        timestamps = merged["datetime"][::-1]
+        _, index = np.unique(timestamps, return_index=True)
+        index = len(timestamps) - 1 - index
+
+        data = {name: np.asarray(array)[index] for name, array in merged.items()}
+        changed_from = int(new_data["datetime"].min()) if len(new_data["datetime"]) else None
+        self.save(symbol, interval, data, changed_from)
+        return len(index)
+
+    def import_from_mongo(self, collection, symbol: str, interval: str,
+                          start: Optional[datetime] = None,
+                          end: Optional[datetime] = None) -> int:
+        """从MongoDB的market_data集合导入数据到本地存储"""
+        query = {"symbol": symbol, "interval": interval}
+        if start or end:
+            query["datetime"] = {}
+            if start:
+                query["datetime"]["$gte"] = start
+            if end:
+                query["datetime"]["$lt"] = end
+
+        projection = {"_id": 0, "datetime": 1, "open": 1, "high": 1, "low": 1, "close": 1, "volume": 1}
+        cursor = collection.find(query, projection).sort("datetime", 1)
+        df = pd.DataFrame(list(cursor))
+        if df.empty:
+            logger.info(f"MongoDB中没有 {symbol} {interval} 的数据")
+            return 0
+
+        count = self.append(symbol, interval, df)
+        logger.info(f"已导入 {len(df)} 条数据到本地存储，当前共 {count} 条")
+        return count
+
+    @staticmethod
+    def dataframe_to_columns(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """将DataFrame转换为列数组"""
+        data = {
+            name: df[name].to_numpy(dtype=dtype)
+            for name, dtype in BAR_COLUMNS.items()
+            if name != "datetime"
+        }
+        data["datetime"] = pd.to_datetime(df["datetime"]).to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        return data
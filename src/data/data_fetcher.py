@@ -1,35 +1,59 @@
-from typing import Optional
+import time
+from typing import Dict, Optional
+import numpy as np
 import pandas as pd
 import ccxt
 from datetime import datetime
-from pymongo import MongoClient
+from pymongo import MongoClient, UpdateOne
+from pymongo.errors import BulkWriteError
+from src.data.bar_store import to_datetimes
+from src.data.market_data import bump_data_version, ensure_bar_index
+from src.data.downloader import TIMEFRAME_MS, WindowedDownloader
+from src.data.validator import find_gaps
+from src.utils.log import get_logger
+
+logger = get_logger("data")
+
 
 class DataFetcher:
-    def __init__(self):
+    def __init__(self, exchange=None, checkpoint_dir: str = "data/checkpoints",
+                 max_workers: int = 8, rate_limit: float = 10):
+        """
+        exchange: 可选，ccxt风格的交易所对象，测试时可传入本地替代对象
+        max_workers/rate_limit: 并发下载线程数与每秒请求上限
+        """
         # 配置币安交易所访问
-        self.exchange = ccxt.binance({
-            'timeout': 30000,  # 增加超时时间到30秒
-            'enableRateLimit': True,  # 启用请求频率限制
-            'proxies': {
-                'http': 'http://127.0.0.1:7890',  # 如果使用代理，请修改端口
-                'https': 'http://127.0.0.1:7890'  # 如果使用代理，请修改端口
-            }
-        })
+        if exchange is None:
+            exchange = ccxt.binance({
+                'timeout': 30000,  # 增加超时时间到30秒
+                'enableRateLimit': True,  # 启用请求频率限制
+                'proxies': {
+                    'http': 'http://127.0.0.1:7890',  # 如果使用代理，请修改端口
+                    'https': 'http://127.0.0.1:7890'  # 如果使用代理，请修改端口
+                }
+            })
+        self.exchange = exchange
+        self.downloader = WindowedDownloader(
+            self.exchange,
+            checkpoint_dir=checkpoint_dir,
+            max_workers=max_workers,
+            rate_limit=rate_limit
+        )
         
         # MongoDB连接保持不变
         self.client = MongoClient('localhost', 27017)
         self.db = self.client.crypto_trading
         self.collection = self.db.market_data
-        print("MongoDB数据库初始化成功")
+        logger.info("MongoDB数据库初始化成功")
         
     def fetch_history(self, symbol: str, interval: str, 
                      start_time: str, end_time: Optional[str] = None) -> pd.DataFrame:
         """获取历史K线数据"""
         try:
             # 测试连接
-            print("测试币安API连接...")
+            logger.info("测试币安API连接...")
             self.exchange.load_markets()
-            print("币安API连接成功")
+            logger.info("币安API连接成功")
             
             # 修正符号格式，去掉斜杠
             symbol = symbol.replace("/", "")  # 将 "BTC/USDT" 转换为 "BTCUSDT"
@@ -45,127 +69,164 @@ class DataFetcher:
             }
             
             start_timestamp = int(pd.Timestamp(start_time).timestamp() * 1000)
-            end_timestamp = int(pd.Timestamp(end_time).timestamp() * 1000) if end_time else None
+            end_timestamp = int(pd.Timestamp(end_time).timestamp() * 1000) if end_time else int(time.time() * 1000)
             
-            print(f"开始获取{symbol}的历史数据...")
-            print(f"起始时间: {start_time}")
-            print(f"结束时间: {end_time}")
-            print(f"时间间隔: {interval}")
+            logger.info(f"开始获取{symbol}的历史数据...")
+            logger.info(f"起始时间: {start_time}")
+            logger.info(f"结束时间: {end_time}")
+            logger.info(f"时间间隔: {interval}")
             
             # 计算预期数据量
-            start_dt = pd.Timestamp(start_time)
-            end_dt = pd.Timestamp(end_time)
+            start_dt = pd.Timestamp(start_timestamp, unit='ms')
+            end_dt = pd.Timestamp(end_timestamp, unit='ms')
             days = (end_dt - start_dt).total_seconds() / (24 * 3600)
-            expected_count = int(days * 1440)  # 每天1440条
+            expected_count = (end_timestamp - start_timestamp) // TIMEFRAME_MS[timeframes[interval]]
             
-            print(f"开始时间: {start_dt}")
-            print(f"结束时间: {end_dt}")
-            print(f"时间跨度: {days:.2f}天")
-            print(f"预期数据量: {expected_count}条")
-            
-            all_data = []
-            count = 0
+            logger.info(f"开始时间: {start_dt}")
+            logger.info(f"结束时间: {end_dt}")
+            logger.info(f"时间跨度: {days:.2f}天")
+            logger.info(f"预期数据量: {expected_count}条")
             
+            # 按时间窗口并发下载，已完成的窗口保存检查点，中断后可续传
             try:
-                while True:
-                    # 获取数据
-                    ohlcv = self.exchange.fetch_ohlcv(
-                        symbol,
-                        timeframes[interval],
-                        start_timestamp,
-                        limit=1000
-                    )
-                    
-                    if not ohlcv:
-                        break
-                        
-                    all_data.extend(ohlcv)
-                    count += len(ohlcv)
-                    
-                    if count % 10000 == 0:
-                        print(f"已获取 {count} 条数据...")
-                    
-                    start_timestamp = ohlcv[-1][0] + 1
-                    
-                    if end_timestamp and start_timestamp >= end_timestamp:
-                        break
-                    
-                    self.exchange.sleep(50)  # 避免请求过于频繁
-                    
+                df = self.downloader.download(
+                    symbol,
+                    timeframes[interval],
+                    start_timestamp,
+                    end_timestamp
+                )
             except Exception as e:
-                print(f"获取数据时发生错误: {str(e)}")
+                logger.error(f"获取数据时发生错误: {str(e)}")
                 raise e  # 抛出异常以便调试
             
-            if not all_data:
+            if df.empty:
                 raise Exception("未获取到任何数据")
                 
-            print(f"共获取 {len(all_data)} 条数据")
+            logger.info(f"共获取 {len(df)} 条数据")
             
-            # 转换为DataFrame
-            df = pd.DataFrame(all_data, columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
             df['datetime'] = pd.to_datetime(df['timestamp'], unit='ms')
             
             # 严格过滤时间范围
             df = df[
-                (df['datetime'] >= pd.Timestamp(start_time)) & 
-                (df['datetime'] < pd.Timestamp(end_time))
-            ]
+                (df['datetime'] >= start_dt) & 
+                (df['datetime'] < end_dt)
+            ].reset_index(drop=True)
             
-            print(f"\n过滤后的数据统计:")
-            print(f"开始时间: {df['datetime'].min()}")
-            print(f"结束时间: {df['datetime'].max()}")
-            print(f"数据条数: {len(df)}")
+            logger.info("过滤后的数据统计:")
+            logger.info(f"开始时间: {df['datetime'].min()}")
+            logger.info(f"结束时间: {df['datetime'].max()}")
+            logger.info(f"数据条数: {len(df)}")
             
             # 数据完整性检查
-            if len(all_data) != expected_count:
-                print(f"警告：数据量不符合预期")
-                print(f"预期：{expected_count}条")
-                print(f"实际：{len(all_data)}条")
+            if len(df) != expected_count:
+                logger.warning(f"数据量不符合预期，预期{expected_count}条，实际{len(df)}条")
                 
                 # 检查缺失的时间段
-                time_diff = df['datetime'].diff()
-                gaps = time_diff[time_diff > pd.Timedelta(minutes=1)]
-                if not gaps.empty:
-                    print("\n数据缺失区间:")
-                    for idx in gaps.index:
-                        print(f"从 {df['datetime'][idx-1]} 到 {df['datetime'][idx]}")
+                timestamps = df['datetime'].to_numpy(dtype="datetime64[ns]").astype(np.int64)
+                gap_starts, gap_ends = find_gaps(timestamps, TIMEFRAME_MS[timeframes[interval]] * 1_000_000)
+                if len(gap_starts):
+                    logger.warning(f"数据缺失区间({len(gap_starts)}个):")
+                    for gap_start, gap_end in zip(to_datetimes(gap_starts[:20]), to_datetimes(gap_ends[:20])):
+                        logger.warning(f"从 {gap_start} 到 {gap_end}")
+                    if len(gap_starts) > 20:
+                        logger.warning(f"... 其余 {len(gap_starts) - 20} 个缺口未列出")
             
             return df
         
         except ccxt.RequestTimeout as e:
-            print(f"请求超时: {str(e)}")
-            print("可能需要配置代理或检查网络连接")
+            logger.error(f"请求超时，可能需要配置代理或检查网络连接: {str(e)}")
             raise
         except Exception as e:
-            print(f"获取数据时发生错误: {str(e)}")
+            logger.error(f"获取数据时发生错误: {str(e)}")
             raise
     
-    def save_to_database(self, df: pd.DataFrame, symbol: str, interval: str):
-        """保存数据到MongoDB"""
-        print(f"开始保存{symbol}的数据到数据库...")
-        
-        # 将DataFrame转换为字典列表
-        records = []
-        for _, row in df.iterrows():
-            record = {
+    def save_to_database(self, df: pd.DataFrame, symbol: str, interval: str,
+                         batch_size: int = 10000) -> Dict[str, int]:
+        """
+        保存数据到MongoDB
+
+        按 (symbol, interval, datetime) 唯一索引幂等写入：库中没有的K线批量插入，
+        已有的K线按值更新，重复写入同一批数据不会改变集合。
+        返回 inserted/updated/unchanged 计数。
+        """
+        logger.info(f"开始保存{symbol}的数据到数据库...")
+        self.ensure_indexes()
+
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+        if df.empty:
+            return counts
+
+        # 按列转换，避免逐行iterrows
+        timestamps = pd.to_datetime(df['datetime']).to_numpy(dtype="datetime64[ns]").astype(np.int64)
+        datetimes = to_datetimes(timestamps)
+        columns = [df[name].to_numpy(dtype=np.float64).tolist() for name in ("open", "high", "low", "close", "volume")]
+
+        # 查询库中已存在的时间点，区分插入与更新
+        existing = self.collection.find(
+            {
+                "symbol": symbol,
+                "interval": interval,
+                "datetime": {"$gte": min(datetimes), "$lte": max(datetimes)}
+            },
+            {"_id": 0, "datetime": 1}
+        )
+        existing = np.array(
+            [pd.Timestamp(doc["datetime"]).value for doc in existing],
+            dtype=np.int64
+        )
+        exists = np.isin(timestamps, existing)
+
+        records = [
+            {
                 "symbol": symbol,
-                "datetime": row['datetime'],
                 "interval": interval,
-                "open": float(row['open']),
-                "high": float(row['high']),
-                "low": float(row['low']),
-                "close": float(row['close']),
-                "volume": float(row['volume'])
+                "datetime": dt,
+                "open": open_price,
+                "high": high_price,
+                "low": low_price,
+                "close": close_price,
+                "volume": volume
             }
-            records.append(record)
-            
-            # 每1000条数据保存一次
-            if len(records) >= 1000:
-                self.collection.insert_many(records)
-                print(f"已保存 {len(records)} 条数据...")
-                records = []
-        
-        # 保存剩余数据
-        if records:
-            self.collection.insert_many(records)
-            print(f"已保存剩余 {len(records)} 条数据")
\ No newline at end of file
+            for dt, open_price, high_price, low_price, close_price, volume in zip(datetimes, *columns)
+        ]
+        inserts = [record for record, flag in zip(records, exists) if not flag]
+        updates = [record for record, flag in zip(records, exists) if flag]
+
+        for i in range(0, len(inserts), batch_size):
+            batch = inserts[i:i + batch_size]
+            try:
+                result = self.collection.insert_many(batch, ordered=False)
+                counts["inserted"] += len(result.inserted_ids)
+            except BulkWriteError as e:
+                # 并发写入导致的重复键，改为按值更新
+                counts["inserted"] += e.details["nInserted"]
+                failed = {error["index"] for error in e.details["writeErrors"] if error["code"] == 11000}
+                if len(failed) < len(e.details["writeErrors"]):
+                    raise
+                updates.extend(batch[index] for index in failed)
+
+        for i in range(0, len(updates), batch_size):
+            requests = [
+                UpdateOne(
+                    {"symbol": symbol, "interval": interval, "datetime": record["datetime"]},
+                    {"$set": {name: record[name] for name in ("open", "high", "low", "close", "volume")}},
+                    upsert=True
+                )
+                for record in updates[i:i + batch_size]
+            ]
+            result = self.collection.bulk_write(requests, ordered=False)
+            counts["inserted"] += result.upserted_count
+            counts["updated"] += result.modified_count
+            counts["unchanged"] += result.matched_count - result.modified_count
+
+        if counts["inserted"] or counts["updated"]:
+            bump_data_version(self.collection, symbol, interval)
+
+        logger.info(f"保存完成: 新增 {counts['inserted']} 条, 更新 {counts['updated']} 条, 未变化 {counts['unchanged']} 条")
+        return counts
+
+    def ensure_indexes(self):
+        """确保 market_data 集合有 (symbol, interval, datetime) 唯一索引"""
+        if not getattr(self, "indexes_ready", False):
+            ensure_bar_index(self.collection)
+            self.indexes_ready = True
@@ -0,0 +1,187 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.utils.log import get_logger
+
+logger = get_logger("data")
+
+# 各K线周期对应的毫秒数
+TIMEFRAME_MS = {
+    "1m": 60_000,
+    "5m": 300_000,
+    "15m": 900_000,
+    "1h": 3_600_000,
+    "4h": 14_400_000,
+    "1d": 86_400_000,
+}
+
+
+class TokenBucket:
+    """线程安全的令牌桶限速器"""
+
+    def __init__(self, rate: float, capacity: int = None):
+        """
+        rate: 每秒补充的令牌数(即平均每秒请求数)
+        capacity: 桶容量(允许的瞬时突发请求数)
+        """
+        self.rate = rate
+        self.capacity = capacity or max(int(rate), 1)
+        self.tokens = float(self.capacity)
+        self.timestamp = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, tokens: float = 1):
+        """取得令牌，不足时阻塞等待"""
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.timestamp) * self.rate)
+                self.timestamp = now
+
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+
+            time.sleep(wait)
+
+
+class WindowedDownloader:
+    """
+    分窗口并发下载K线
+
+    时间范围按 limit 根K线切分为相互独立的窗口，多个线程共享一个令牌桶并发请求；
+    每个完成的窗口立即保存到本地，中断后重新运行只下载未完成的窗口。
+    exchange 只需提供 ccxt 风格的 fetch_ohlcv 方法，测试时可替换为本地对象。
+    """
+
+    def __init__(
+        self,
+        exchange,
+        checkpoint_dir: str = "data/checkpoints",
+        max_workers: int = 8,
+        rate_limit: float = 10,
+        limit: int = 1000,
+        max_retries: int = 3,
+        retry_exceptions: Optional[Tuple] = None
+    ):
+        self.exchange = exchange
+        self.checkpoint_dir = Path(checkpoint_dir)
+        self.max_workers = max_workers
+        self.bucket = TokenBucket(rate_limit)
+        self.limit = limit
+        self.max_retries = max_retries
+        if retry_exceptions is None:
+            import ccxt
+
+            retry_exceptions = (ccxt.NetworkError,)
+        self.retry_exceptions = retry_exceptions
+
+    def split_windows(self, start: int, end: int, timeframe: str) -> List[Tuple[int, int]]:
+        """按每窗口 limit 根K线切分 [start, end) 毫秒时间范围"""
+        step = TIMEFRAME_MS[timeframe] * self.limit
+        return [(t, min(t + step, end)) for t in range(start, end, step)]
+
+    def get_checkpoint_path(self, symbol: str, timeframe: str, window: Tuple[int, int]) -> Path:
+        """窗口检查点文件路径"""
+        return self.checkpoint_dir / symbol / timeframe / f"{window[0]}_{window[1]}.npy"
+
+    def fetch_window(self, symbol: str, timeframe: str, window: Tuple[int, int]) -> np.ndarray:
+        """下载单个窗口，返回 (n, 6) 的 [timestamp, open, high, low, close, volume] 数组"""
+        start, end = window
+        step = TIMEFRAME_MS[timeframe]
+        rows = []
+        since = start
+
+        while since < end:
+            for attempt in range(self.max_retries + 1):
+                self.bucket.acquire()
+                try:
+                    ohlcv = self.exchange.fetch_ohlcv(symbol, timeframe, since, limit=self.limit)
+                    break
+                except self.retry_exceptions as e:
+                    if attempt == self.max_retries:
+                        raise
+                    logger.warning(f"窗口 {window} 请求失败，第{attempt + 1}次重试: {str(e)}")
+                    time.sleep(2 ** attempt)
+
+            if not ohlcv:
+                break
+
+            rows.extend(row for row in ohlcv if row[0] < end)
+            since = ohlcv[-1][0] + 1
+            if len(ohlcv) < self.limit or ohlcv[-1][0] + step >= end:
+                break
+
+        return np.array(rows, dtype=np.float64).reshape(-1, 6)
+
+    def save_checkpoint(self, path: Path, data: np.ndarray):
+        """原子写入窗口检查点"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "wb") as f:
+            np.save(f, data)
+        os.replace(tmp_path, path)
+
+    def download_window(self, symbol: str, timeframe: str, window: Tuple[int, int], path: Path) -> np.ndarray:
+        """下载单个窗口并保存检查点(尚未走完的窗口不保存，下次运行需要重新获取)"""
+        data = self.fetch_window(symbol, timeframe, window)
+        if window[1] <= int(time.time() * 1000):
+            self.save_checkpoint(path, data)
+        return data
+
+    def download(self, symbol: str, timeframe: str, start: int, end: int,
+                 keep_checkpoints: bool = False) -> pd.DataFrame:
+        """
+        下载 [start, end) 毫秒时间范围内的K线
+
+        已有检查点的窗口直接从本地读取；全部完成后默认删除本次的检查点。
+        """
+        windows = self.split_windows(start, end, timeframe)
+        paths = {window: self.get_checkpoint_path(symbol, timeframe, window) for window in windows}
+        todo = [window for window in windows if not paths[window].exists()]
+
+        if len(todo) < len(windows):
+            logger.info(f"从检查点恢复 {len(windows) - len(todo)}/{len(windows)} 个窗口")
+        logger.info(f"待下载窗口数: {len(todo)}，并发数: {self.max_workers}")
+
+        results = {}
+        executor = ThreadPoolExecutor(self.max_workers)
+        try:
+            futures = {
+                executor.submit(self.download_window, symbol, timeframe, window, paths[window]): window
+                for window in todo
+            }
+            for future in as_completed(futures):
+                results[futures[future]] = future.result()
+                if len(results) % 50 == 0:
+                    logger.info(f"已下载 {len(results)}/{len(todo)} 个窗口...")
+        except BaseException:
+            # 已完成的窗口都已保存检查点，未开始的直接取消
+            executor.shutdown(wait=True, cancel_futures=True)
+            raise
+        executor.shutdown()
+
+        arrays = [
+            results[window] if window in results else np.load(paths[window])
+            for window in windows
+        ]
+        data = np.concatenate(arrays) if arrays else np.empty((0, 6))
+
+        df = pd.DataFrame(data, columns=["timestamp", "open", "high", "low", "close", "volume"])
+        df["timestamp"] = df["timestamp"].astype(np.int64)
+        df = df.drop_duplicates("timestamp").sort_values("timestamp").reset_index(drop=True)
+
+        if not keep_checkpoints:
+            for path in paths.values():
+                if path.exists():
+                    path.unlink()
+
+        return df
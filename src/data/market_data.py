@@ -0,0 +1,61 @@
+from pymongo import ASCENDING
+from pymongo.errors import DuplicateKeyError, OperationFailure
+
+from src.utils.log import get_logger
+
+logger = get_logger("data")
+
+# market_data 集合的唯一复合索引
+BAR_INDEX_NAME = "symbol_interval_datetime"
+BAR_INDEX_KEYS = [("symbol", ASCENDING), ("interval", ASCENDING), ("datetime", ASCENDING)]
+
+
+def remove_duplicates(collection) -> int:
+    """删除 (symbol, interval, datetime) 重复的K线，每组保留一条，返回删除数量"""
+    pipeline = [
+        {"$group": {
+            "_id": {"symbol": "$symbol", "interval": "$interval", "datetime": "$datetime"},
+            "ids": {"$push": "$_id"},
+            "count": {"$sum": 1}
+        }},
+        {"$match": {"count": {"$gt": 1}}}
+    ]
+
+    removed = 0
+    for group in collection.aggregate(pipeline, allowDiskUse=True):
+        result = collection.delete_many({"_id": {"$in": group["ids"][1:]}})
+        removed += result.deleted_count
+    return removed
+
+
+def ensure_bar_index(collection):
+    """
+    创建 (symbol, interval, datetime) 唯一索引
+
+    集合中已有重复数据时先去重再建索引。
+    """
+    try:
+        collection.create_index(BAR_INDEX_KEYS, name=BAR_INDEX_NAME, unique=True)
+    except (DuplicateKeyError, OperationFailure):
+        removed = remove_duplicates(collection)
+        logger.warning(f"已删除 {removed} 条重复K线")
+        collection.create_index(BAR_INDEX_KEYS, name=BAR_INDEX_NAME, unique=True)
+
+
+# 记录各 symbol/interval 数据版本的集合，K线有写入或修改时版本号加一
+VERSION_COLLECTION = "data_versions"
+
+
+def bump_data_version(collection, symbol: str, interval: str):
+    """K线数据变化后递增版本号"""
+    collection.database[VERSION_COLLECTION].update_one(
+        {"symbol": symbol, "interval": interval},
+        {"$inc": {"version": 1}},
+        upsert=True
+    )
+
+
+def get_data_version(collection, symbol: str, interval: str) -> int:
+    """当前数据版本号，从未记录过时为0"""
+    doc = collection.database[VERSION_COLLECTION].find_one({"symbol": symbol, "interval": interval})
+    return doc["version"] if doc else 0
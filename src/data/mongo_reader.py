@@ -0,0 +1,303 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import bson
+import numpy as np
+from pymongo.errors import PyMongoError
+
+from src.data.bar_store import BAR_COLUMNS, to_datetimes, to_timestamp
+from src.data.downloader import TIMEFRAME_MS
+from src.data.market_data import BAR_INDEX_NAME, ensure_bar_index
+from src.utils.log import get_logger
+
+logger = get_logger("data")
+
+# 默认读取的K线字段
+BAR_FIELDS = tuple(BAR_COLUMNS)
+
+# 定长的BSON类型：类型码 -> numpy格式
+BSON_DOUBLE = 0x01
+BSON_DATETIME = 0x09
+BSON_INT32 = 0x10
+BSON_INT64 = 0x12
+FIXED_TYPES = {
+    BSON_DOUBLE: "<f8",
+    BSON_DATETIME: "<i8",
+    BSON_INT32: "<i4",
+    BSON_INT64: "<i8",
+}
+
+
+def empty_columns(columns: Sequence[str]) -> Dict[str, np.ndarray]:
+    return {name: np.empty(0, dtype=BAR_COLUMNS[name]) for name in columns}
+
+
+def decode_documents(docs: List[Dict], columns: Sequence[str]) -> Dict[str, np.ndarray]:
+    """将已解码的文档转换为列数组，datetime 转为纳秒时间戳"""
+    data = {}
+    for name in columns:
+        values = [doc.get(name) for doc in docs]
+        if name == "datetime":
+            data[name] = np.array(values, dtype="datetime64[ns]").astype(np.int64)
+        else:
+            data[name] = np.array(values, dtype=BAR_COLUMNS[name])
+    return data
+
+
+class RecordLayout:
+    """
+    定长BSON文档的字段布局
+
+    投影后每根K线的字段名、字段顺序和类型都相同时，每个文档的长度固定，
+    一批文档可以直接看作 numpy 结构化数组，各列是原始字节上的视图，无需逐个解码文档。
+    """
+
+    def __init__(self, template: np.ndarray, header: np.ndarray, dtype: np.dtype, kinds: Dict[str, int]):
+        self.size = len(template)
+        self.template = template    # 第一个文档的原始字节
+        self.header = header        # 长度、类型码、字段名、结束符所在的字节位置
+        self.dtype = dtype
+        self.kinds = kinds
+
+    @classmethod
+    def parse(cls, raw: bytes, columns: Sequence[str]) -> Optional["RecordLayout"]:
+        """解析一批文档中第一个文档的布局，含变长字段或缺少字段时返回None"""
+        if len(raw) < 5:
+            return None
+        size = int.from_bytes(raw[:4], "little")
+        if size > len(raw):
+            return None
+
+        is_value = np.zeros(size, dtype=bool)
+        offsets: Dict[str, Tuple[int, int]] = {}
+        pos = 4
+        while pos < size - 1:
+            kind = raw[pos]
+            fmt = FIXED_TYPES.get(kind)
+            name_end = raw.find(b"\x00", pos + 1, size)
+            if fmt is None or name_end < 0:
+                return None
+
+            width = np.dtype(fmt).itemsize
+            offsets[raw[pos + 1:name_end].decode("utf-8")] = (name_end + 1, kind)
+            is_value[name_end + 1:name_end + 1 + width] = True
+            pos = name_end + 1 + width
+
+        if pos != size - 1 or any(name not in offsets for name in columns):
+            return None
+
+        dtype = np.dtype({
+            "names": list(columns),
+            "formats": [FIXED_TYPES[offsets[name][1]] for name in columns],
+            "offsets": [offsets[name][0] for name in columns],
+            "itemsize": size,
+        })
+        template = np.frombuffer(raw, dtype=np.uint8, count=size)
+        kinds = {name: offsets[name][1] for name in columns}
+        return cls(template, np.flatnonzero(~is_value), dtype, kinds)
+
+    def matches(self, raw: bytes) -> bool:
+        """整批文档是否都与该布局一致(逐字节比较长度、类型码和字段名)"""
+        if len(raw) % self.size:
+            return False
+        rows = np.frombuffer(raw, dtype=np.uint8).reshape(-1, self.size)
+        return bool((rows[:, self.header] == self.template[self.header]).all())
+
+    def decode(self, raw: bytes) -> Dict[str, np.ndarray]:
+        """按布局取出各列，datetime 由毫秒转为纳秒"""
+        records = np.frombuffer(raw, dtype=self.dtype)
+        data = {}
+        for name, kind in self.kinds.items():
+            if kind == BSON_DATETIME:
+                data[name] = records[name] * 1_000_000
+            else:
+                data[name] = records[name]
+        return data
+
+
+class MongoBarReader:
+    """
+    MongoDB K线快速读取
+
+    按 (symbol, interval, datetime) 复合索引查询，只投影需要的字段，以大批量取回原始BSON，
+    定长文档直接按结构化数组解码写入预分配的列数组。K线时间对齐周期且索引唯一，
+    每段时间内的K线数不超过 时长/周期，据此预分配；跨度较大时按时间切成几段并行读取，
+    各段写入同一组数组中各自的位置。
+    """
+
+    def __init__(self, collection, batch_size: int = 50_000, max_workers: int = 4,
+                 min_part_rows: int = 100_000):
+        self.collection = collection
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.min_part_rows = min_part_rows      # 每段至少的K线数，跨度更短时不拆分
+        self.hint: Optional[str] = None
+        self.index_checked = False
+        self.layouts: Dict[Tuple[str, ...], RecordLayout] = {}
+
+    def ensure_index(self):
+        """首次读取时创建复合索引，没有权限等原因失败时不指定索引继续查询"""
+        if self.index_checked:
+            return
+        self.index_checked = True
+        try:
+            ensure_bar_index(self.collection)
+            self.hint = BAR_INDEX_NAME
+        except PyMongoError as e:
+            logger.warning(f"创建K线索引失败，将不指定索引查询: {e}")
+
+    def make_query(self, symbol: str, interval: str, start: Optional[datetime],
+                   end: Optional[datetime]) -> Dict:
+        query = {"symbol": symbol, "interval": interval}
+        if start or end:
+            query["datetime"] = {}
+            if start:
+                query["datetime"]["$gte"] = start
+            if end:
+                query["datetime"]["$lt"] = end
+        return query
+
+    def find(self, query: Dict, projection: Dict, sort: List, batch_size: int = 0,
+             limit: int = 0, raw: bool = False):
+        """按时间排序并带索引提示的查询，raw 为 True 时按批返回原始BSON"""
+        find = self.collection.find_raw_batches if raw else self.collection.find
+        cursor = find(query, projection).sort(sort).batch_size(batch_size).limit(limit)
+        if self.hint:
+            cursor = cursor.hint(self.hint)
+        return cursor
+
+    def get_bounds(self, query: Dict) -> Optional[Tuple[int, int]]:
+        """查询范围内第一根和最后一根K线的时间(纳秒)，没有数据时返回None"""
+        bounds = []
+        for direction in (1, -1):
+            docs = list(self.find(query, {"_id": 0, "datetime": 1}, [("datetime", direction)], limit=1))
+            if not docs:
+                return None
+            bounds.append(to_timestamp(docs[0]["datetime"]))
+        return bounds[0], bounds[1]
+
+    def split_range(self, first: int, last: int, interval: str) -> List[Tuple[int, int, int]]:
+        """
+        将 [first, last] 切分为若干段，返回各段的 (起始, 结束, 最多K线数)
+
+        未知周期无法估计K线数时不拆分，最多K线数由 count_documents 得到。
+        """
+        if interval not in TIMEFRAME_MS:
+            # 查询时间精确到微秒，结束时间取最后一根K线之后1微秒
+            return [(first, last + 1000, 0)]
+
+        step = TIMEFRAME_MS[interval] * 1_000_000
+        rows = (last - first) // step + 1
+        parts = int(min(max(rows // self.min_part_rows, 1), self.max_workers))
+        part_rows = -(-rows // parts)
+
+        # 各段按整数个周期划分，最后一段的结束时间晚于最后一根K线
+        return [
+            (first + k * part_rows * step, first + (k + 1) * part_rows * step, min(part_rows, rows - k * part_rows))
+            for k in range(-(-rows // part_rows))
+        ]
+
+    def iter_batches(self, query: Dict, columns: Tuple[str, ...], batch_size: int) -> Iterator[Dict[str, np.ndarray]]:
+        """按时间顺序逐批返回列数组"""
+        projection = {"_id": 0, **{name: 1 for name in columns}}
+        sort = [("datetime", 1)]
+        try:
+            cursor = self.find(query, projection, sort, batch_size, raw=True)
+        except NotImplementedError:
+            # mongomock 等不支持原始BSON批量读取，逐文档解码
+            cursor = None
+
+        if cursor is None:
+            docs = []
+            for doc in self.find(query, projection, sort):
+                docs.append(doc)
+                if len(docs) >= batch_size:
+                    yield decode_documents(docs, columns)
+                    docs = []
+            if docs:
+                yield decode_documents(docs, columns)
+            return
+
+        for raw in cursor:
+            if raw:
+                yield self.decode(raw, columns)
+
+    def decode(self, raw: bytes, columns: Tuple[str, ...]) -> Dict[str, np.ndarray]:
+        """解码一批原始BSON，布局不固定时(如某些字段为整数或空值)退回逐文档解码"""
+        layout = self.layouts.get(columns)
+        if layout is None or not layout.matches(raw):
+            layout = RecordLayout.parse(raw, columns)
+            if layout is None or not layout.matches(raw):
+                return decode_documents(bson.decode_all(raw), columns)
+            self.layouts[columns] = layout
+        return layout.decode(raw)
+
+    def read_part(self, query: Dict, columns: Tuple[str, ...], out: Dict[str, np.ndarray],
+                  offset: int, capacity: int, batch_size: int) -> Tuple[int, List[Dict[str, np.ndarray]]]:
+        """
+        读取一段K线，写入 out 中 [offset, offset + capacity) 的位置
+
+        返回 (写入条数, 超出容量的部分)；K线时间未对齐周期时才会超出。
+        """
+        count = 0
+        overflow = []
+        for chunk in self.iter_batches(query, columns, batch_size):
+            size = len(chunk[columns[0]])
+            take = min(size, capacity - count)
+            for name in columns:
+                out[name][offset + count:offset + count + take] = chunk[name][:take]
+            if take < size:
+                overflow.append({name: np.array(chunk[name][take:], dtype=BAR_COLUMNS[name]) for name in columns})
+            count += take
+        return count, overflow
+
+    def read(self, symbol: str, interval: str, start: Optional[datetime] = None,
+             end: Optional[datetime] = None, columns: Sequence[str] = BAR_FIELDS,
+             batch_size: int = None) -> Dict[str, np.ndarray]:
+        """读取 [start, end) 内的K线列数组，datetime 为纳秒时间戳"""
+        columns = tuple(columns)
+        batch_size = batch_size or self.batch_size
+        self.ensure_index()
+
+        query = self.make_query(symbol, interval, start, end)
+        bounds = self.get_bounds(query)
+        if bounds is None:
+            return empty_columns(columns)
+
+        ranges = self.split_range(*bounds, interval)
+        if not ranges[0][2]:
+            ranges = [(ranges[0][0], ranges[0][1], self.collection.count_documents(query))]
+
+        offsets = np.concatenate([[0], np.cumsum([capacity for _, _, capacity in ranges])])
+        out = {name: np.empty(int(offsets[-1]), dtype=BAR_COLUMNS[name]) for name in columns}
+
+        # 各段按整数个周期划分，最后一段的结束时间可能超出 end，查询条件需与 [start, end) 取交集
+        left = to_timestamp(start) if start else None
+        right = to_timestamp(end) if end else None
+
+        def read_range(ix: int):
+            lo, hi, capacity = ranges[ix]
+            if left is not None:
+                lo = max(lo, left)
+            if right is not None:
+                hi = min(hi, right)
+            part_start, part_end = to_datetimes(np.array([lo, hi], dtype=np.int64))
+            part_query = self.make_query(symbol, interval, part_start, part_end)
+            return self.read_part(part_query, columns, out, int(offsets[ix]), capacity, batch_size)
+
+        if len(ranges) > 1:
+            with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+                results = list(executor.map(read_range, range(len(ranges))))
+        else:
+            results = [read_range(0)]
+
+        # 各段都恰好填满时直接返回，否则拼接各段实际写入的部分
+        if all(count == capacity and not overflow for (count, overflow), (_, _, capacity) in zip(results, ranges)):
+            return out
+
+        pieces = []
+        for ix, (count, overflow) in enumerate(results):
+            pieces.append({name: out[name][offsets[ix]:offsets[ix] + count] for name in columns})
+            pieces.extend(overflow)
+        return {name: np.concatenate([piece[name] for piece in pieces]) for name in columns}
@@ -0,0 +1,131 @@
+from datetime import datetime
+from typing import Dict, Optional
+
+import numpy as np
+
+from src.data.bar_store import BAR_COLUMNS, BarStore
+from src.data.downloader import TIMEFRAME_MS
+
+BASE_INTERVAL = "1m"
+
+
+def resample_bars(data: Dict[str, np.ndarray], interval: str, complete_only: bool = True) -> Dict[str, np.ndarray]:
+    """
+    将1分钟K线列数据聚合为更大周期
+
+    按UTC对齐分桶，K线时间为桶的起始时间。
+    complete_only: 是否丢弃尚未走完的最后一个桶
+    """
+    step = TIMEFRAME_MS[interval] * 1_000_000
+    base_step = TIMEFRAME_MS[BASE_INTERVAL] * 1_000_000
+
+    timestamps = np.asarray(data["datetime"])
+    if not len(timestamps):
+        return {name: np.empty(0, dtype=dtype) for name, dtype in BAR_COLUMNS.items()}
+
+    buckets = timestamps // step * step
+    if complete_only:
+        # 最后一个桶的结束时间晚于最后一根1分钟K线的结束时间，说明还没走完
+        if buckets[-1] + step > timestamps[-1] + base_step:
+            count = int(np.searchsorted(buckets, buckets[-1], "left"))
+            timestamps = timestamps[:count]
+            buckets = buckets[:count]
+            if not count:
+                return {name: np.empty(0, dtype=dtype) for name, dtype in BAR_COLUMNS.items()}
+
+    n = len(timestamps)
+    starts = np.flatnonzero(np.concatenate([[True], buckets[1:] != buckets[:-1]]))
+    ends = np.concatenate([starts[1:], [n]]) - 1
+
+    return {
+        "datetime": buckets[starts],
+        "open": np.asarray(data["open"][:n])[starts],
+        "high": np.maximum.reduceat(data["high"][:n], starts),
+        "low": np.minimum.reduceat(data["low"][:n], starts),
+        "close": np.asarray(data["close"][:n])[ends],
+        "volume": np.add.reduceat(data["volume"][:n], starts),
+    }
+
+
+class BarResampler:
+    """
+    多周期K线物化缓存
+
+    由本地存储中的1分钟K线聚合出 5m/15m/1h/4h/1d 等周期，结果作为独立分区
+    写回同一个 BarStore。缓存记录所基于的1分钟数据版本，1分钟数据更新后，
+    只从最早变化位置所在的桶开始重新聚合，之前的部分保持不变。
+    """
+
+    def __init__(self, store: BarStore):
+        self.store = store
+
+    def get_changed_from(self, base_meta: Dict, cache_meta: Dict) -> Optional[int]:
+        """
+        缓存生成之后1分钟数据最早变化的时间戳
+
+        变更记录不完整或存在全量覆盖时返回None，表示需要全部重建。
+        """
+        changes = [
+            changed_from
+            for version, changed_from in base_meta.get("changes", [])
+            if version > cache_meta["source_version"]
+        ]
+        if len(changes) != base_meta["version"] - cache_meta["source_version"]:
+            return None
+        if any(changed_from is None for changed_from in changes):
+            return None
+        return min(changes)
+
+    def refresh(self, symbol: str, interval: str) -> bool:
+        """
+        确保缓存与1分钟数据一致，返回是否重新计算过
+
+        分区存在但不是由1分钟数据聚合而来(如直接导入的原生数据)时不做处理。
+        """
+        base_meta = self.store.get_meta(symbol, BASE_INTERVAL)
+        if base_meta is None:
+            raise FileNotFoundError(f"本地K线存储中没有 {symbol} {BASE_INTERVAL} 的数据，无法生成 {interval} K线")
+
+        cache_meta = self.store.get_meta(symbol, interval)
+        if cache_meta is not None:
+            if cache_meta.get("source") != BASE_INTERVAL:
+                return False
+            if cache_meta["source_version"] == base_meta["version"]:
+                return False
+
+        step = TIMEFRAME_MS[interval] * 1_000_000
+        extra = {"source": BASE_INTERVAL, "source_version": base_meta["version"]}
+
+        changed_from = None
+        if cache_meta is not None and cache_meta["count"]:
+            changed_from = self.get_changed_from(base_meta, cache_meta)
+
+        if changed_from is None:
+            data = resample_bars(self.store.load(symbol, BASE_INTERVAL), interval)
+            self.store.save(symbol, interval, data, extra=extra)
+            return True
+
+        # 从变化位置所在的桶(且不晚于缓存的末尾)开始重新聚合，拼接在未变化的前缀之后
+        rebuild_from = min(changed_from // step * step, cache_meta["end"] + step)
+        base = self.store.load(symbol, BASE_INTERVAL)
+        left = int(np.searchsorted(base["datetime"], rebuild_from, "left"))
+        tail = resample_bars({name: array[left:] for name, array in base.items()}, interval)
+
+        cached = self.store.load(symbol, interval)
+        keep = int(np.searchsorted(cached["datetime"], rebuild_from, "left"))
+        data = {
+            name: np.concatenate([cached[name][:keep], tail[name]])
+            for name in BAR_COLUMNS
+        }
+        self.store.save(symbol, interval, data, changed_from=rebuild_from, extra=extra)
+        return True
+
+    def load(self, symbol: str, interval: str,
+             start: Optional[datetime] = None,
+             end: Optional[datetime] = None) -> Dict[str, np.ndarray]:
+        """加载任意周期的K线列数据，缓存过期时先增量更新"""
+        if interval != BASE_INTERVAL:
+            if interval not in TIMEFRAME_MS:
+                raise ValueError(f"不支持的K线周期: {interval}")
+            self.refresh(symbol, interval)
+        return self.store.load(symbol, interval, start, end)
@@ -0,0 +1,93 @@
+import queue
+import threading
+from typing import Dict, Iterable, Iterator, List
+
+import numpy as np
+from vnpy.trader.object import BarData
+
+from src.data.bar_store import to_timestamp
+
+# 队列结束标记
+_END = object()
+
+
+def prefetch(chunks: Iterable[List], depth: int = 2) -> Iterator:
+    """
+    在后台线程中预读数据块，逐条返回块中的元素
+
+    队列最多缓存 depth 个数据块，内存占用与回测区间长度无关；
+    第一块读完即可开始处理，后续数据块在处理期间继续加载。
+    """
+    chunk_queue = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+
+    def put(item) -> bool:
+        # 带超时地入队，消费方提前退出时生产线程能及时结束
+        while not stopped.is_set():
+            try:
+                chunk_queue.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for chunk in chunks:
+                if not put(chunk):
+                    return
+        except Exception as e:
+            put(e)
+            return
+        put(_END)
+
+    thread = threading.Thread(target=produce, daemon=True)
+    thread.start()
+
+    try:
+        while True:
+            chunk = chunk_queue.get()
+            if chunk is _END:
+                break
+            if isinstance(chunk, Exception):
+                raise chunk
+            yield from chunk
+    finally:
+        stopped.set()
+        thread.join()
+
+
+class DailyCloseRecorder:
+    """
+    流式回放时记录每个自然日最后一根K线的收盘价
+
+    逐K线序列不保留在内存中，统计指标改用逐日盯市权益计算。
+    """
+
+    def __init__(self):
+        self.datetimes: List[int] = []
+        self.closes: List[float] = []
+        self.last_bar: BarData = None
+        self.count = 0
+
+    def record(self, bars: Iterable[BarData]) -> Iterator[BarData]:
+        """包装K线迭代器，透传K线的同时记录日收盘"""
+        for bar in bars:
+            if self.last_bar and bar.datetime.date() != self.last_bar.datetime.date():
+                self.add(self.last_bar)
+            self.last_bar = bar
+            self.count += 1
+            yield bar
+
+        if self.last_bar:
+            self.add(self.last_bar)
+
+    def add(self, bar: BarData):
+        self.datetimes.append(to_timestamp(bar.datetime))
+        self.closes.append(bar.close_price)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {
+            "datetime": np.array(self.datetimes, dtype=np.int64),
+            "close": np.array(self.closes, dtype=np.float64),
+        }
@@ -0,0 +1,170 @@
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.data.bar_store import to_datetimes, to_timestamp
+from src.data.downloader import TIMEFRAME_MS
+from src.data.mongo_reader import MongoBarReader
+from src.data.validator import GapIndex, subtract_intervals
+from src.utils.log import get_logger
+
+logger = get_logger("data")
+
+
+def find_missing_ranges(timestamps: np.ndarray, start: int, end: int, step: int) -> List[Tuple[int, int]]:
+    """
+    找出 [start, end) 内缺失的K线区间(纳秒时间戳)
+
+    timestamps 为已有K线的有序时间戳，返回 [(缺口起点, 缺口终点), ...]，终点不含。
+    """
+    timestamps = timestamps[(timestamps >= start) & (timestamps < end)]
+    if not len(timestamps):
+        return [(start, end)] if start < end else []
+
+    # 在首尾加上哨兵，统一用相邻差值找缺口
+    points = np.concatenate([[start - step], timestamps, [end]])
+    diffs = np.diff(points)
+    gap_index = np.flatnonzero(diffs > step)
+
+    return [
+        (int(points[i] + step), int(points[i + 1]))
+        for i in gap_index
+    ]
+
+
+def merge_ranges(ranges: List[Tuple[int, int]], max_distance: int) -> List[Tuple[int, int]]:
+    """合并间隔不超过 max_distance 的相邻区间，减少请求次数"""
+    merged = []
+    for start, end in ranges:
+        if merged and start - merged[-1][1] <= max_distance:
+            merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class IncrementalSync:
+    """
+    增量同步
+
+    读取MongoDB中已有K线的覆盖情况，只下载缺失或有缺口的时间段，
+    可按固定周期循环运行，保持数据库中的数据为最新。
+    K线保存到数据库后才更新缺口索引；交易所也没有数据的区间记入索引，之后的同步不再重复请求。
+    """
+
+    def __init__(self, fetcher, gap_index: GapIndex = None):
+        self.fetcher = fetcher
+        self.collection = fetcher.collection
+        self.downloader = fetcher.downloader
+        self.reader = MongoBarReader(self.collection)
+        self.gap_index = gap_index or GapIndex()
+
+    def get_coverage(self, symbol: str, interval: str, start: datetime, end: datetime) -> np.ndarray:
+        """读取 [start, end) 内已有K线的时间戳(纳秒)"""
+        return self.reader.read(symbol, interval, start, end, columns=["datetime"])["datetime"]
+
+    def get_last_datetime(self, symbol: str, interval: str) -> Optional[datetime]:
+        """数据库中最后一根K线的时间"""
+        doc = self.collection.find_one(
+            {"symbol": symbol, "interval": interval},
+            {"_id": 0, "datetime": 1},
+            sort=[("datetime", -1)]
+        )
+        return doc["datetime"] if doc else None
+
+    def get_sync_end(self, interval: str) -> datetime:
+        """最后一根已走完K线的结束时间(UTC)"""
+        step = TIMEFRAME_MS[interval]
+        now = int(time.time() * 1000) // step * step
+        return pd.Timestamp(now, unit="ms").to_pydatetime()
+
+    def sync(self, symbol: str, interval: str, start: datetime,
+             end: Optional[datetime] = None) -> Dict[str, int]:
+        """只下载并保存 [start, end) 内缺失的K线"""
+        end = end or self.get_sync_end(interval)
+        step = TIMEFRAME_MS[interval] * 1_000_000
+
+        timestamps = self.get_coverage(symbol, interval, start, end)
+        missing = find_missing_ranges(timestamps, to_timestamp(start), to_timestamp(end), step)
+        logger.info(f"{symbol} {interval}: 已有 {len(timestamps)} 条K线，发现 {len(missing)} 个缺口")
+
+        # 跳过之前已确认交易所没有数据的区间
+        empty = self.gap_index.get_empty(symbol, interval)
+        if empty:
+            missing = subtract_intervals(missing, empty)
+            logger.info(f"跳过已确认交易所无数据的区间后剩余 {len(missing)} 个缺口")
+
+        counts = {"inserted": 0, "updated": 0, "unchanged": 0}
+        if not missing:
+            return counts
+
+        # 相距不到一页的缺口合并为一次请求
+        ranges = merge_ranges(missing, step * self.downloader.limit)
+        frames = []
+        for range_start, range_end in ranges:
+            range_dates = to_datetimes(np.array([range_start, range_end]))
+            logger.info(f"补齐区间: {range_dates[0]} 到 {range_dates[1]}")
+            df = self.downloader.download(
+                symbol,
+                interval,
+                range_start // 1_000_000,
+                range_end // 1_000_000
+            )
+            frames.append(df)
+
+        df = pd.concat(frames, ignore_index=True)
+        downloaded = np.sort(df["timestamp"].to_numpy(dtype=np.int64)) * 1_000_000
+        # 库中或本次下载中最后一根K线的时间，早于它的缺失区间不会是交易所尚未生成的数据
+        latest = max(timestamps[-1] if len(timestamps) else 0, downloaded[-1] if len(downloaded) else 0)
+        if df.empty:
+            logger.info("交易所在缺口区间内没有数据")
+        else:
+            df["datetime"] = pd.to_datetime(df["timestamp"], unit="ms")
+            counts = self.fetcher.save_to_database(df, symbol, interval)
+
+        # 保存成功后才更新索引，保存失败时缺口仍留在索引中，下次同步重新补齐
+        self.update_gap_index(symbol, interval, missing, downloaded, step, latest)
+        return counts
+
+    def update_gap_index(self, symbol: str, interval: str, missing: List[Tuple[int, int]],
+                         downloaded: np.ndarray, step: int, latest: int):
+        """
+        下载的K线补齐了缺口时从索引中去掉
+
+        下载后仍缺失、且早于 latest 的区间记为交易所无数据；
+        latest 之后的区间可能只是交易所尚未生成，不做记录。
+        """
+        unfilled = []
+        for range_start, range_end in missing:
+            unfilled.extend(find_missing_ranges(downloaded, range_start, range_end, step))
+        self.gap_index.fill(symbol, interval, subtract_intervals(missing, unfilled))
+
+        empty = [gap for gap in unfilled if gap[1] <= latest]
+        if empty:
+            logger.info(f"交易所在 {len(empty)} 个区间内没有数据，已记入缺口索引")
+            self.gap_index.mark_empty(symbol, interval, empty)
+
+    def run_forever(self, symbol: str, interval: str, start: Optional[datetime] = None, every: int = 3600):
+        """
+        定时同步
+
+        首次运行检查 start 以来的全部缺口(不指定时从库中最后一根K线开始)，
+        之后每 every 秒只从上次同步的终点补到最新。
+        """
+        sync_start = start or self.get_last_datetime(symbol, interval)
+        if sync_start is None:
+            raise ValueError(f"数据库中没有 {symbol} {interval} 的数据，请指定起始时间")
+
+        while True:
+            try:
+                end = self.get_sync_end(interval)
+                self.sync(symbol, interval, sync_start, end)
+                sync_start = end
+            except Exception as e:
+                logger.error(f"同步失败，下次重试: {str(e)}")
+
+            logger.info(f"下次同步在 {every} 秒后")
+            time.sleep(every)
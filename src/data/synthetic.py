@@ -0,0 +1,76 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+
+def generate_bars(
+    n: int,
+    start: datetime = datetime(2024, 1, 1),
+    seed: int = 42,
+    price: float = 42000.0,
+    volatility: float = 0.0006,
+    pricetick: float = 0.01
+) -> pd.DataFrame:
+    """
+    生成确定性的类BTC 1分钟K线
+
+    收盘价为几何布朗运动，每分钟对数收益率标准差为 volatility(约对应年化80%)；
+    开盘价为上一根收盘价加小幅跳空，高低价在开收盘价之外随机延伸，成交量服从对数正态分布。
+    相同参数总是得到相同的数据。
+    """
+    rng = np.random.default_rng(seed)
+
+    log_returns = rng.normal(0, volatility, n)
+    close = price * np.exp(np.cumsum(log_returns))
+    open_ = np.concatenate([[price], close[:-1]]) * (1 + rng.normal(0, volatility / 10, n))
+
+    body_high = np.maximum(open_, close)
+    body_low = np.minimum(open_, close)
+    high = body_high * (1 + np.abs(rng.normal(0, volatility / 2, n)))
+    low = body_low * (1 - np.abs(rng.normal(0, volatility / 2, n)))
+
+    def round_price(values: np.ndarray) -> np.ndarray:
+        return np.round(values / pricetick) * pricetick
+
+    return pd.DataFrame({
+        "datetime": pd.date_range(start, periods=n, freq="1min"),
+        "open": round_price(open_),
+        "high": round_price(high),
+        "low": round_price(low),
+        "close": round_price(close),
+        "volume": np.round(rng.lognormal(1.0, 1.0, n), 4),
+    })
+
+
+def generate_ticks(
+    n: int,
+    start: datetime = datetime(2024, 1, 1),
+    seed: int = 42,
+    price: float = 42000.0,
+    volatility: float = 0.00005,
+    pricetick: float = 0.01,
+    mean_interval_ms: float = 200.0
+) -> pd.DataFrame:
+    """
+    生成确定性的类BTC逐笔Tick
+
+    Tick间隔服从指数分布(毫秒精度)，最新价为几何布朗运动，每笔对数收益率标准差为 volatility；
+    买一卖一价在最新价两侧相差1~3个 pricetick，成交量服从对数正态分布。相同参数总是得到相同的数据。
+    """
+    rng = np.random.default_rng(seed)
+
+    intervals = np.maximum(np.round(rng.exponential(mean_interval_ms, n)), 1).astype(np.int64)
+    timestamps = pd.Timestamp(start).value + np.cumsum(intervals) * 1_000_000
+
+    last_price = np.round(price * np.exp(np.cumsum(rng.normal(0, volatility, n))) / pricetick) * pricetick
+    bid_price = last_price - rng.integers(0, 2, n) * pricetick
+    ask_price = bid_price + rng.integers(1, 3, n) * pricetick
+
+    return pd.DataFrame({
+        "datetime": pd.to_datetime(timestamps),
+        "last_price": last_price,
+        "volume": np.round(rng.lognormal(-3.0, 1.0, n), 4),
+        "bid_price_1": bid_price,
+        "ask_price_1": ask_price,
+    })
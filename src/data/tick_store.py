@@ -0,0 +1,257 @@
+import json
+import zlib
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.data.bar_store import BAR_COLUMNS, to_timestamp
+from src.data.downloader import TIMEFRAME_MS
+
+# 列名与内存中的类型，datetime 为纳秒时间戳(UTC)
+TICK_COLUMNS: Dict[str, type] = {
+    "datetime": np.int64,
+    "last_price": np.float64,
+    "volume": np.float64,
+    "bid_price_1": np.float64,
+    "ask_price_1": np.float64,
+}
+PRICE_COLUMNS = ("last_price", "bid_price_1", "ask_price_1")
+
+# 每个分块文件的最大Tick数
+CHUNK_TICKS = 1_000_000
+
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_datetime(timestamp: int) -> datetime:
+    """将纳秒时间戳转换为datetime(微秒精度)"""
+    return EPOCH + timedelta(microseconds=int(timestamp) // 1000)
+
+
+def step_decimals(step: float) -> int:
+    """最小变动单位对应的小数位数，用于还原整数编码后消除浮点误差"""
+    return max(0, int(np.ceil(-np.log10(step))))
+
+
+def encode_integers(values: np.ndarray, delta: bool) -> Tuple[bytes, str, int]:
+    """
+    整数列编码：可选差分，再压缩为能容纳的最小整数类型，最后 zlib 压缩
+
+    返回 (压缩数据, 存储类型, 首个值)；差分时首个值单独保存。
+    """
+    first = int(values[0]) if delta and len(values) else 0
+    if delta:
+        values = np.diff(values)
+
+    dtype = np.int64
+    if len(values):
+        low, high = int(values.min()), int(values.max())
+        for candidate in (np.int8, np.int16, np.int32):
+            info = np.iinfo(candidate)
+            if info.min <= low and high <= info.max:
+                dtype = candidate
+                break
+    return zlib.compress(values.astype(dtype).tobytes(), 1), np.dtype(dtype).name, first
+
+
+def decode_integers(blob: bytes, dtype: str, first: int, delta: bool) -> np.ndarray:
+    """encode_integers 的逆过程"""
+    values = np.frombuffer(zlib.decompress(blob), dtype=dtype).astype(np.int64)
+    if delta:
+        values = np.concatenate([[first], first + np.cumsum(values)])
+    return values
+
+
+class TickView:
+    """回放时传给回测引擎的Tick，只包含撮合用到的字段"""
+
+    __slots__ = ("datetime", "last_price", "volume", "bid_price_1", "ask_price_1")
+
+    def __init__(self, dt: datetime, last_price: float, volume: float,
+                 bid_price_1: float, ask_price_1: float):
+        self.datetime = dt
+        self.last_price = last_price
+        self.volume = volume
+        self.bid_price_1 = bid_price_1
+        self.ask_price_1 = ask_price_1
+
+
+def aggregate_ticks(ticks: Dict[str, np.ndarray], interval: str = "1m") -> Tuple[Dict[str, np.ndarray], np.ndarray]:
+    """
+    将Tick聚合为K线
+
+    按UTC对齐分桶，K线时间为桶的起始时间，没有Tick的桶不生成K线。
+    返回 (K线列数组, 每根K线第一个Tick的位置)。
+    """
+    step = TIMEFRAME_MS[interval] * 1_000_000
+    timestamps = np.asarray(ticks["datetime"])
+    if not len(timestamps):
+        bars = {name: np.empty(0, dtype=dtype) for name, dtype in BAR_COLUMNS.items()}
+        return bars, np.empty(0, dtype=np.int64)
+
+    price = np.asarray(ticks["last_price"])
+    buckets = timestamps // step * step
+    starts = np.flatnonzero(np.concatenate([[True], buckets[1:] != buckets[:-1]]))
+    ends = np.concatenate([starts[1:], [len(timestamps)]]) - 1
+
+    bars = {
+        "datetime": buckets[starts],
+        "open": price[starts],
+        "high": np.maximum.reduceat(price, starts),
+        "low": np.minimum.reduceat(price, starts),
+        "close": price[ends],
+        "volume": np.add.reduceat(np.asarray(ticks["volume"]), starts),
+    }
+    return bars, starts
+
+
+class TickStore:
+    """
+    本地压缩Tick存储
+
+    每个 symbol 一个目录，Tick按时间顺序切分为若干分块文件，每块不超过 CHUNK_TICKS 条。
+    时间戳和价格(按 pricetick 转为整数)差分编码，成交量按 volume_step 转为整数，
+    各列再按取值范围选用最小的整数类型并 zlib 压缩；meta.json 记录各分块的时间范围和列偏移，
+    按时间读取时只解压涉及的分块。
+    """
+
+    def __init__(self, root: str = "data/ticks", pricetick: float = 0.01, volume_step: float = 0.0001):
+        self.root = Path(root)
+        self.pricetick = pricetick
+        self.volume_step = volume_step
+
+    def get_path(self, symbol: str) -> Path:
+        return self.root / symbol
+
+    def get_meta(self, symbol: str) -> Optional[Dict]:
+        """读取元数据，不存在时返回None"""
+        meta_file = self.get_path(symbol) / "meta.json"
+        if not meta_file.exists():
+            return None
+        with open(meta_file, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def append(self, symbol: str, df: pd.DataFrame) -> int:
+        """
+        追加一批Tick(DataFrame需包含 TICK_COLUMNS 各列)
+
+        只保留晚于已有最后一条Tick的数据，返回实际写入的条数。
+        """
+        ticks = self.dataframe_to_columns(df)
+        meta = self.get_meta(symbol) or {
+            "symbol": symbol,
+            "pricetick": self.pricetick,
+            "volume_step": self.volume_step,
+            "count": 0,
+            "chunks": [],
+        }
+        if meta["chunks"]:
+            keep = ticks["datetime"] > meta["chunks"][-1]["end"]
+            ticks = {name: array[keep] for name, array in ticks.items()}
+
+        count = len(ticks["datetime"])
+        if not count:
+            return 0
+
+        path = self.get_path(symbol)
+        path.mkdir(parents=True, exist_ok=True)
+        for start in range(0, count, CHUNK_TICKS):
+            chunk = {name: array[start:start + CHUNK_TICKS] for name, array in ticks.items()}
+            meta["chunks"].append(self.write_chunk(path, meta, chunk))
+        meta["count"] += count
+
+        with open(path / "meta.json", "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=4)
+        return count
+
+    def write_chunk(self, path: Path, meta: Dict, chunk: Dict[str, np.ndarray]) -> Dict:
+        """编码并写入一个分块，返回分块的元数据"""
+        timestamps = chunk["datetime"]
+        encoded = {
+            "datetime": (timestamps, True),
+            "volume": (np.round(chunk["volume"] / meta["volume_step"]).astype(np.int64), False),
+        }
+        for name in PRICE_COLUMNS:
+            encoded[name] = (np.round(chunk[name] / meta["pricetick"]).astype(np.int64), True)
+
+        columns = {}
+        offset = 0
+        blobs = []
+        for name, (values, delta) in encoded.items():
+            blob, dtype, first = encode_integers(values, delta)
+            columns[name] = {"offset": offset, "size": len(blob), "dtype": dtype, "first": first, "delta": delta}
+            offset += len(blob)
+            blobs.append(blob)
+
+        filename = f"{int(timestamps[0])}.tck"
+        with open(path / filename, "wb") as f:
+            f.write(b"".join(blobs))
+
+        return {
+            "file": filename,
+            "start": int(timestamps[0]),
+            "end": int(timestamps[-1]),
+            "count": len(timestamps),
+            "columns": columns,
+        }
+
+    def read_chunk(self, symbol: str, meta: Dict, chunk: Dict) -> Dict[str, np.ndarray]:
+        """读取并解码一个分块"""
+        with open(self.get_path(symbol) / chunk["file"], "rb") as f:
+            raw = f.read()
+
+        data = {}
+        for name, info in chunk["columns"].items():
+            blob = raw[info["offset"]:info["offset"] + info["size"]]
+            values = decode_integers(blob, info["dtype"], info["first"], info["delta"])
+            if name == "datetime":
+                data[name] = values
+            elif name == "volume":
+                data[name] = np.round(values * meta["volume_step"], step_decimals(meta["volume_step"]))
+            else:
+                data[name] = np.round(values * meta["pricetick"], step_decimals(meta["pricetick"]))
+        return data
+
+    def iter_chunks(self, symbol: str, start: Optional[datetime] = None,
+                    end: Optional[datetime] = None) -> Iterator[Dict[str, np.ndarray]]:
+        """按时间顺序逐块读取 [start, end) 内的Tick，内存中只保留当前分块"""
+        meta = self.get_meta(symbol)
+        if meta is None:
+            return
+
+        left = to_timestamp(start) if start else None
+        right = to_timestamp(end) if end else None
+        for chunk in meta["chunks"]:
+            if (left is not None and chunk["end"] < left) or (right is not None and chunk["start"] >= right):
+                continue
+
+            data = self.read_chunk(symbol, meta, chunk)
+            timestamps = data["datetime"]
+            lo = np.searchsorted(timestamps, left, "left") if left is not None else 0
+            hi = np.searchsorted(timestamps, right, "left") if right is not None else len(timestamps)
+            if hi > lo:
+                yield {name: array[lo:hi] for name, array in data.items()}
+
+    def load(self, symbol: str, start: Optional[datetime] = None,
+             end: Optional[datetime] = None) -> Dict[str, np.ndarray]:
+        """读取 [start, end) 内的全部Tick"""
+        chunks = list(self.iter_chunks(symbol, start, end))
+        if not chunks:
+            return {name: np.empty(0, dtype=dtype) for name, dtype in TICK_COLUMNS.items()}
+        return {name: np.concatenate([chunk[name] for chunk in chunks]) for name in TICK_COLUMNS}
+
+    @staticmethod
+    def dataframe_to_columns(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """将DataFrame转换为按时间排序的列数组"""
+        data = {
+            name: df[name].to_numpy(dtype=dtype)
+            for name, dtype in TICK_COLUMNS.items()
+            if name != "datetime"
+        }
+        data["datetime"] = pd.to_datetime(df["datetime"]).to_numpy(dtype="datetime64[ns]").astype(np.int64)
+
+        order = np.argsort(data["datetime"], kind="stable")
+        return {name: array[order] for name, array in data.items()}
@@ -0,0 +1,405 @@
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from src.data.bar_store import BarStore, to_datetimes, to_timestamp
+from src.data.downloader import TIMEFRAME_MS
+
+# 每次校验的K线条数，内存占用与序列总长度无关
+CHUNK_BARS = 5_000_000
+
+# 连续零成交量达到该根数时记为异常
+MIN_ZERO_RUN = 5
+
+# 各类问题记录的样例时间戳个数
+MAX_SAMPLES = 10
+
+Range = Tuple[int, int]
+
+
+def merge_intervals(ranges: List[Range]) -> List[Range]:
+    """合并重叠或相接的 [start, end) 区间"""
+    merged: List[Range] = []
+    for start, end in sorted(ranges):
+        if start >= end:
+            continue
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def subtract_intervals(ranges: List[Range], removed: List[Range]) -> List[Range]:
+    """从 ranges 中去掉 removed 覆盖的部分"""
+    removed = merge_intervals(removed)
+    result = []
+    for start, end in merge_intervals(ranges):
+        for cut_start, cut_end in removed:
+            if cut_end <= start or cut_start >= end:
+                continue
+            if cut_start > start:
+                result.append((start, cut_start))
+            start = max(start, cut_end)
+            if start >= end:
+                break
+        if start < end:
+            result.append((start, end))
+    return result
+
+
+def clip_intervals(ranges: List[Range], start: int, end: int) -> List[Range]:
+    """ranges 与 [start, end) 的交集"""
+    return [(max(s, start), min(e, end)) for s, e in ranges if s < end and e > start]
+
+
+def find_gaps(timestamps: np.ndarray, step: int, previous: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    相邻K线间隔超过一个周期的缺口
+
+    previous 为上一块最后一根K线的时间，用于跨块衔接。返回缺口的 (起点, 终点) 数组，终点不含。
+    """
+    timestamps = np.asarray(timestamps, dtype=np.int64)
+    if not len(timestamps):
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty
+
+    prev = timestamps[0] - step if previous is None else previous
+    diffs = np.diff(timestamps, prepend=prev)
+    index = np.flatnonzero(diffs > step)
+    return timestamps[index] - diffs[index] + step, timestamps[index]
+
+
+@dataclass
+class ValidationReport:
+    """
+    一个 symbol/interval 序列的数据质量检查结果
+
+    时间均为纳秒时间戳；gaps 为 [起点, 终点) 缺口，zero_volume_runs 为 (首根时间, 末根时间, 根数)。
+    """
+
+    symbol: str
+    interval: str
+    count: int = 0
+    first: Optional[int] = None
+    last: Optional[int] = None
+    gaps: List[Range] = field(default_factory=list)
+    missing: int = 0                # 缺口内缺失的K线数
+    duplicates: int = 0             # 与上一根时间相同
+    out_of_order: int = 0           # 早于上一根
+    misaligned: int = 0             # 时间未对齐周期
+    invalid_values: int = 0         # 价格非正、成交量为负或含NaN
+    ohlc_errors: int = 0            # high < low，或开盘/收盘价超出最高最低价
+    zero_volume_runs: List[Tuple[int, int, int]] = field(default_factory=list)
+    samples: Dict[str, List[int]] = field(default_factory=dict)
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return not (self.gaps or self.duplicates or self.out_of_order or self.misaligned
+                    or self.invalid_values or self.ohlc_errors or self.zero_volume_runs)
+
+    def add_samples(self, kind: str, timestamps: np.ndarray):
+        samples = self.samples.setdefault(kind, [])
+        if len(samples) < MAX_SAMPLES:
+            samples.extend(int(ts) for ts in timestamps[:MAX_SAMPLES - len(samples)])
+
+    def summary(self) -> str:
+        if not self.count:
+            return f"{self.symbol} {self.interval}: 没有数据"
+
+        first, last = to_datetimes(np.array([self.first, self.last]))
+        lines = [
+            f"{self.symbol} {self.interval}: {self.count} 条K线，{first} 到 {last}，"
+            f"耗时 {self.seconds:.2f} 秒",
+            f"缺口: {len(self.gaps)} 个，共缺失 {self.missing} 根",
+            f"重复时间: {self.duplicates}，时间倒序: {self.out_of_order}，时间未对齐: {self.misaligned}",
+            f"无效数值: {self.invalid_values}，OHLC不一致: {self.ohlc_errors}",
+            f"连续零成交量(>= {MIN_ZERO_RUN} 根): {len(self.zero_volume_runs)} 段",
+        ]
+        if self.gaps:
+            longest = max(self.gaps, key=lambda gap: gap[1] - gap[0])
+            gap_dates = to_datetimes(np.array(longest))
+            lines.append(f"最长缺口: {gap_dates[0]} 到 {gap_dates[1]}")
+        for kind, samples in self.samples.items():
+            lines.append(f"{kind} 样例: {', '.join(str(dt) for dt in to_datetimes(np.array(samples)))}")
+        return "\n".join(lines)
+
+
+class SeriesValidator:
+    """
+    按块校验一个K线序列
+
+    各项检查对每块做向量化计算，相邻块之间只衔接上一根K线的时间和未结束的零成交量区段，
+    因此可以逐块读取任意长的序列。
+    """
+
+    def __init__(self, symbol: str, interval: str, min_zero_run: int = MIN_ZERO_RUN):
+        self.step = TIMEFRAME_MS[interval] * 1_000_000
+        self.min_zero_run = min_zero_run
+        self.report = ValidationReport(symbol, interval)
+        self.previous: Optional[int] = None
+        # 跨块延续的零成交量区段：(首根时间, 末根时间, 根数)
+        self.zero_run: Optional[List[int]] = None
+        self.started = time.perf_counter()
+
+    def feed(self, data: Dict[str, np.ndarray]):
+        """校验下一块K线(按存储顺序)"""
+        timestamps = np.asarray(data["datetime"], dtype=np.int64)
+        if not len(timestamps):
+            return
+
+        report = self.report
+        step = self.step
+        report.count += len(timestamps)
+        low, high = int(timestamps.min()), int(timestamps.max())
+        report.first = low if report.first is None else min(report.first, low)
+        report.last = high if report.last is None else max(report.last, high)
+
+        # 时间检查
+        prev = timestamps[0] - step if self.previous is None else self.previous
+        diffs = np.diff(timestamps, prepend=prev)
+        self.check(diffs == 0, timestamps, "duplicates")
+        self.check(diffs < 0, timestamps, "out_of_order")
+        self.check(timestamps % step != 0, timestamps, "misaligned")
+
+        gap_index = np.flatnonzero(diffs > step)
+        if len(gap_index):
+            gap_ends = timestamps[gap_index]
+            gap_starts = gap_ends - diffs[gap_index] + step
+            report.gaps.extend(zip(gap_starts.tolist(), gap_ends.tolist()))
+            report.missing += int(((gap_ends - gap_starts) // step).sum())
+        self.previous = int(timestamps[-1])
+
+        # 数值检查
+        open_price = np.asarray(data["open"])
+        high_price = np.asarray(data["high"])
+        low_price = np.asarray(data["low"])
+        close_price = np.asarray(data["close"])
+        volume = np.asarray(data["volume"])
+
+        with np.errstate(invalid="ignore"):
+            invalid = ~(
+                np.isfinite(open_price) & np.isfinite(high_price) & np.isfinite(low_price)
+                & np.isfinite(close_price) & np.isfinite(volume)
+            )
+            invalid |= (np.minimum(np.minimum(open_price, close_price), np.minimum(high_price, low_price)) <= 0)
+            invalid |= volume < 0
+            inconsistent = (
+                (high_price < low_price)
+                | (open_price > high_price) | (open_price < low_price)
+                | (close_price > high_price) | (close_price < low_price)
+            ) & ~invalid
+        self.check(invalid, timestamps, "invalid_values")
+        self.check(inconsistent, timestamps, "ohlc_errors")
+
+        self.check_zero_volume(volume == 0, timestamps)
+
+    def check(self, mask: np.ndarray, timestamps: np.ndarray, kind: str):
+        count = int(np.count_nonzero(mask))
+        if count:
+            setattr(self.report, kind, getattr(self.report, kind) + count)
+            self.report.add_samples(kind, timestamps[mask])
+
+    def check_zero_volume(self, zero: np.ndarray, timestamps: np.ndarray):
+        """找出连续零成交量的区段，块末尾未结束的区段留到下一块继续"""
+        count = len(zero)
+        if not zero.any():
+            self.close_zero_run()
+            return
+
+        edges = np.diff(np.concatenate([[0], zero.view(np.int8), [0]]))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+
+        # 与上一块末尾相接的区段
+        if self.zero_run is not None:
+            if zero[0]:
+                first_end = int(ends[0])
+                self.zero_run[1] = int(timestamps[first_end - 1])
+                self.zero_run[2] += first_end
+                starts, ends = starts[1:], ends[1:]
+                if first_end == count:
+                    return
+            self.close_zero_run()
+
+        # 只有足够长或延续到块末尾的区段需要逐个处理
+        keep = (ends - starts >= self.min_zero_run) | (ends == count)
+        for start, end in zip(starts[keep], ends[keep]):
+            run = [int(timestamps[start]), int(timestamps[end - 1]), int(end - start)]
+            if end == count:
+                self.zero_run = run
+            else:
+                self.report.zero_volume_runs.append(tuple(run))
+
+    def close_zero_run(self):
+        if self.zero_run is not None and self.zero_run[2] >= self.min_zero_run:
+            self.report.zero_volume_runs.append(tuple(self.zero_run))
+        self.zero_run = None
+
+    def finish(self) -> ValidationReport:
+        self.close_zero_run()
+        self.report.seconds = time.perf_counter() - self.started
+        return self.report
+
+
+class GapIndex:
+    """
+    持久化的缺口索引
+
+    每个 symbol/interval 记录已校验的时间范围(covered)、其中缺失的区间(gaps)，
+    以及增量同步确认交易所也没有数据的区间(empty)，保存为一个JSON文件。
+    回测加载数据时据此提示缺口，增量同步时跳过交易所没有数据的区间。
+    """
+
+    def __init__(self, path: str = "data/gaps.json"):
+        self.path = Path(path)
+        self.entries: Optional[Dict[str, Dict]] = None
+
+    @staticmethod
+    def get_key(symbol: str, interval: str) -> str:
+        return f"{symbol}/{interval}"
+
+    def load(self) -> Dict[str, Dict]:
+        if self.entries is None:
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+        return self.entries
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f"{self.path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+
+    def get_entry(self, symbol: str, interval: str) -> Dict:
+        return self.load().setdefault(
+            self.get_key(symbol, interval), {"covered": [], "gaps": [], "empty": []}
+        )
+
+    def get_ranges(self, symbol: str, interval: str, kind: str,
+                   start: Optional[int] = None, end: Optional[int] = None) -> List[Range]:
+        """[start, end) 内的 gaps/empty/covered 区间"""
+        entry = self.load().get(self.get_key(symbol, interval))
+        if not entry:
+            return []
+        ranges = [tuple(r) for r in entry[kind]]
+        if start is None and end is None:
+            return ranges
+        return clip_intervals(ranges, start if start is not None else -2 ** 63, end if end is not None else 2 ** 63 - 1)
+
+    def get_gaps(self, symbol: str, interval: str, start: Optional[int] = None,
+                 end: Optional[int] = None) -> List[Range]:
+        return self.get_ranges(symbol, interval, "gaps", start, end)
+
+    def get_empty(self, symbol: str, interval: str, start: Optional[int] = None,
+                  end: Optional[int] = None) -> List[Range]:
+        return self.get_ranges(symbol, interval, "empty", start, end)
+
+    def is_covered(self, symbol: str, interval: str, start: int, end: int) -> bool:
+        """[start, end) 是否都已校验过"""
+        return not subtract_intervals([(start, end)], self.get_ranges(symbol, interval, "covered"))
+
+    def update(self, symbol: str, interval: str, start: int, end: int, gaps: List[Range]):
+        """用一次校验的结果替换 [start, end) 内的缺口记录"""
+        entry = self.get_entry(symbol, interval)
+        entry["covered"] = merge_intervals([tuple(r) for r in entry["covered"]] + [(start, end)])
+        outside = subtract_intervals([tuple(r) for r in entry["gaps"]], [(start, end)])
+        entry["gaps"] = merge_intervals(outside + clip_intervals(gaps, start, end))
+        self.save()
+
+    def fill(self, symbol: str, interval: str, ranges: List[Range]):
+        """ranges 内的K线已补齐，从缺口中去掉"""
+        entry = self.get_entry(symbol, interval)
+        entry["gaps"] = subtract_intervals([tuple(r) for r in entry["gaps"]], ranges)
+        self.save()
+
+    def mark_empty(self, symbol: str, interval: str, ranges: List[Range]):
+        """记录交易所没有数据的区间"""
+        if not ranges:
+            return
+        entry = self.get_entry(symbol, interval)
+        entry["empty"] = merge_intervals([tuple(r) for r in entry["empty"]] + list(ranges))
+        self.save()
+
+    def clear(self, symbol: str, interval: str):
+        self.load().pop(self.get_key(symbol, interval), None)
+        self.save()
+
+
+class DataValidator:
+    """
+    K线数据质量检查
+
+    逐块读取MongoDB或本地存储中的整个序列交给 SeriesValidator，
+    检查结果中的缺口写入 GapIndex。
+    """
+
+    def __init__(self, collection=None, bar_store: BarStore = None, gap_index: GapIndex = None,
+                 chunk_size: int = CHUNK_BARS):
+        self.collection = collection
+        self.bar_store = bar_store or BarStore()
+        self.gap_index = gap_index or GapIndex()
+        self.chunk_size = chunk_size
+
+    def iter_store_chunks(self, symbol: str, interval: str, start: Optional[datetime],
+                          end: Optional[datetime]) -> Iterator[Dict[str, np.ndarray]]:
+        """本地存储：内存映射后按位置切块"""
+        data = self.bar_store.load(symbol, interval, start, end)
+        for i in range(0, len(data["datetime"]), self.chunk_size):
+            yield {name: array[i:i + self.chunk_size] for name, array in data.items()}
+
+    def iter_mongo_chunks(self, symbol: str, interval: str, start: Optional[datetime],
+                          end: Optional[datetime]) -> Iterator[Dict[str, np.ndarray]]:
+        """MongoDB：按时间窗口分段读取"""
+        from src.data.mongo_reader import MongoBarReader
+
+        reader = MongoBarReader(self.collection)
+        reader.ensure_index()
+        bounds = reader.get_bounds(reader.make_query(symbol, interval, start, end))
+        if bounds is None:
+            return
+
+        step = TIMEFRAME_MS[interval] * 1_000_000
+        last = to_timestamp(end) if end else bounds[1] + step
+        for window_start in range(bounds[0], last, step * self.chunk_size):
+            window_end = min(window_start + step * self.chunk_size, last)
+            window_dates = to_datetimes(np.array([window_start, window_end]))
+            yield reader.read(symbol, interval, window_dates[0], window_dates[1])
+
+    def validate(self, symbol: str, interval: str, source: str = "mongo",
+                 start: Optional[datetime] = None, end: Optional[datetime] = None,
+                 update_index: bool = True) -> ValidationReport:
+        """检查整个序列(或 [start, end) 区间)，并按需更新缺口索引"""
+        if source == "store":
+            chunks = self.iter_store_chunks(symbol, interval, start, end)
+        else:
+            chunks = self.iter_mongo_chunks(symbol, interval, start, end)
+
+        validator = SeriesValidator(symbol, interval)
+        for chunk in chunks:
+            validator.feed(chunk)
+        report = validator.finish()
+
+        if update_index and report.count:
+            step = TIMEFRAME_MS[interval] * 1_000_000
+            covered_start = to_timestamp(start) if start else report.first
+            covered_end = to_timestamp(end) if end else report.last + step
+            # 指定区间时，区间开头和末尾没有K线的部分也算缺口
+            gaps = list(report.gaps)
+            if covered_start < report.first:
+                gaps.append((covered_start, report.first))
+            if report.last + step < covered_end:
+                gaps.append((report.last + step, covered_end))
+            self.gap_index.update(symbol, interval, covered_start, covered_end, gaps)
+        return report
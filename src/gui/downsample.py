@@ -0,0 +1,80 @@
+from typing import Tuple
+
+import numpy as np
+
+
+def visible_slice(x: np.ndarray, x_min: float, x_max: float) -> slice:
+    """x 升序时可见范围对应的位置区间，两侧各多取一个点使曲线延伸到边界外"""
+    left = max(int(np.searchsorted(x, x_min, side="left")) - 1, 0)
+    right = min(int(np.searchsorted(x, x_max, side="right")) + 1, len(x))
+    return slice(left, right)
+
+
+def minmax_downsample(x: np.ndarray, y: np.ndarray, buckets: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    按最大最小值降采样
+
+    点平均分入 buckets 个桶，每个桶保留最小值和最大值两个点(按原顺序)，另加首尾点，
+    折线的包络与原始数据一致，不会漏掉尖峰。
+    """
+    n = len(x)
+    if n <= buckets * 2:
+        return x, y
+
+    # 最后一个桶可能不满，用桶内最后一个值补齐
+    size = -(-n // buckets)
+    pad = size * buckets - n
+    values = np.concatenate([y, np.repeat(y[-1], pad)]).reshape(buckets, size)
+
+    offsets = np.arange(buckets) * size
+    low = values.argmin(axis=1) + offsets
+    high = values.argmax(axis=1) + offsets
+    index = np.sort(np.stack([low, high], axis=1), axis=1).ravel()
+    # 保留首尾点，曲线覆盖完整区间
+    index = np.unique(np.concatenate([[0], np.minimum(index, n - 1), [n - 1]]))
+    return x[index], y[index]
+
+
+class SeriesBuffer:
+    """
+    只追加的序列缓冲区
+
+    容量按倍数扩展，追加为均摊 O(1)；x、y 视图只包含已写入部分。
+    扩容时替换底层数组，已取出的旧视图仍然有效，可以安全交给工作线程读取。
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self._x = np.empty(capacity, dtype=np.float64)
+        self._y = np.empty(capacity, dtype=np.float64)
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self.size
+
+    @property
+    def x(self) -> np.ndarray:
+        return self._x[:self.size]
+
+    @property
+    def y(self) -> np.ndarray:
+        return self._y[:self.size]
+
+    def clear(self):
+        # 换用新数组，避免覆盖工作线程可能仍在读取的旧数据
+        self._x = np.empty_like(self._x)
+        self._y = np.empty_like(self._y)
+        self.size = 0
+
+    def append(self, x: np.ndarray, y: np.ndarray):
+        x = np.atleast_1d(np.asarray(x, dtype=np.float64))
+        y = np.atleast_1d(np.asarray(y, dtype=np.float64))
+        end = self.size + len(x)
+
+        if end > len(self._x):
+            capacity = max(end, len(self._x) * 2)
+            self._x = np.concatenate([self._x[:self.size], np.empty(capacity - self.size)])
+            self._y = np.concatenate([self._y[:self.size], np.empty(capacity - self.size)])
+
+        self._x[self.size:end] = x
+        self._y[self.size:end] = y
+        self.size = end
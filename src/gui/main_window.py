@@ -1,32 +1,171 @@
 import sys
+from typing import Optional, Tuple
+
+import numpy as np
+import pandas as pd
 from PyQt5.QtWidgets import QApplication, QMainWindow, QWidget, QVBoxLayout
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
 import pyqtgraph as pg
 
+from src.gui.downsample import SeriesBuffer, minmax_downsample, visible_slice
+
+# 视图范围变化后延迟重新降采样(毫秒)，拖动缩放过程中合并为一次计算
+REFRESH_DELAY = 30
+
+
+def chart_xy(data: pd.DataFrame, column: str) -> Tuple[np.ndarray, np.ndarray, bool]:
+    """
+    取出绘图用的 x、y 数组
+
+    有 datetime 列或时间索引时 x 为秒级时间戳，否则为索引值；第三个返回值表示 x 是否为时间。
+    """
+    if "datetime" in data.columns:
+        times = pd.DatetimeIndex(data["datetime"])
+    elif isinstance(data.index, pd.DatetimeIndex):
+        times = data.index
+    else:
+        return data.index.to_numpy(dtype=np.float64), data[column].to_numpy(dtype=np.float64), False
+
+    if times.tz is not None:
+        times = times.tz_convert(None)
+    x = times.as_unit("ns").asi8 / 1e9
+    return x, data[column].to_numpy(dtype=np.float64), True
+
+
+class DownsampleSignals(QObject):
+    finished = pyqtSignal(int, object, object)
+
+
+class DownsampleTask(QRunnable):
+    """在线程池中计算可见范围的降采样结果"""
+
+    def __init__(self, signals: DownsampleSignals, generation: int, x: np.ndarray, y: np.ndarray,
+                 x_range: Optional[Tuple[float, float]], buckets: int):
+        super().__init__()
+        self.signals = signals
+        self.generation = generation
+        self.x = x
+        self.y = y
+        self.x_range = x_range
+        self.buckets = buckets
+
+    def run(self):
+        x, y = self.x, self.y
+        if self.x_range is not None:
+            window = visible_slice(x, *self.x_range)
+            x, y = x[window], y[window]
+        x, y = minmax_downsample(x, y, self.buckets)
+        self.signals.finished.emit(self.generation, x, y)
+
+
+class DownsampledSeries:
+    """
+    大数据量曲线
+
+    完整数据保存在只追加的缓冲区中，曲线只绘制可见范围内按像素宽度做最大最小值降采样后的点。
+    缩放平移或追加数据后在线程池中重新降采样，结果通过信号回到GUI线程更新曲线，
+    过期的计算结果直接丢弃。
+    """
+
+    def __init__(self, plot: pg.PlotWidget, pen=None):
+        self.plot = plot
+        self.view_box = plot.getViewBox()
+        self.buffer = SeriesBuffer()
+        self.curve = plot.plot(pen=pen)
+        self.is_time = False
+        self.generation = 0
+
+        self.signals = DownsampleSignals()
+        self.signals.finished.connect(self.on_finished)
+
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(REFRESH_DELAY)
+        self.timer.timeout.connect(self.refresh)
+        self.view_box.sigXRangeChanged.connect(self.schedule)
+        # 重新启用自动缩放时范围未必变化，但需要换回全部数据的降采样
+        self.view_box.sigStateChanged.connect(self.schedule)
+
+    def set_data(self, x: np.ndarray, y: np.ndarray, is_time: bool = False):
+        """替换全部数据"""
+        self.buffer.clear()
+        self.set_time_axis(is_time)
+        self.append(x, y)
+        self.view_box.enableAutoRange(x=True, y=True)
+
+    def append(self, x: np.ndarray, y: np.ndarray, is_time: bool = None):
+        """追加数据，只重新计算降采样，不清空重绘"""
+        if is_time is not None:
+            self.set_time_axis(is_time)
+        self.buffer.append(x, y)
+        self.schedule()
+
+    def set_time_axis(self, is_time: bool):
+        if is_time and not self.is_time:
+            self.plot.setAxisItems({"bottom": pg.DateAxisItem()})
+        self.is_time = is_time
+
+    def schedule(self, *args):
+        """延迟刷新，连续的范围变化只触发一次计算"""
+        self.timer.start()
+
+    def refresh(self):
+        """提交降采样任务"""
+        if not len(self.buffer):
+            self.curve.setData([], [])
+            return
+
+        # 自动缩放时显示全部数据，否则只取当前可见范围
+        if self.view_box.autoRangeEnabled()[0]:
+            x_range = None
+        else:
+            x_range = tuple(self.view_box.viewRange()[0])
+        buckets = max(int(self.view_box.width()), 100)
+
+        self.generation += 1
+        task = DownsampleTask(
+            self.signals, self.generation, self.buffer.x, self.buffer.y, x_range, buckets
+        )
+        QThreadPool.globalInstance().start(task)
+
+    def on_finished(self, generation: int, x: np.ndarray, y: np.ndarray):
+        if generation == self.generation:
+            self.curve.setData(x, y)
+
+
 class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("量化交易系统")
         self.setGeometry(100, 100, 1200, 800)
-        
+
         # 创建中心窗口
         central_widget = QWidget()
         self.setCentralWidget(central_widget)
         layout = QVBoxLayout(central_widget)
-        
+
         # 创建图表
         self.price_plot = pg.PlotWidget()
         self.price_plot.setTitle("价格走势")
         layout.addWidget(self.price_plot)
-        
+
         self.pnl_plot = pg.PlotWidget()
         self.pnl_plot.setTitle("盈亏曲线")
         layout.addWidget(self.pnl_plot)
-        
+
+        self.price_series = DownsampledSeries(self.price_plot)
+        self.pnl_series = DownsampledSeries(self.pnl_plot)
+
     def update_price_chart(self, data):
-        self.price_plot.clear()
-        self.price_plot.plot(data['close'].values)
-        
+        self.price_series.set_data(*chart_xy(data, 'close'))
+
     def update_pnl_chart(self, data):
-        self.pnl_plot.clear()
-        self.pnl_plot.plot(data['cumulative_pnl'].values)
\ No newline at end of file
+        self.pnl_series.set_data(*chart_xy(data, 'cumulative_pnl'))
+
+    def append_bars(self, data):
+        """追加新K线"""
+        self.price_series.append(*chart_xy(data, 'close'))
+
+    def append_pnl(self, data):
+        """追加新的盈亏数据点"""
+        self.pnl_series.append(*chart_xy(data, 'cumulative_pnl'))
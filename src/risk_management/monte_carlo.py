@@ -0,0 +1,147 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+# 结果中汇总的分位点(百分比)
+PERCENTILES = [1, 5, 25, 50, 75, 95, 99]
+
+
+@dataclass
+class MonteCarloResult:
+    """
+    蒙特卡洛重抽样结果，每个数组对应全部模拟路径
+
+    max_drawdown: 最大回撤(百分比)
+    terminal_equity: 期末权益
+    var/cvar: 每条路径收益率的 VaR/CVaR(亏损为负)
+    """
+
+    max_drawdown: np.ndarray
+    terminal_equity: np.ndarray
+    var: np.ndarray
+    cvar: np.ndarray
+    capital: float
+    confidence_level: float
+
+    @property
+    def total_return(self) -> np.ndarray:
+        """期末收益率(百分比)"""
+        return (self.terminal_equity / self.capital - 1) * 100
+
+    def confidence_interval(self, name: str, level: float = 0.95) -> tuple:
+        """指标的双侧置信区间"""
+        values = getattr(self, name)
+        tail = (1 - level) / 2 * 100
+        low, high = np.percentile(values, [tail, 100 - tail])
+        return float(low), float(high)
+
+    def summary(self) -> pd.DataFrame:
+        """各指标的均值与分位数"""
+        rows = {}
+        for name in ("total_return", "max_drawdown", "terminal_equity", "var", "cvar"):
+            values = getattr(self, name)
+            row = {"mean": float(values.mean())}
+            row.update({f"p{q}": float(v) for q, v in zip(PERCENTILES, np.percentile(values, PERCENTILES))})
+            rows[name] = row
+        return pd.DataFrame(rows).T
+
+
+def bootstrap_indices(rng: np.random.Generator, n: int, paths: int, length: int,
+                      block_size: int = 1) -> np.ndarray:
+    """
+    生成 (paths, length) 的重抽样位置矩阵
+
+    block_size > 1 时为循环分块重抽样：随机选取块起点，块内连续取样，
+    保留收益率的短期自相关。
+    """
+    if block_size <= 1:
+        return rng.integers(0, n, size=(paths, length))
+
+    blocks = -(-length // block_size)
+    starts = rng.integers(0, n, size=(paths, blocks, 1))
+    indices = (starts + np.arange(block_size)) % n
+    return indices.reshape(paths, -1)[:, :length]
+
+
+def simulate_batch(returns: np.ndarray, capital: float, paths: int, length: int,
+                   block_size: int, confidence_level: float,
+                   seed: np.random.SeedSequence) -> Dict[str, np.ndarray]:
+    """用矩阵运算模拟一批路径"""
+    rng = np.random.default_rng(seed)
+    sampled = returns[bootstrap_indices(rng, len(returns), paths, length, block_size)]
+
+    equity = capital * np.cumprod(1 + sampled, axis=1)
+    peak = np.maximum(np.maximum.accumulate(equity, axis=1), capital)
+    max_drawdown = ((peak - equity) / peak).max(axis=1) * 100
+
+    # 每条路径排序一次，同时得到 VaR 与尾部均值
+    sampled.sort(axis=1)
+    tail = max(1, int(np.ceil(length * (1 - confidence_level))))
+    var = sampled[:, tail - 1]
+    cvar = sampled[:, :tail].mean(axis=1)
+
+    return {
+        "max_drawdown": max_drawdown,
+        "terminal_equity": equity[:, -1],
+        "var": var,
+        "cvar": cvar,
+    }
+
+
+class MonteCarloAnalyzer:
+    """
+    基于回测收益率序列的蒙特卡洛风险分析
+
+    收益率(逐笔或逐日)有放回重抽样生成大量模拟路径，按批次以矩阵运算计算
+    最大回撤、期末权益与 VaR/CVaR 的分布。每个批次的随机种子由 SeedSequence
+    派生，结果只取决于 seed 与批次划分，与是否多进程、进程数无关。
+    """
+
+    def __init__(
+        self,
+        returns: np.ndarray,
+        capital: float = 1_000_000,
+        confidence_level: float = 0.95,
+        block_size: int = 1,
+        seed: int = 42
+    ):
+        self.returns = np.asarray(returns, dtype=np.float64)
+        if len(self.returns) < 2:
+            raise ValueError("收益率样本不足，无法重抽样")
+
+        self.capital = capital
+        self.confidence_level = confidence_level
+        self.block_size = block_size
+        self.seed = seed
+
+    def run(self, paths: int = 10_000, length: int = None, batch_size: int = 1_000,
+            max_workers: int = None) -> MonteCarloResult:
+        """
+        运行模拟
+
+        length: 每条路径的长度，默认与原收益率序列相同
+        max_workers: 进程数，为None或1时在当前进程中计算
+        """
+        length = length or len(self.returns)
+        sizes = [min(batch_size, paths - start) for start in range(0, paths, batch_size)]
+        seeds = np.random.SeedSequence(self.seed).spawn(len(sizes))
+        args = [
+            (self.returns, self.capital, size, length, self.block_size, self.confidence_level, seed)
+            for size, seed in zip(sizes, seeds)
+        ]
+
+        if max_workers and max_workers > 1:
+            with ProcessPoolExecutor(min(max_workers, os.cpu_count(), len(args))) as executor:
+                batches: List[Dict] = list(executor.map(simulate_batch, *zip(*args)))
+        else:
+            batches = [simulate_batch(*arg) for arg in args]
+
+        return MonteCarloResult(
+            **{name: np.concatenate([batch[name] for batch in batches]) for name in batches[0]},
+            capital=self.capital,
+            confidence_level=self.confidence_level
+        )
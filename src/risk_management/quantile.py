@@ -0,0 +1,123 @@
+import math
+from typing import List
+
+
+class P2Quantile:
+    """
+    P² 流式分位数估计(Jain & Chlamtac, 1985)
+
+    只维护5个标记点，内存占用固定，每次更新 O(1)；
+    标记点高度用分段抛物线插值调整，不保存历史数据。
+    """
+
+    def __init__(self, q: float):
+        if not 0 < q < 1:
+            raise ValueError(f"分位数必须在(0, 1)之间: {q}")
+
+        self.q = q
+        self.count = 0
+        self.heights: List[float] = []
+        self.positions = [1, 2, 3, 4, 5]
+        self.desired = [1, 1 + 2 * q, 1 + 4 * q, 3 + 2 * q, 5]
+        self.increments = [0, q / 2, q, (1 + q) / 2, 1]
+
+    def update(self, x: float):
+        """加入一个观测值"""
+        self.count += 1
+        heights = self.heights
+
+        # 前5个观测值直接保存
+        if self.count <= 5:
+            heights.append(x)
+            heights.sort()
+            return
+
+        # 找到 x 所在的区间，必要时扩展最小/最大标记
+        if x < heights[0]:
+            heights[0] = x
+            k = 0
+        elif x >= heights[4]:
+            heights[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= heights[k + 1]:
+                k += 1
+
+        positions = self.positions
+        for i in range(k + 1, 5):
+            positions[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # 调整中间3个标记的位置和高度
+        for i in range(1, 4):
+            d = self.desired[i] - positions[i]
+            if (d >= 1 and positions[i + 1] - positions[i] > 1) or (d <= -1 and positions[i - 1] - positions[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self._parabolic(i, d)
+                if not heights[i - 1] < height < heights[i + 1]:
+                    height = self._linear(i, d)
+                heights[i] = height
+                positions[i] += d
+
+    def _parabolic(self, i: int, d: int) -> float:
+        n, q = self.positions, self.heights
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def _linear(self, i: int, d: int) -> float:
+        n, q = self.positions, self.heights
+        return q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+
+    @property
+    def value(self) -> float:
+        """当前分位数估计"""
+        if not self.count:
+            return math.nan
+        if self.count <= 5:
+            # 样本不足5个时按线性插值取分位数
+            rank = (len(self.heights) - 1) * self.q
+            low = int(rank)
+            high = min(low + 1, len(self.heights) - 1)
+            return self.heights[low] + (self.heights[high] - self.heights[low]) * (rank - low)
+        return self.heights[2]
+
+
+class StreamingVaR:
+    """
+    流式 VaR / CVaR
+
+    VaR 为收益率的 (1 - confidence_level) 分位数(P² 估计)；
+    CVaR 为不高于当时 VaR 估计的收益率均值，是近似值，随 VaR 估计收敛而趋于准确。
+    前5个观测值只用于初始化P²标记点，此时的分位数只是几个样本的插值，不计入CVaR的尾部。
+    """
+
+    def __init__(self, confidence_level: float = 0.95):
+        self.confidence_level = confidence_level
+        self.quantile = P2Quantile(1 - confidence_level)
+        self.tail_sum = 0.0
+        self.tail_count = 0
+
+    def update(self, ret: float):
+        """加入一个收益率"""
+        self.quantile.update(ret)
+        if self.quantile.count > 5 and ret <= self.quantile.value:
+            self.tail_sum += ret
+            self.tail_count += 1
+
+    @property
+    def count(self) -> int:
+        return self.quantile.count
+
+    @property
+    def var(self) -> float:
+        return self.quantile.value
+
+    @property
+    def cvar(self) -> float:
+        if not self.tail_count:
+            return self.var
+        return self.tail_sum / self.tail_count
@@ -1,41 +1,109 @@
-from typing import Dict
+from typing import Dict, Sequence
 import numpy as np
 
+from src.risk_management.quantile import StreamingVaR
+
 class RiskManager:
     def __init__(self, config: Dict):
         self.risk_limit = config['risk_limit']
         self.max_positions = config['max_positions']
+        self.capital = config.get('capital')    # 账户权益，设置后按权益比例限制单品种仓位
+        self.var_limit = config.get('var_limit')    # 流式VaR亏损上限(正数)，超过后拒绝开仓
         self.positions = {}
-        
-    def check_order(self, symbol: str, price: float, 
+        self.total_value = 0.0                  # 持仓总市值，随 update_position 增量维护
+        self.var = StreamingVaR(config.get('var_confidence', 0.95))
+
+    def update_capital(self, capital: float):
+        """更新账户权益"""
+        self.capital = capital
+
+    def check_order(self, symbol: str, price: float,
                     volume: float, direction: str) -> bool:
         """检查订单是否符合风险控制要求"""
-        # 检查持仓数量限制
-        if len(self.positions) >= self.max_positions:
+        # 平仓单降低风险，不做限制
+        if direction == "sell" and symbol in self.positions:
+            return True
+
+        # 检查持仓数量限制(已有持仓的品种加仓不占用新的名额)
+        if symbol not in self.positions and len(self.positions) >= self.max_positions:
+            return False
+
+        # 收益率的VaR超过上限时暂停开仓
+        if self.var_limit is not None and self.var.count and self.var.var < -self.var_limit:
             return False
-            
+
         # 检查单个交易品种的资金使用比例
         position_value = price * volume
-        total_value = sum(p['value'] for p in self.positions.values())
-        
-        if position_value / (total_value + position_value) > self.risk_limit:
+        if self.capital:
+            ratio = position_value / self.capital
+        else:
+            ratio = position_value / (self.total_value + position_value)
+
+        if ratio > self.risk_limit:
             return False
-            
+
         return True
-        
-    def update_position(self, symbol: str, price: float, 
+
+    def check_orders(self, symbols: Sequence[str], prices: np.ndarray,
+                     volumes: np.ndarray, directions: Sequence[str]) -> np.ndarray:
+        """
+        批量检查订单，返回每笔订单是否通过的布尔数组
+
+        每笔订单都按当前持仓独立检查，结果与逐笔调用 check_order 相同。
+        """
+        prices = np.asarray(prices, dtype=np.float64)
+        volumes = np.asarray(volumes, dtype=np.float64)
+        held = np.fromiter((symbol in self.positions for symbol in symbols), dtype=bool, count=len(prices))
+        is_sell = np.asarray(directions) == "sell"
+
+        position_value = prices * volumes
+        if self.capital:
+            ratio = position_value / self.capital
+        else:
+            ratio = position_value / (self.total_value + position_value)
+
+        passed = ratio <= self.risk_limit
+        if len(self.positions) >= self.max_positions:
+            passed &= held
+        if self.var_limit is not None and self.var.count and self.var.var < -self.var_limit:
+            passed[:] = False
+
+        return passed | (is_sell & held)
+
+    def update_position(self, symbol: str, price: float,
                        volume: float, direction: str):
         """更新持仓信息"""
+        old = self.positions.get(symbol)
+        if old:
+            self.total_value -= old["value"]
+
         if direction == "buy":
             self.positions[symbol] = {
                 "volume": volume,
                 "value": price * volume
             }
+            self.total_value += price * volume
         else:
             if symbol in self.positions:
                 del self.positions[symbol]
-                
-    def calculate_var(self, returns: np.array, 
+
+        if not self.positions:
+            # 清仓时归零，消除浮点累计误差
+            self.total_value = 0.0
+
+    def update_return(self, ret: float):
+        """记录一个收益率，更新流式VaR/CVaR"""
+        self.var.update(ret)
+
+    def get_var(self) -> float:
+        """当前流式VaR估计(收益率分位数，亏损为负)"""
+        return self.var.var
+
+    def get_cvar(self) -> float:
+        """当前流式CVaR估计"""
+        return self.var.cvar
+
+    def calculate_var(self, returns: np.array,
                      confidence_level: float = 0.95) -> float:
         """计算VaR风险价值"""
-        return np.percentile(returns, (1 - confidence_level) * 100)
\ No newline at end of file
+        return np.percentile(returns, (1 - confidence_level) * 100)
@@ -0,0 +1,346 @@
+from collections import deque
+from typing import Dict, List, Union
+
+import numpy as np
+import pandas as pd
+from vnpy.trader.object import BarData
+
+
+# 信号比较的相对容差：增量指标与向量化回测的指标只差浮点误差，数学上相等的两个值
+# 可能落在比较的不同侧；差值在容差内视为相等，两条回测路径走相同的分支
+TIE_TOLERANCE = 1e-9
+
+
+def is_greater(a, b):
+    """a 是否明显大于 b(差值超过容差)，a、b 可以是数值或数组"""
+    return a - b > TIE_TOLERANCE * abs(b)
+
+
+def is_less(a, b):
+    """a 是否明显小于 b(差值超过容差)，a、b 可以是数值或数组"""
+    return b - a > TIE_TOLERANCE * abs(b)
+
+
+class RunningSMA:
+    """滑动求和均线，每根K线 O(1) 更新"""
+
+    # 每更新这么多次，用窗口内原始数据重新求和一次，消除累计浮点误差
+    resync_interval: int = 10_000
+
+    def __init__(self, window: int, history: List[float]):
+        self.window = window
+        self.total = sum(history[-window:])
+        self.updates = 0
+
+    def update(self, value: float, dropped: float) -> bool:
+        """加入新值并移出窗口外的旧值，返回是否需要重新求和"""
+        self.total += value - dropped
+        self.updates += 1
+        return self.updates >= self.resync_interval
+
+    def resync(self, history: List[float]):
+        """用窗口内原始数据重新求和"""
+        self.total = sum(history)
+        self.updates = 0
+
+    @property
+    def value(self) -> float:
+        return self.total / self.window
+
+
+class WindowedSmoother:
+    """
+    固定窗口内重新起算的递推平滑，与 talib 在定长数组上计算 EMA/RSI 的口径一致
+
+    窗口内共 length 个输入，以前 window 个的均值为初始值，其余 m = length - window 个按
+    y = decay * y + (1 - decay) * x 递推。结果是窗口内输入的线性组合：
+        decay^m * 前 window 个的均值 + (1 - decay) * sum(decay^(m-i) * x_i)
+    窗口滑动时两部分都可以 O(1) 更新，与每根K线在窗口上重新递推的结果只差浮点误差。
+    """
+
+    # 每更新这么多次，用窗口内原始数据重新计算一次，消除累计浮点误差
+    resync_interval: int = 10_000
+
+    def __init__(self, window: int, decay: float, history: List[float]):
+        if len(history) < window:
+            raise ValueError(f"窗口长度({len(history)})小于初始值长度({window})")
+        self.window = window
+        self.decay = decay
+        self.inputs = deque(history, maxlen=len(history))
+        self.tail_weight = decay ** (len(history) - window)
+        self.resync()
+
+    def resync(self):
+        """用窗口内原始数据重新计算初始值之和与递推部分"""
+        inputs = list(self.inputs)
+        self.seed_sum = sum(inputs[:self.window])
+        tail_sum = 0.0
+        for value in inputs[self.window:]:
+            tail_sum = tail_sum * self.decay + value
+        self.tail_sum = tail_sum
+        self.updates = 0
+
+    def update(self, value: float):
+        """新值进入窗口末尾，最早的值移出，递推部分的第一个值移入初始值部分"""
+        inputs = self.inputs
+        entering = inputs[self.window] if self.window < len(inputs) else value
+        self.seed_sum += entering - inputs[0]
+        self.tail_sum = self.tail_sum * self.decay + value - self.tail_weight * entering
+        inputs.append(value)
+
+        self.updates += 1
+        if self.updates >= self.resync_interval:
+            self.resync()
+
+    @property
+    def value(self) -> float:
+        return self.tail_weight * self.seed_sum / self.window + (1 - self.decay) * self.tail_sum
+
+
+class RunningEMA:
+    """指数均线，在最近 size 个值上以前 window 个值的均值为初始值(与 ArrayManager.ema 一致)"""
+
+    def __init__(self, window: int, history: List[float]):
+        self.window = window
+        self.smoother = WindowedSmoother(window, 1 - 2 / (window + 1), history)
+
+    def update(self, value: float):
+        self.smoother.update(value)
+
+    @property
+    def value(self) -> float:
+        return self.smoother.value
+
+
+class WilderRSI:
+    """Wilder平滑RSI，在最近 size 个值上以前 window 个涨跌幅均值为初始值(与 ArrayManager.rsi 一致)"""
+
+    def __init__(self, window: int, history: List[float]):
+        self.window = window
+
+        gains = []
+        losses = []
+        for prev, curr in zip(history[:-1], history[1:]):
+            diff = curr - prev
+            gains.append(diff if diff > 0 else 0.0)
+            losses.append(-diff if diff < 0 else 0.0)
+
+        decay = (window - 1) / window
+        self.gain = WindowedSmoother(window, decay, gains)
+        self.loss = WindowedSmoother(window, decay, losses)
+        self.last = history[-1]
+
+    def update(self, value: float):
+        diff = value - self.last
+        self.last = value
+        self.gain.update(diff if diff > 0 else 0.0)
+        self.loss.update(-diff if diff < 0 else 0.0)
+
+    @property
+    def value(self) -> float:
+        avg_gain = self.gain.value
+        total = avg_gain + self.loss.value
+        if abs(total) <= 1e-8:
+            return 0.0
+        return 100 * avg_gain / total
+
+
+class IncrementalArrayManager:
+    """
+    增量指标管理器，可直接替换 ArrayManager
+
+    ArrayManager 每根K线要移动整个数组，并在最近 size 个值上重新调用talib；
+    这里K线写入环形缓冲区，指标在第一次调用时用缓冲区数据初始化并登记，
+    之后每根K线只做 O(1) 的递推更新，开销与窗口长度无关。
+
+    RSI/EMA 与 ArrayManager 一样在最近 size 根K线上重新起算(见 WindowedSmoother)，
+    结果与 ArrayManager 只差浮点误差。
+    """
+
+    def __init__(self, size: int = 100):
+        self.count: int = 0
+        self.size: int = size
+        self.inited: bool = False
+
+        self.index: int = 0
+        self.open_buffer: List[float] = [0.0] * size
+        self.high_buffer: List[float] = [0.0] * size
+        self.low_buffer: List[float] = [0.0] * size
+        self.close_buffer: List[float] = [0.0] * size
+        self.volume_buffer: List[float] = [0.0] * size
+
+        self.sma_indicators: Dict[int, RunningSMA] = {}
+        self.ema_indicators: Dict[int, RunningEMA] = {}
+        self.rsi_indicators: Dict[int, WilderRSI] = {}
+
+    def update_bar(self, bar: BarData) -> None:
+        """更新K线"""
+        close = bar.close_price
+        i = self.index
+        oldest = self.close_buffer[i]
+
+        self.open_buffer[i] = bar.open_price
+        self.high_buffer[i] = bar.high_price
+        self.low_buffer[i] = bar.low_price
+        self.close_buffer[i] = close
+        self.volume_buffer[i] = bar.volume
+
+        self.index = (i + 1) % self.size
+        self.count += 1
+        if not self.inited and self.count >= self.size:
+            self.inited = True
+
+        for window, sma in self.sma_indicators.items():
+            # 窗口等于缓冲区长度时，移出的值正是刚被覆盖的位置
+            dropped = oldest if window == self.size else self.close_buffer[(i - window) % self.size]
+            if sma.update(close, dropped):
+                sma.resync(self.get_history(window))
+
+        for ema in self.ema_indicators.values():
+            ema.update(close)
+        for rsi in self.rsi_indicators.values():
+            rsi.update(close)
+
+    def get_history(self, n: int = None, buffer: List[float] = None) -> List[float]:
+        """按时间顺序返回缓冲区中最近n个值(未填满部分为0，与ArrayManager一致)"""
+        if buffer is None:
+            buffer = self.close_buffer
+        n = min(n or self.size, self.size)
+        ordered = buffer[self.index:] + buffer[:self.index]
+        return ordered[self.size - n:]
+
+    def to_array(self, buffer: List[float]) -> np.ndarray:
+        """按时间顺序返回完整缓冲区数组(与ArrayManager的数组属性一致)"""
+        return np.array(buffer[self.index:] + buffer[:self.index])
+
+    @property
+    def open(self) -> np.ndarray:
+        return self.to_array(self.open_buffer)
+
+    @property
+    def high(self) -> np.ndarray:
+        return self.to_array(self.high_buffer)
+
+    @property
+    def low(self) -> np.ndarray:
+        return self.to_array(self.low_buffer)
+
+    @property
+    def close(self) -> np.ndarray:
+        return self.to_array(self.close_buffer)
+
+    @property
+    def volume(self) -> np.ndarray:
+        return self.to_array(self.volume_buffer)
+
+    def sma(self, n: int, array: bool = False) -> Union[float, np.ndarray]:
+        """简单均线"""
+        if array:
+            return pd.Series(self.close).rolling(n).mean().to_numpy()
+
+        sma = self.sma_indicators.get(n)
+        if not sma:
+            sma = RunningSMA(n, self.get_history())
+            self.sma_indicators[n] = sma
+        return sma.value
+
+    def ema(self, n: int, array: bool = False) -> Union[float, np.ndarray]:
+        """指数均线"""
+        if array:
+            return ema_array(self.close, n)
+
+        ema = self.ema_indicators.get(n)
+        if not ema:
+            ema = RunningEMA(n, self.get_history())
+            self.ema_indicators[n] = ema
+        return ema.value
+
+    def rsi(self, n: int, array: bool = False) -> Union[float, np.ndarray]:
+        """相对强弱指标"""
+        if array:
+            return rsi_array(self.close, n)
+
+        rsi = self.rsi_indicators.get(n)
+        if not rsi:
+            rsi = WilderRSI(n, self.get_history())
+            self.rsi_indicators[n] = rsi
+        return rsi.value
+
+
+def ema_array(close: np.ndarray, window: int) -> np.ndarray:
+    """整段序列上只起算一次的EMA(与 talib.EMA 在同一数组上的结果一致)，前 window-1 个位置为nan"""
+    close = np.asarray(close, dtype=np.float64)
+    result = np.full(len(close), np.nan)
+    if len(close) < window:
+        return result
+
+    seed = sum(close[:window].tolist()) / window
+    series = pd.Series(np.concatenate([[seed], close[window:]]))
+    result[window - 1:] = series.ewm(alpha=2 / (window + 1), adjust=False).mean().to_numpy()
+    return result
+
+
+def rsi_array(close: np.ndarray, window: int) -> np.ndarray:
+    """整段序列上只起算一次的Wilder RSI(与 talib.RSI 在同一数组上的结果一致)，前 window 个位置为nan"""
+    close = np.asarray(close, dtype=np.float64)
+    result = np.full(len(close), np.nan)
+    if len(close) <= window:
+        return result
+
+    diff = np.diff(close)
+    gains = np.where(diff > 0, diff, 0.0)
+    losses = np.where(diff < 0, -diff, 0.0)
+
+    alpha = 1 / window
+    avg_gain = pd.Series(np.concatenate([[sum(gains[:window].tolist()) / window], gains[window:]]))
+    avg_loss = pd.Series(np.concatenate([[sum(losses[:window].tolist()) / window], losses[window:]]))
+    avg_gain = avg_gain.ewm(alpha=alpha, adjust=False).mean().to_numpy()
+    avg_loss = avg_loss.ewm(alpha=alpha, adjust=False).mean().to_numpy()
+
+    total = avg_gain + avg_loss
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result[window:] = np.where(np.abs(total) > 1e-8, 100 * avg_gain / total, 0.0)
+    return result
+
+
+def windowed_average(inputs: np.ndarray, window: int, decay: float, length: int) -> np.ndarray:
+    """
+    每个位置在最近 length 个输入上重新起算的递推平滑，与 WindowedSmoother 的口径一致
+
+    平滑结果是窗口内输入的固定线性组合，整段序列一次卷积得到；前 length-1 个位置为nan。
+    """
+    inputs = np.asarray(inputs, dtype=np.float64)
+    result = np.full(len(inputs), np.nan)
+    if len(inputs) < length:
+        return result
+
+    m = length - window
+    weights = np.concatenate([
+        np.full(window, decay ** m / window),
+        (1 - decay) * decay ** np.arange(m - 1, -1, -1, dtype=np.float64)
+    ])
+    result[length - 1:] = np.convolve(inputs, weights[::-1], "valid")
+    return result
+
+
+def windowed_rsi_array(close: np.ndarray, window: int, size: int) -> np.ndarray:
+    """
+    每根K线在最近 size 个收盘价上重新起算的RSI，与 IncrementalArrayManager(size).rsi 逐根调用的结果一致
+
+    前 size-1 个位置为nan。
+    """
+    close = np.asarray(close, dtype=np.float64)
+    result = np.full(len(close), np.nan)
+    if len(close) < size:
+        return result
+
+    diff = np.diff(close)
+    decay = (window - 1) / window
+    avg_gain = windowed_average(np.where(diff > 0, diff, 0.0), window, decay, size - 1)
+    avg_loss = windowed_average(np.where(diff < 0, -diff, 0.0), window, decay, size - 1)
+
+    total = avg_gain + avg_loss
+    with np.errstate(divide="ignore", invalid="ignore"):
+        result[1:] = np.where(np.abs(total) > 1e-8, 100 * avg_gain / total, 0.0)
+    result[:size - 1] = np.nan
+    return result
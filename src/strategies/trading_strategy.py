@@ -1,6 +1,5 @@
 import logging
 from datetime import datetime
-from vnpy.trader.utility import ArrayManager
 from vnpy.trader.object import (
     TickData, 
     BarData,
@@ -16,10 +15,13 @@ from vnpy.trader.constant import (
     OrderType
 )
 from vnpy_ctastrategy import (
+    BarGenerator,
     CtaTemplate,
     StopOrder
 )
 from typing import List, Dict, Set
+from src.strategies.indicators import IncrementalArrayManager, is_greater, is_less
+from src.utils.log import get_logger
 
 class HighFrequencyStrategy(CtaTemplate):
     author = "策略作者"
@@ -38,25 +40,24 @@ class HighFrequencyStrategy(CtaTemplate):
     
     parameters = ["fast_window", "slow_window", "rsi_window", "rsi_entry"]
     variables = ["fast_ma0", "slow_ma0", "rsi_value", "pos_price"]
+
+    # 日志配置取本次运行的设置，不从回测检查点恢复
+    checkpoint_excluded = [
+        "logger", "bar_logger", "order_logger", "trade_logger", "log_bar", "log_order", "log_trade"
+    ]
     
     def __init__(self, cta_engine, strategy_name, vt_symbol, setting):
         """策略初始化"""
         super().__init__(cta_engine, strategy_name, vt_symbol, setting)
         
-        # 设置日志
-        self.logger = logging.getLogger(strategy_name)
-        self.logger.setLevel(logging.INFO)
-        
-        # 创建控制台处理器
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(logging.INFO)
-        
-        # 设置日志格式
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(message)s')
-        console_handler.setFormatter(formatter)
-        
-        # 添加处理器
-        self.logger.addHandler(console_handler)
+        # 设置日志，各类别是否输出在初始化时确定，热路径上只判断布尔值
+        self.logger = get_logger("engine")
+        self.bar_logger = get_logger("bar")
+        self.order_logger = get_logger("order")
+        self.trade_logger = get_logger("trade")
+        self.log_bar = self.bar_logger.isEnabledFor(logging.INFO)
+        self.log_order = self.order_logger.isEnabledFor(logging.INFO)
+        self.log_trade = self.trade_logger.isEnabledFor(logging.INFO)
         
         # 参数设置
         self.fast_window = setting.get('fast_window', 5)
@@ -69,17 +70,16 @@ class HighFrequencyStrategy(CtaTemplate):
         self.slow_ma0 = 0.0
         self.rsi_value = 0.0
         
-        # 指标初始化
-        self.am = ArrayManager(100)
+        # 指标初始化，实盘Tick由 bg 合成1分钟K线后推送给 on_bar
+        self.bg = BarGenerator(self.on_bar)
+        self.am = IncrementalArrayManager(100)
         self.active_orders = set()
         
-        self.logger.info("策略初始化完成")
         self.write_log("策略初始化完成")
 
     def write_log(self, msg: str):
         """重写日志方法"""
-        print(msg)  # 直接打印到控制台
-        self.logger.info(msg)  # 同时通过logger记录
+        self.logger.info("%s - %s", self.strategy_name, msg)
 
     def write_debug(self, msg: str):
         """写入调试信息"""
@@ -90,7 +90,7 @@ class HighFrequencyStrategy(CtaTemplate):
         else:
             self.log_file.write(f"[{timestamp}] {msg}\n")
         self.log_file.flush()  # 确保立即写入
-        print(msg)  # 同时打印到控制台
+        self.logger.info("%s", msg)  # 同时写入引擎日志
     
     def on_init(self):
         """策略初始化完成"""
@@ -126,58 +126,65 @@ class HighFrequencyStrategy(CtaTemplate):
         self.rsi_value = rsi_value
 
         # 记录当前状态
-        self.write_log(f"\n=== 当前状态 ===")
-        self.write_log(f"K线时间: {bar.datetime}")
-        self.write_log(f"当前仓位: {self.pos}")
-        self.write_log(f"持仓成本: {self.pos_price}")
+        if self.log_bar:
+            self.bar_logger.info(
+                "\n=== 当前状态 ===\nK线时间: %s\n当前仓位: %s\n持仓成本: %s",
+                bar.datetime, self.pos, self.pos_price
+            )
 
         # 有多头持仓时的平仓逻辑
         if self.pos > 0 and not self.active_orders:
-            if rsi_value > 50 or fast_ma < slow_ma:
-                self.write_log("\n=== 平仓信号触发 ===")
+            if is_greater(rsi_value, 50) or is_less(fast_ma, slow_ma):
+                if self.log_order:
+                    self.order_logger.info("\n=== 平仓信号触发 ===")
                 try:
                     orderids = self.sell(bar.close_price, abs(self.pos))
                     if orderids:
                         self.active_orders.update(orderids)
-                        self.write_log(f"平仓订单发送成功: {orderids}")
+                        if self.log_order:
+                            self.order_logger.info("平仓订单发送成功: %s", orderids)
                 except Exception as e:
                     self.write_log(f"平仓订单发送异常: {str(e)}")
 
         # 无持仓时的开仓逻辑
         elif self.pos == 0 and not self.active_orders:
-            if rsi_value < 50 and fast_ma > slow_ma:
-                self.write_log("\n=== 开仓信号触发 ===")
+            if is_less(rsi_value, self.rsi_entry) and is_greater(fast_ma, slow_ma):
+                if self.log_order:
+                    self.order_logger.info("\n=== 开仓信号触发 ===")
                 try:
                     orderids = self.buy(bar.close_price, 1)
                     if orderids:
                         self.active_orders.update(orderids)
-                        self.write_log(f"开仓订单发送成功: {orderids}")
+                        if self.log_order:
+                            self.order_logger.info("开仓订单发送成功: %s", orderids)
                 except Exception as e:
                     self.write_log(f"开仓订单发送异常: {str(e)}")
 
     def on_order(self, order: OrderData):
         """订单状态更新"""
-        self.write_log(f"\n订单状态变化:")
-        self.write_log(f"订单ID: {order.vt_orderid}")
-        self.write_log(f"订单状态: {order.status}")
-        self.write_log(f"委托价格: {order.price}")
-        self.write_log(f"委托数量: {order.volume}")
-        self.write_log(f"已成交: {order.traded}")
-        self.write_log(f"剩余: {order.volume - order.traded}")
+        if self.log_order:
+            self.order_logger.info(
+                "\n订单状态变化:\n订单ID: %s\n订单状态: %s\n委托价格: %s\n委托数量: %s\n已成交: %s\n剩余: %s",
+                order.vt_orderid, order.status, order.price, order.volume,
+                order.traded, order.volume - order.traded
+            )
         
         if order.vt_orderid in self.active_orders:
             if order.status in [Status.ALLTRADED, Status.CANCELLED, Status.REJECTED]:
                 self.active_orders.remove(order.vt_orderid)
-                self.write_log(f"订单完成，从活动订单中移除: {order.vt_orderid}")
-                self.write_log(f"剩余活动订单: {self.active_orders}")
+                if self.log_order:
+                    self.order_logger.info(
+                        "订单完成，从活动订单中移除: %s\n剩余活动订单: %s",
+                        order.vt_orderid, sorted(self.active_orders)
+                    )
 
     def on_trade(self, trade: TradeData):
         """成交更新"""
-        self.write_log(f"\n=== 成交信息 ===")
-        self.write_log(f"成交时间: {trade.datetime}")
-        self.write_log(f"成交方向: {trade.direction}")
-        self.write_log(f"成交价格: {trade.price}")
-        self.write_log(f"成交数量: {trade.volume}")
+        if self.log_trade:
+            self.trade_logger.info(
+                "\n=== 成交信息 ===\n成交时间: %s\n成交方向: %s\n成交价格: %s\n成交数量: %s",
+                trade.datetime, trade.direction, trade.price, trade.volume
+            )
         
         # 计算交易金额
         trade_value = trade.price * trade.volume
@@ -190,14 +197,11 @@ class HighFrequencyStrategy(CtaTemplate):
         commission = trade_value * self.cta_engine.rate
         
         # 记录交易信息
-        self.write_log(f"\n=== 账户更新 ===")
-        self.write_log(f"交易前仓位: {self.pos}")
-        self.write_log(f"交易金额: {trade_value:.2f}")
-        self.write_log(f"手续费: {commission:.2f}")
-        
-        # 更新后
-        self.write_log(f"当前仓位: {self.pos}")
-        self.write_log(f"持仓成本: {self.pos_price}")
+        if self.log_trade:
+            self.trade_logger.info(
+                "\n=== 账户更新 ===\n交易前仓位: %s\n交易金额: %.2f\n手续费: %.2f\n当前仓位: %s\n持仓成本: %s",
+                self.pos, trade_value, commission, self.pos, self.pos_price
+            )
         
         # 添加资金更新计算
         if trade.direction == Direction.LONG:
@@ -205,13 +209,14 @@ class HighFrequencyStrategy(CtaTemplate):
         else:  # SHORT
             profit = (trade.price - self.pos_price) * trade.volume
             net_value = trade_value - commission
-            self.write_log(f"平仓盈亏: {profit:.2f}")
+            if self.log_trade:
+                self.trade_logger.info("平仓盈亏: %.2f", profit)
         
         # 更新账户余额
         self.cta_engine.capital += net_value
         
-        self.write_log(f"\n=== 账户更新 ===")
-        self.write_log(f"交易金额: {trade_value:.2f}")
-        self.write_log(f"手续费: {commission:.2f}")
-        self.write_log(f"净值变化: {net_value:.2f}")
-        self.write_log(f"当前余额: {self.cta_engine.capital:.2f}")
\ No newline at end of file
+        if self.log_trade:
+            self.trade_logger.info(
+                "\n=== 账户更新 ===\n交易金额: %.2f\n手续费: %.2f\n净值变化: %.2f\n当前余额: %.2f",
+                trade_value, commission, net_value, self.cta_engine.capital
+            )
\ No newline at end of file
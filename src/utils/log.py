@@ -0,0 +1,97 @@
+import atexit
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from pathlib import Path
+from typing import Dict, Optional
+
+LOGGER_NAME = "vnpy_project"
+
+# 日志类别：engine 为引擎/策略一般信息，bar/order/trade 为回测热路径上的逐K线、委托、成交日志，
+# data 为数据下载、同步与导入
+CATEGORIES = ("engine", "bar", "order", "trade", "data")
+HOT_CATEGORIES = ("bar", "order", "trade")
+
+_listener: Optional[QueueListener] = None
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    不在调用线程格式化的队列处理器
+
+    标准 QueueHandler 入队前会先格式化消息；这里直接把日志记录放入队列，
+    由后台线程格式化。因此日志参数应传入数值、字符串等不可变的值。
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def get_logger(category: str) -> logging.Logger:
+    """获取某一类别的日志记录器"""
+    return logging.getLogger(f"{LOGGER_NAME}.{category}")
+
+
+def setup_logging(levels: Dict[str, int] = None, quiet: bool = False,
+                  log_file: Optional[Path] = None, console: bool = True):
+    """
+    配置日志系统
+
+    levels: 各类别的日志级别，如 {"bar": logging.WARNING}，未指定的类别为 INFO
+    quiet: 静默模式，bar/order/trade 类别只输出警告以上的日志
+    log_file: 日志文件路径，为None时不写文件
+    console: 是否输出到控制台
+
+    日志记录经队列交给后台线程写出，调用方只负责入队。
+    """
+    shutdown_logging()
+
+    levels = dict(levels or {})
+    if quiet:
+        for category in HOT_CATEGORIES:
+            levels.setdefault(category, logging.WARNING)
+
+    formatter = logging.Formatter('%(asctime)s - %(message)s', datefmt='%Y-%m-%d %H:%M:%S')
+    handlers = []
+
+    if console:
+        console_handler = logging.StreamHandler(sys.stdout)
+        console_handler.setFormatter(formatter)
+        handlers.append(console_handler)
+
+    if log_file:
+        log_file = Path(log_file)
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+        file_handler = logging.FileHandler(filename=log_file, mode='a', encoding='utf-8')
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+
+    log_queue = queue.SimpleQueue()
+    logger = logging.getLogger(LOGGER_NAME)
+    logger.handlers = [LazyQueueHandler(log_queue)]
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+
+    for category in CATEGORIES:
+        get_logger(category).setLevel(levels.get(category, logging.INFO))
+
+    global _listener
+    _listener = QueueListener(log_queue, *handlers)
+    _listener.start()
+
+
+def shutdown_logging():
+    """停止后台写日志线程，写出队列中剩余的日志"""
+    global _listener
+    if _listener:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,128 @@
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Tuple
+
+# 每个2的幂区间再细分为 2**SUB_BITS 个桶，相对误差约 1/16
+SUB_BITS = 3
+SUB_BUCKETS = 1 << SUB_BITS
+
+
+class LatencyHistogram:
+    """
+    对数分桶的耗时直方图(纳秒)
+
+    只记录各桶计数，内存占用与调用次数无关；分位数取所在桶的中点。
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0
+        self.max = 0
+        self.buckets: Dict[int, int] = {}
+
+    def record(self, ns: int):
+        self.count += 1
+        self.total += ns
+        if ns > self.max:
+            self.max = ns
+
+        if ns < SUB_BUCKETS * 2:
+            index = ns
+        else:
+            shift = ns.bit_length() - SUB_BITS - 1
+            index = (shift << SUB_BITS) + (ns >> shift)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    @staticmethod
+    def bucket_value(index: int) -> float:
+        """桶的中点耗时"""
+        if index < SUB_BUCKETS * 2:
+            return float(index)
+        shift = (index >> SUB_BITS) - 1
+        mantissa = (index & (SUB_BUCKETS - 1)) + SUB_BUCKETS
+        return ((mantissa << shift) + ((mantissa + 1) << shift)) / 2
+
+    def percentile(self, q: float) -> float:
+        """q 分位的耗时(纳秒)，q 取 0~100"""
+        if not self.count:
+            return 0.0
+
+        rank = max(1, int(self.count * q / 100 + 0.5))
+        seen = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= rank:
+                return min(self.bucket_value(index), float(self.max))
+        return float(self.max)
+
+
+class Profiler:
+    """
+    回调与引擎环节的耗时统计
+
+    wrap 在对象实例上安装计时包装(不修改类)，unwrap_all 恢复原方法；
+    未启用时不安装任何包装，没有额外开销。嵌套调用的耗时按包含子调用统计。
+    """
+
+    def __init__(self):
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self.wrapped: List[Tuple[object, str, bool, Callable]] = []
+
+    def get_histogram(self, name: str) -> LatencyHistogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = LatencyHistogram()
+        return histogram
+
+    def wrap(self, obj, method_name: str, name: str = None):
+        """为 obj.method_name 安装计时包装"""
+        original = getattr(obj, method_name)
+        histogram = self.get_histogram(name or method_name)
+        record = histogram.record
+        perf_counter_ns = time.perf_counter_ns
+
+        def wrapper(*args, **kwargs):
+            start = perf_counter_ns()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                record(perf_counter_ns() - start)
+
+        self.wrapped.append((obj, method_name, method_name in vars(obj), original))
+        setattr(obj, method_name, wrapper)
+
+    def unwrap_all(self):
+        """恢复所有被包装的方法"""
+        for obj, method_name, had_attr, original in reversed(self.wrapped):
+            if had_attr:
+                setattr(obj, method_name, original)
+            else:
+                delattr(obj, method_name)
+        self.wrapped.clear()
+
+    @contextmanager
+    def timer(self, name: str):
+        """统计一段代码的耗时"""
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            self.get_histogram(name).record(time.perf_counter_ns() - start)
+
+    def report(self) -> str:
+        """按总耗时排序的统计报告"""
+        lines = [
+            f"{'环节':<28}{'调用次数':>10}{'总耗时(ms)':>12}{'平均(us)':>10}"
+            f"{'p50(us)':>10}{'p99(us)':>10}{'最大(us)':>10}"
+        ]
+        histograms = sorted(self.histograms.items(), key=lambda item: item[1].total, reverse=True)
+        for name, histogram in histograms:
+            if not histogram.count:
+                continue
+            lines.append(
+                f"{name:<30}{histogram.count:>10,}{histogram.total / 1e6:>12.1f}"
+                f"{histogram.total / histogram.count / 1e3:>10.2f}"
+                f"{histogram.percentile(50) / 1e3:>10.2f}{histogram.percentile(99) / 1e3:>10.2f}"
+                f"{histogram.max / 1e3:>10.2f}"
+            )
+        return "\n".join(lines)
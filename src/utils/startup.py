@@ -0,0 +1,73 @@
+import subprocess
+import sys
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence
+
+# 导入较慢、只应由需要它们的子命令加载的第三方包
+HEAVY_PACKAGES = ("PyQt5", "pyqtgraph", "ccxt", "pymongo", "vnpy", "vnpy_ctastrategy", "talib", "pandas")
+
+
+@dataclass
+class ImportReport:
+    """
+    一次冷启动导入的耗时统计(微秒)
+
+    packages: 各顶层包的导入耗时(包内全部模块的自身耗时之和)，从高到低排列
+    """
+
+    modules: List[str]
+    total: int
+    packages: Dict[str, int]
+
+    def loaded(self, package: str) -> bool:
+        return package in self.packages
+
+    def format(self, top: int = 15) -> str:
+        lines = [f"导入 {', '.join(self.modules)} 共 {self.total / 1000:.1f} ms"]
+        for package, cost in list(self.packages.items())[:top]:
+            lines.append(f"  {package:<24}{cost / 1000:>10.1f} ms  {cost / max(self.total, 1):>6.1%}")
+
+        heavy = [package for package in HEAVY_PACKAGES if self.loaded(package)]
+        lines.append(f"已加载的重量级依赖: {', '.join(heavy) if heavy else '无'}")
+        return "\n".join(lines)
+
+
+def parse_importtime(output: str) -> Dict[str, int]:
+    """
+    解析 python -X importtime 的输出
+
+    返回各顶层包的自身耗时之和，以及键为空字符串的总耗时(最外层导入的累计耗时之和)。
+    """
+    packages: Dict[str, int] = {"": 0}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue
+
+        self_us, cumulative_us = int(parts[0]), int(parts[1])
+        name = parts[2].rstrip()
+        module = name.lstrip()
+        package = module.split(".")[0]
+        packages[package] = packages.get(package, 0) + self_us
+        # 输出中嵌套导入比外层多缩进两个空格，最外层只有一个空格
+        if len(name) - len(module) == 1:
+            packages[""] += cumulative_us
+    return packages
+
+
+def measure_imports(modules: Sequence[str], cwd: Optional[str] = None) -> ImportReport:
+    """在新的解释器中导入 modules，统计冷启动的导入耗时"""
+    code = "\n".join(f"import {module}" for module in modules)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=cwd, capture_output=True, text=True
+    )
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "导入失败")
+
+    packages = parse_importtime(result.stderr)
+    total = packages.pop("")
+    packages = dict(sorted(packages.items(), key=lambda item: item[1], reverse=True))
+    return ImportReport(list(modules), total, packages)
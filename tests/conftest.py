@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# 测试直接从仓库根目录导入 src 包
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
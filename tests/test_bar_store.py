@@ -0,0 +1,44 @@
+import numpy as np
+import pandas as pd
+
+from src.data.bar_store import BarStore
+
+
+def make_bars(start: int, end: int) -> pd.DataFrame:
+    datetimes = pd.date_range("2024-01-01", periods=end, freq="1min")[start:]
+    return pd.DataFrame({
+        "datetime": datetimes,
+        "open": 1.0,
+        "high": 2.0,
+        "low": 0.5,
+        "close": np.arange(start, end, dtype=float),
+        "volume": 1.0,
+    })
+
+
+def test_append_merges_and_prefers_new_data(tmp_path):
+    store = BarStore(str(tmp_path))
+    store.append("BTCUSDT", "1m", make_bars(0, 10))
+    update = make_bars(5, 20)
+    update["close"] += 100
+    assert store.append("BTCUSDT", "1m", update) == 20
+
+    data = store.load("BTCUSDT", "1m")
+    np.testing.assert_array_equal(data["close"], np.r_[np.arange(5), np.arange(105, 120)])
+
+
+def test_append_keeps_earlier_views_and_removes_old_files(tmp_path):
+    store = BarStore(str(tmp_path))
+    store.append("BTCUSDT", "1m", make_bars(0, 10))
+    before = store.load("BTCUSDT", "1m")
+
+    store.append("BTCUSDT", "1m", make_bars(10, 20))
+    after = store.load("BTCUSDT", "1m")
+
+    # 之前的视图仍是旧版本的数据
+    np.testing.assert_array_equal(before["close"], np.arange(10))
+    np.testing.assert_array_equal(after["close"], np.arange(20))
+
+    files = sorted(path.name for path in store.get_path("BTCUSDT", "1m").glob("*.npy"))
+    version = store.get_meta("BTCUSDT", "1m")["files"]
+    assert files == sorted(f"{name}.{version}.npy" for name in ("datetime", "open", "high", "low", "close", "volume"))
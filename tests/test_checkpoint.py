@@ -0,0 +1,66 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.backtest.backtest_engine import BacktestEngine
+from src.data.bar_store import BarStore
+from src.data.synthetic import generate_bars
+from src.strategies.trading_strategy import HighFrequencyStrategy
+
+SETTING = {"fast_window": 5, "slow_window": 10, "rsi_window": 6}
+START = datetime(2024, 1, 1)
+# 检查点停在一天中间，续跑时最后一天的每日收盘需要被替换
+MIDDLE = datetime(2024, 1, 4, 13, 7)
+END = datetime(2024, 1, 8)
+
+
+@pytest.fixture
+def make_engine(tmp_path):
+    BarStore(str(tmp_path / "bars")).append("BTCUSDT", "1m", generate_bars(7 * 1440, start=START))
+
+    def make_engine():
+        return BacktestEngine(
+            data_source="store", store_path=str(tmp_path / "bars"), quiet=True, log_to_file=False,
+            cache_path=str(tmp_path / "cache"), gap_index_path=str(tmp_path / "gaps.json"),
+            checkpoint_path=str(tmp_path / "checkpoints")
+        )
+    return make_engine
+
+
+def run(engine, end, stream=False, checkpoint=None):
+    df = engine.run_backtest(HighFrequencyStrategy, SETTING, "BTCUSDT", START, end,
+                             stream=stream, checkpoint=checkpoint)
+    trades = [
+        (trade.datetime, trade.direction, trade.price, trade.volume)
+        for trade in engine.engine.get_all_trades()
+    ]
+    return df, trades
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_resume_matches_full_run(make_engine, stream):
+    full = make_engine()
+    full_df, full_trades = run(full, END, stream)
+
+    run(make_engine(), MIDDLE, stream, checkpoint="test")
+    resumed = make_engine()
+    resumed_df, resumed_trades = run(resumed, END, stream, checkpoint="test")
+
+    assert resumed.checkpoints.get("test").bar_count == 7 * 1440
+    assert resumed_trades == full_trades
+    pd.testing.assert_frame_equal(resumed_df.drop(columns=["trades"]), full_df.drop(columns=["trades"]))
+    pd.testing.assert_series_equal(resumed.calculate_equity(), full.calculate_equity())
+    assert resumed.calculate_performance() == full.calculate_performance()
+    np.testing.assert_array_equal(resumed.get_returns("daily"), full.get_returns("daily"))
+
+
+def test_checkpoint_from_other_mode_is_not_resumed(make_engine):
+    run(make_engine(), MIDDLE, stream=True, checkpoint="test")
+
+    engine = make_engine()
+    key = engine.checkpoint_key(HighFrequencyStrategy, SETTING, "BTCUSDT", START, "1m")
+    assert engine.load_checkpoint("test", key, END, per_bar=False) is not None
+    # 流式回放只保存了每日收盘，不能接上一次加载的逐K线价格
+    assert engine.load_checkpoint("test", key, END, per_bar=True) is None
@@ -0,0 +1,53 @@
+from datetime import datetime
+
+import mongomock
+import pytest
+
+from src.data.data_fetcher import DataFetcher
+from src.data.market_data import get_data_version
+from src.data.synthetic import generate_bars
+
+START = datetime(2024, 1, 1)
+
+
+@pytest.fixture
+def fetcher(tmp_path):
+    fetcher = DataFetcher(exchange=object(), checkpoint_dir=str(tmp_path / "checkpoints"))
+    fetcher.client.close()
+    fetcher.collection = mongomock.MongoClient().crypto_trading.market_data
+    return fetcher
+
+
+def test_save_to_database_is_idempotent(fetcher):
+    df = generate_bars(500, start=START, seed=0)
+
+    counts = fetcher.save_to_database(df, "BTCUSDT", "1m", batch_size=128)
+    assert counts == {"inserted": 500, "updated": 0, "unchanged": 0}
+    assert fetcher.collection.count_documents({"symbol": "BTCUSDT", "interval": "1m"}) == 500
+    assert get_data_version(fetcher.collection, "BTCUSDT", "1m") == 1
+
+    counts = fetcher.save_to_database(df, "BTCUSDT", "1m", batch_size=128)
+    assert counts == {"inserted": 0, "updated": 0, "unchanged": 500}
+    assert get_data_version(fetcher.collection, "BTCUSDT", "1m") == 1
+
+    changed = df.copy()
+    changed.loc[42, "close"] += 1.0
+    counts = fetcher.save_to_database(changed, "BTCUSDT", "1m", batch_size=128)
+    assert counts == {"inserted": 0, "updated": 1, "unchanged": 499}
+    assert fetcher.collection.count_documents({}) == 500
+    assert get_data_version(fetcher.collection, "BTCUSDT", "1m") == 2
+
+    doc = fetcher.collection.find_one({"datetime": changed.loc[42, "datetime"].to_pydatetime()})
+    assert doc["close"] == changed.loc[42, "close"]
+
+
+def test_save_to_database_versions_are_per_series(fetcher):
+    df = generate_bars(10, start=START, seed=0)
+
+    fetcher.save_to_database(df, "BTCUSDT", "1m")
+    fetcher.save_to_database(df, "ETHUSDT", "1m")
+    fetcher.save_to_database(df.iloc[:5], "BTCUSDT", "1m")
+
+    assert get_data_version(fetcher.collection, "BTCUSDT", "1m") == 1
+    assert get_data_version(fetcher.collection, "ETHUSDT", "1m") == 1
+    assert get_data_version(fetcher.collection, "BTCUSDT", "5m") == 0
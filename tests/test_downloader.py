@@ -0,0 +1,52 @@
+import numpy as np
+import pytest
+
+from src.data.data_fetcher import DataFetcher
+
+STEP = 60_000
+
+
+class FakeExchange:
+    """按 ccxt 的 fetch_ohlcv 返回确定性K线，可在第 fail_at 次请求时失败"""
+
+    def __init__(self, fail_at: int = None):
+        self.fail_at = fail_at
+        self.calls = []
+
+    def load_markets(self):
+        return {}
+
+    def fetch_ohlcv(self, symbol, timeframe, since, limit):
+        self.calls.append(since)
+        if self.fail_at is not None and len(self.calls) == self.fail_at:
+            raise RuntimeError("连接中断")
+
+        start = -(-since // STEP) * STEP
+        timestamps = np.arange(start, start + limit * STEP, STEP)
+        return [[int(t), t / STEP, t / STEP + 2, t / STEP - 1, t / STEP + 1, 1.0] for t in timestamps]
+
+
+def make_fetcher(exchange, tmp_path):
+    return DataFetcher(exchange=exchange, checkpoint_dir=str(tmp_path / "checkpoints"),
+                       max_workers=1, rate_limit=1000)
+
+
+def test_resume_downloads_only_missing_windows(tmp_path):
+    start, end = "2024-01-01", "2024-01-04"
+    expected = make_fetcher(FakeExchange(), tmp_path).fetch_history("BTCUSDT", "1m", start, end)
+    assert len(expected) == 3 * 1440
+
+    # 共5个窗口，第一次下载在第3个窗口中断，前两个窗口已保存检查点
+    with pytest.raises(RuntimeError):
+        make_fetcher(FakeExchange(fail_at=3), tmp_path).fetch_history("BTCUSDT", "1m", start, end)
+    # 失败时正在运行的后续窗口也会完成并保存
+    saved = len(list((tmp_path / "checkpoints").rglob("*.npy")))
+    assert 2 <= saved < 5
+
+    exchange = FakeExchange()
+    resumed = make_fetcher(exchange, tmp_path).fetch_history("BTCUSDT", "1m", start, end)
+    assert len(exchange.calls) == 5 - saved
+    assert resumed.equals(expected)
+
+    # 下载完成后删除检查点
+    assert not list((tmp_path / "checkpoints").rglob("*.npy"))
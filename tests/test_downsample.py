@@ -0,0 +1,64 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from src.gui.downsample import SeriesBuffer, minmax_downsample, visible_slice
+
+
+def test_minmax_downsample_keeps_extremes():
+    rng = np.random.default_rng(5)
+    x = np.arange(100_000, dtype=np.float64)
+    y = rng.normal(size=len(x)).cumsum()
+    y[12_345] = 1e6
+
+    dx, dy = minmax_downsample(x, y, 500)
+    assert len(dx) <= 1002
+    assert np.all(np.diff(dx) > 0)
+    assert dy.max() == y.max() and dy.min() == y.min()
+    assert dx[0] == x[0] and dx[-1] == x[-1]
+
+
+def test_visible_slice_extends_past_edges():
+    x = np.arange(10, dtype=np.float64)
+    assert visible_slice(x, 3.5, 6.5) == slice(3, 8)
+    assert visible_slice(x, -5, 50) == slice(0, 10)
+
+
+def test_series_buffer_keeps_old_views():
+    buffer = SeriesBuffer(capacity=2)
+    buffer.append([1, 2], [10, 20])
+    view = buffer.x
+    buffer.append([3, 4, 5], [30, 40, 50])
+
+    np.testing.assert_array_equal(view, [1, 2])
+    np.testing.assert_array_equal(buffer.y, [10, 20, 30, 40, 50])
+
+
+def test_main_window_plots_downsampled_series():
+    from PyQt5.QtCore import QThreadPool
+    from PyQt5.QtWidgets import QApplication
+    from src.gui.main_window import MainWindow
+
+    app = QApplication.instance() or QApplication([])
+    window = MainWindow()
+
+    n = 200_000
+    data = pd.DataFrame({
+        "datetime": pd.date_range("2024-01-01", periods=n, freq="1min"),
+        "close": np.sin(np.arange(n) / 500.0),
+    })
+    window.update_price_chart(data)
+    series = window.price_series
+
+    # 跳过延迟计时器，直接提交降采样任务并等待结果回到GUI线程
+    series.refresh()
+    QThreadPool.globalInstance().waitForDone()
+    app.processEvents()
+
+    x, y = series.curve.getData()
+    assert 0 < len(x) < n
+    assert y.max() == data["close"].max() and y.min() == data["close"].min()
+    window.close()
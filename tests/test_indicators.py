@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+from vnpy.trader.constant import Exchange, Interval
+from vnpy.trader.object import BarData
+from vnpy.trader.utility import ArrayManager
+
+from src.strategies.indicators import IncrementalArrayManager, windowed_rsi_array
+
+
+def make_bars(count: int = 3000, seed: int = 1):
+    rng = np.random.default_rng(seed)
+    close = 30_000 + np.cumsum(rng.normal(0, 20, count))
+    start = datetime(2024, 1, 1)
+    return [
+        BarData(
+            symbol="BTCUSDT", exchange=Exchange.LOCAL, datetime=start + timedelta(minutes=i),
+            interval=Interval.MINUTE, gateway_name="test",
+            open_price=price, high_price=price + 5, low_price=price - 5, close_price=price, volume=1.0
+        )
+        for i, price in enumerate(close)
+    ]
+
+
+@pytest.fixture(scope="module")
+def bars():
+    return make_bars()
+
+
+@pytest.mark.parametrize("indicator, windows", [
+    ("rsi", (6, 14, 24, 99)),
+    ("ema", (5, 20, 50, 100)),
+    ("sma", (5, 10, 100)),
+])
+def test_incremental_matches_array_manager(bars, indicator, windows):
+    expected = ArrayManager(100)
+    actual = IncrementalArrayManager(100)
+
+    for bar in bars:
+        expected.update_bar(bar)
+        actual.update_bar(bar)
+        assert actual.inited == expected.inited
+        if not expected.inited:
+            continue
+
+        for window in windows:
+            assert getattr(actual, indicator)(window) == pytest.approx(
+                getattr(expected, indicator)(window), rel=1e-12, abs=1e-9
+            )
+
+
+@pytest.mark.parametrize("window", [6, 14, 24])
+def test_windowed_rsi_array_matches_array_manager(bars, window):
+    manager = ArrayManager(100)
+    expected = []
+    for bar in bars:
+        manager.update_bar(bar)
+        expected.append(manager.rsi(window) if manager.inited else np.nan)
+
+    close = np.array([bar.close_price for bar in bars])
+    np.testing.assert_allclose(windowed_rsi_array(close, window, 100), expected, rtol=0, atol=1e-9)
@@ -0,0 +1,63 @@
+import logging
+import threading
+
+from src.utils.log import get_logger, setup_logging, shutdown_logging
+
+
+class Probe:
+    """记录被格式化的次数和所在线程"""
+
+    def __init__(self):
+        self.threads = []
+
+    def __str__(self):
+        self.threads.append(threading.current_thread())
+        return "probe"
+
+
+def test_gated_categories_skip_formatting(tmp_path):
+    log_file = tmp_path / "test.log"
+    setup_logging({"engine": logging.INFO}, quiet=True, log_file=log_file, console=False)
+    gated, enabled = Probe(), Probe()
+    try:
+        get_logger("bar").info("%s", gated)
+        get_logger("order").info("%s", gated)
+        get_logger("engine").info("%s", enabled)
+    finally:
+        shutdown_logging()
+
+    assert gated.threads == []
+    # 启用的类别在后台线程格式化，调用线程只负责入队
+    assert len(enabled.threads) == 1
+    assert enabled.threads[0] is not threading.current_thread()
+    assert log_file.read_text(encoding="utf-8").strip().endswith("probe")
+
+
+def test_shutdown_flushes_queued_records(tmp_path):
+    log_file = tmp_path / "test.log"
+    setup_logging(log_file=log_file, console=False)
+    try:
+        logger = get_logger("trade")
+        for i in range(5000):
+            logger.info("成交 %d", i)
+    finally:
+        shutdown_logging()
+
+    lines = log_file.read_text(encoding="utf-8").splitlines()
+    assert len(lines) == 5000
+    assert lines[-1].endswith("成交 4999")
+
+
+def test_exception_text_is_captured_before_queueing(tmp_path):
+    log_file = tmp_path / "test.log"
+    setup_logging(log_file=log_file, console=False)
+    try:
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            get_logger("data").exception("下载失败")
+    finally:
+        shutdown_logging()
+
+    text = log_file.read_text(encoding="utf-8")
+    assert "下载失败" in text and "ValueError: boom" in text
@@ -0,0 +1,42 @@
+import json
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from src.data.bar_store import BarStore
+from src.data.synthetic import generate_bars
+
+ROOT = Path(__file__).resolve().parents[1]
+
+# 在新的解释器中运行子命令，结束后报告加载了哪些重量级依赖
+SCRIPT = """
+import json, sys
+sys.path.insert(0, {root!r})
+import main
+code = main.main({argv!r})
+heavy = ("PyQt5", "ccxt", "pymongo")
+print(json.dumps({{"code": code, "loaded": [name for name in heavy if name in sys.modules]}}))
+"""
+
+
+def run_command(argv, cwd):
+    result = subprocess.run(
+        [sys.executable, "-c", SCRIPT.format(root=str(ROOT), argv=argv)],
+        cwd=cwd, capture_output=True, text=True, timeout=120
+    )
+    assert result.returncode == 0, result.stderr
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def test_backtest_from_store_skips_gui_exchange_and_mongo(tmp_path):
+    BarStore(str(tmp_path / "bars")).append("BTCUSDT", "1m", generate_bars(1440, start=datetime(2024, 1, 1)))
+
+    report = run_command(
+        ["backtest", "--source", "store", "--store", str(tmp_path / "bars"), "--quiet",
+         "--start", "2024-01-01", "--end", "2024-01-02"],
+        tmp_path
+    )
+
+    assert report == {"code": 0, "loaded": []}
+
@@ -0,0 +1,133 @@
+from datetime import datetime, timedelta
+
+import bson
+import mongomock
+import numpy as np
+import pytest
+
+from src.data.bar_store import to_timestamp
+from src.data.mongo_reader import BAR_FIELDS, MongoBarReader, RecordLayout
+
+BASE = datetime(2024, 1, 1)
+
+
+def make_docs(n: int, start: datetime = BASE, symbol: str = "BTCUSDT"):
+    return [
+        {
+            "symbol": symbol, "interval": "1m", "datetime": start + timedelta(minutes=i),
+            "open": 100.0 + i, "high": 101.0 + i, "low": 99.0 + i, "close": 100.5 + i, "volume": float(i),
+        }
+        for i in range(n)
+    ]
+
+
+class RawCursor:
+    """按 pymongo 的 find_raw_batches 返回拼接好的原始BSON批次"""
+
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self.size = 0
+
+    def sort(self, sort):
+        self.cursor = self.cursor.sort(sort)
+        return self
+
+    def batch_size(self, size):
+        self.size = size
+        return self
+
+    def limit(self, limit):
+        self.cursor = self.cursor.limit(limit)
+        return self
+
+    def hint(self, hint):
+        return self
+
+    def __iter__(self):
+        docs = [bson.encode(doc) for doc in self.cursor]
+        size = self.size or len(docs) or 1
+        for i in range(0, len(docs), size):
+            yield b"".join(docs[i:i + size])
+
+
+class RawCollection:
+    """在 mongomock 集合上补充 find_raw_batches"""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def find_raw_batches(self, query, projection):
+        return RawCursor(self.collection.find(query, projection))
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+
+@pytest.fixture
+def collection():
+    collection = mongomock.MongoClient().db.market_data
+    collection.insert_many(make_docs(20))
+    collection.insert_many(make_docs(5, symbol="ETHUSDT"))
+    return collection
+
+
+@pytest.mark.parametrize("raw", [False, True])
+@pytest.mark.parametrize("minutes", [1, 7, 11, 19, 20, 30])
+def test_split_read_matches_single_read(collection, raw, minutes):
+    if raw:
+        collection = RawCollection(collection)
+    end = BASE + timedelta(minutes=minutes)
+    expected = MongoBarReader(collection).read("BTCUSDT", "1m", BASE, end)
+    assert len(expected["datetime"]) == min(minutes, 20)
+
+    for min_part_rows in (1, 2, 3):
+        reader = MongoBarReader(collection, batch_size=4, min_part_rows=min_part_rows, max_workers=3)
+        data = reader.read("BTCUSDT", "1m", BASE, end)
+        for name in BAR_FIELDS:
+            np.testing.assert_array_equal(data[name], expected[name])
+
+
+def test_read_values_and_partial_start(collection):
+    start = BASE + timedelta(minutes=3, seconds=30)
+    data = MongoBarReader(collection, min_part_rows=2).read("BTCUSDT", "1m", start, BASE + timedelta(minutes=9))
+
+    np.testing.assert_array_equal(
+        data["datetime"], [to_timestamp(BASE + timedelta(minutes=i)) for i in range(4, 9)]
+    )
+    np.testing.assert_array_equal(data["close"], 100.5 + np.arange(4, 9))
+
+
+def test_record_layout_decodes_fixed_documents():
+    columns = ("datetime", "close", "volume")
+    docs = [{name: doc[name] for name in columns} for doc in make_docs(5)]
+    raw = b"".join(bson.encode(doc) for doc in docs)
+
+    layout = RecordLayout.parse(raw, columns)
+    assert layout is not None and layout.matches(raw)
+    data = layout.decode(raw)
+    np.testing.assert_array_equal(data["datetime"], [to_timestamp(doc["datetime"]) for doc in docs])
+    np.testing.assert_array_equal(data["close"], [doc["close"] for doc in docs])
+
+    # 缺少字段或含变长字段时无法按定长布局解码
+    assert RecordLayout.parse(raw, columns + ("open",)) is None
+    assert RecordLayout.parse(bson.encode({"symbol": "BTCUSDT", "close": 1.0}), ("close",)) is None
+
+
+def test_decode_falls_back_for_mixed_documents():
+    columns = ("datetime", "close", "volume")
+    docs = [{name: doc[name] for name in columns} for doc in make_docs(4)]
+    # 一条成交量为整数，文档类型码不同
+    docs[2]["volume"] = 2
+    raw = b"".join(bson.encode(doc) for doc in docs)
+
+    reader = MongoBarReader(None)
+    data = reader.decode(raw, columns)
+    assert columns not in reader.layouts
+    np.testing.assert_array_equal(data["volume"], [0.0, 1.0, 2.0, 3.0])
+    assert data["volume"].dtype == np.float64
+
+    # 之后布局一致的批次仍按结构化数组解码
+    docs[2]["volume"] = 2.0
+    raw = b"".join(bson.encode(doc) for doc in docs)
+    np.testing.assert_array_equal(reader.decode(raw, columns)["volume"], [0.0, 1.0, 2.0, 3.0])
+    assert columns in reader.layouts
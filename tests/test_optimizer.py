@@ -0,0 +1,60 @@
+from datetime import datetime
+
+import pytest
+
+from src.backtest import optimizer
+from src.backtest.backtest_engine import BacktestEngine
+from src.backtest.optimizer import ParameterOptimizer
+from src.data.bar_store import BarStore
+from src.data.synthetic import generate_bars
+from src.strategies.trading_strategy import HighFrequencyStrategy
+
+START = datetime(2024, 1, 1)
+END = datetime(2024, 1, 4)
+GRID = {"fast_window": [3, 5, 8], "slow_window": [10, 20], "rsi_window": [6, 14]}
+
+
+@pytest.fixture
+def engine(tmp_path):
+    BarStore(str(tmp_path / "bars")).append("BTCUSDT", "1m", generate_bars(3 * 1440, start=START, seed=2))
+    return BacktestEngine(
+        data_source="store", store_path=str(tmp_path / "bars"), quiet=True, log_to_file=False,
+        cache_path=str(tmp_path / "cache"), gap_index_path=str(tmp_path / "gaps.json"),
+        checkpoint_path=str(tmp_path / "checkpoints")
+    )
+
+
+def test_event_and_vectorized_modes_rank_identically(engine):
+    rankings = {
+        mode: engine.run_optimization(
+            HighFrequencyStrategy, GRID, "BTCUSDT", START, END,
+            target="sharpe_ratio", mode=mode, max_workers=2
+        )
+        for mode in ("vectorized", "event")
+    }
+
+    vectorized, event = rankings["vectorized"], rankings["event"]
+    assert len(vectorized) == 12
+    assert [setting for setting, _ in vectorized] == [setting for setting, _ in event]
+    for (_, expected), (_, actual) in zip(vectorized, event):
+        assert actual == expected
+
+
+def test_pool_is_capped_at_number_of_settings(tmp_path, monkeypatch):
+    BarStore(str(tmp_path / "bars")).append("BTCUSDT", "1m", generate_bars(1440, start=START, seed=2))
+    sizes = []
+
+    class RecordingExecutor(optimizer.ProcessPoolExecutor):
+        def __init__(self, max_workers, **kwargs):
+            sizes.append(max_workers)
+            super().__init__(max_workers, **kwargs)
+
+    monkeypatch.setattr(optimizer, "ProcessPoolExecutor", RecordingExecutor)
+    parameter_optimizer = ParameterOptimizer(
+        str(tmp_path / "bars"), "BTCUSDT", START, datetime(2024, 1, 2), max_workers=64
+    )
+
+    results = list(parameter_optimizer.run_settings([{"fast_window": 5, "slow_window": 10}]))
+
+    assert sizes == [1]
+    assert len(results) == 1
@@ -0,0 +1,109 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+from vnpy.trader.constant import Direction
+
+from src.backtest.portfolio import PortfolioBacktester
+from src.backtest.statistics import BacktestStatistics
+from src.data.bar_store import BarStore
+from src.data.synthetic import generate_bars
+from src.risk_management.risk_manager import RiskManager
+
+SYMBOLS = ["BTCUSDT", "ETHUSDT", "SOLUSDT"]
+SETTING = {"fast_window": 5, "slow_window": 10, "rsi_window": 6}
+START = datetime(2024, 1, 1)
+END = datetime(2024, 1, 4)
+CAPITAL = 1_000_000
+RATE = 0.001
+
+
+class CountingRiskManager(RiskManager):
+    """记录被拒绝的开仓委托数"""
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.buy_rejections = 0
+
+    def check_order(self, symbol, price, volume, direction):
+        passed = super().check_order(symbol, price, volume, direction)
+        if direction == "buy" and not passed:
+            self.buy_rejections += 1
+        return passed
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    store = BarStore(str(tmp_path / "bars"))
+    for seed, symbol in enumerate(SYMBOLS):
+        bars = generate_bars(3 * 1440, start=START, seed=seed, price=1000.0 * (seed + 1))
+        # 各品种的K线不完全重合
+        store.append(symbol, "1m", bars.iloc[seed * 7:])
+    return str(tmp_path / "bars")
+
+
+def run(store_path, config, symbols=SYMBOLS):
+    risk_manager = CountingRiskManager(config)
+    backtester = PortfolioBacktester(store_path, symbols, SETTING, risk_manager,
+                                     capital=CAPITAL, rate=RATE, max_workers=2)
+    return backtester.run(START, END), risk_manager
+
+
+def expected_equity(store_path, result):
+    """逐时间点独立计算：现金加各品种持仓按最近收盘价估值"""
+    grid = result.equity.index
+    trades = result.trades
+    signed = np.where(trades["direction"] == Direction.LONG, trades["volume"], -trades["volume"])
+    cash_flow = -signed * trades["price"] - trades["volume"] * trades["price"] * RATE
+    cash = CAPITAL + pd.Series(cash_flow.to_numpy(), index=trades["datetime"]).groupby(level=0).sum() \
+        .reindex(grid, fill_value=0).cumsum()
+
+    equity = cash.copy()
+    store = BarStore(store_path)
+    for symbol in SYMBOLS:
+        data = store.load(symbol, "1m")
+        close = pd.Series(data["close"], index=pd.to_datetime(data["datetime"])).reindex(grid).ffill().fillna(0)
+        mask = (trades["symbol"] == symbol).to_numpy()
+        pos = pd.Series(signed[mask], index=trades["datetime"][mask]).groupby(level=0).sum() \
+            .reindex(grid, fill_value=0).cumsum()
+        equity += pos * close
+    return cash, equity
+
+
+@pytest.mark.parametrize("config", [
+    # 持仓名额不足时由风控拒绝
+    {"risk_limit": 0.3, "max_positions": 2},
+    # 单笔占用资金比例高，名额未满时也会因可用资金不足被拒绝
+    {"risk_limit": 0.6, "max_positions": 3},
+])
+def test_shared_capital_and_risk_checks(store_path, config):
+    result, risk_manager = run(store_path, config)
+    trades = result.trades
+
+    assert len(trades) > 20
+    assert set(trades["symbol"]) == set(SYMBOLS)
+    # 堆按时间合并各品种事件，成交按时间顺序
+    assert trades["datetime"].is_monotonic_increasing
+
+    # 同时持仓的品种数不超过上限
+    signed = np.where(trades["direction"] == Direction.LONG, 1, -1)
+    assert pd.Series(signed).cumsum().max() <= config["max_positions"]
+
+    assert result.rejected > 0
+    assert result.rejected >= risk_manager.buy_rejections
+    if config["risk_limit"] * config["max_positions"] < 1:
+        assert result.rejected == risk_manager.buy_rejections
+
+    cash, equity = expected_equity(store_path, result)
+    assert cash.min() >= 0
+    np.testing.assert_allclose(result.equity.to_numpy(), equity.to_numpy(), rtol=1e-12)
+
+    assert isinstance(result.statistics, BacktestStatistics)
+    assert result.statistics.total_trades == len(trades)
+    assert result.statistics.end_balance == pytest.approx(equity.iloc[-1])
+
+
+def test_empty_symbol_list(store_path):
+    result, _ = run(store_path, {"risk_limit": 0.3, "max_positions": 2}, symbols=[])
+    assert result.trades.empty and result.statistics is None
@@ -0,0 +1,92 @@
+from datetime import datetime
+
+import pytest
+
+from src.backtest.backtest_engine import PROFILED_ENGINE_METHODS, PROFILED_STRATEGY_METHODS, BacktestEngine
+from src.data.bar_store import BarStore
+from src.data.synthetic import generate_bars
+from src.strategies.trading_strategy import HighFrequencyStrategy
+from src.utils.log import CATEGORIES, get_logger
+from src.utils.profiler import LatencyHistogram, Profiler
+
+
+class Callbacks:
+    def on_bar(self, value):
+        return value * 2
+
+
+def test_unwrap_restores_class_methods_and_instance_callbacks():
+    callbacks = Callbacks()
+    callback = callbacks.on_bar
+    callbacks.on_tick = callback
+    profiler = Profiler()
+
+    profiler.wrap(callbacks, "on_bar")
+    profiler.wrap(callbacks, "on_tick", "tick")
+    assert callbacks.on_bar(2) == 4
+    assert callbacks.on_tick(3) == 6
+
+    profiler.unwrap_all()
+
+    # 类上的方法不留下实例属性，实例上原有的回调恢复为同一对象
+    assert "on_bar" not in vars(callbacks)
+    assert callbacks.on_tick is callback
+    assert profiler.histograms["on_bar"].count == 1
+    assert profiler.histograms["tick"].count == 1
+
+
+def test_nested_wraps_unwrap_to_original():
+    callbacks = Callbacks()
+    profiler = Profiler()
+
+    profiler.wrap(callbacks, "on_bar", "outer")
+    profiler.wrap(callbacks, "on_bar", "inner")
+    callbacks.on_bar(1)
+    profiler.unwrap_all()
+
+    assert "on_bar" not in vars(callbacks)
+    assert profiler.histograms["outer"].count == profiler.histograms["inner"].count == 1
+
+
+def test_wrapper_records_calls_that_raise():
+    callbacks = Callbacks()
+    profiler = Profiler()
+    profiler.wrap(callbacks, "on_bar")
+
+    with pytest.raises(TypeError):
+        callbacks.on_bar(None)
+
+    assert profiler.histograms["on_bar"].count == 1
+    profiler.unwrap_all()
+
+
+def test_histogram_percentiles_within_bucket_error():
+    histogram = LatencyHistogram()
+    for ns in range(1, 100_001):
+        histogram.record(ns)
+
+    assert histogram.count == 100_000
+    assert histogram.max == 100_000
+    for q in (50, 90, 99):
+        assert histogram.percentile(q) == pytest.approx(1000 * q, rel=1 / 16)
+
+
+def test_profiled_backtest_leaves_no_wrappers(tmp_path):
+    BarStore(str(tmp_path / "bars")).append("BTCUSDT", "1m", generate_bars(1440, start=datetime(2024, 1, 1)))
+    engine = BacktestEngine(
+        data_source="store", store_path=str(tmp_path / "bars"), quiet=True, log_to_file=False,
+        cache_path=str(tmp_path / "cache"), gap_index_path=str(tmp_path / "gaps.json"),
+        checkpoint_path=str(tmp_path / "checkpoints")
+    )
+    setting = {"fast_window": 5, "slow_window": 10, "rsi_window": 6}
+
+    engine.run_backtest(HighFrequencyStrategy, setting, "BTCUSDT", datetime(2024, 1, 1), datetime(2024, 1, 2),
+                        profile=True)
+
+    assert engine.profiler.histograms["strategy.on_bar"].count > 0
+    assert engine.profiler.histograms["engine.new_bar"].count == 1440
+    assert not {"load_bar_data", "stream_bar_data"} & set(vars(engine))
+    assert not set(PROFILED_ENGINE_METHODS) & set(vars(engine.engine))
+    assert not set(PROFILED_STRATEGY_METHODS) & set(vars(engine.engine.strategy))
+    for category in CATEGORIES:
+        assert "info" not in vars(get_logger(category))
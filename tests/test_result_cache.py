@@ -0,0 +1,114 @@
+import os
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.backtest.backtest_engine import BacktestEngine
+from src.backtest.result_cache import CachedResult, ResultCache, strategy_fingerprint
+from src.backtest.vectorized import VectorizedBacktester
+from src.data.synthetic import generate_bars
+from src.strategies.trading_strategy import HighFrequencyStrategy
+
+
+def make_result(n: int = 10, seed: int = 0) -> CachedResult:
+    rng = np.random.default_rng(seed)
+    trades = pd.DataFrame({
+        "datetime": pd.date_range("2024-01-01", periods=n, freq="1h"),
+        "direction": np.where(np.arange(n) % 2, -1, 1),
+        "price": rng.uniform(40_000, 45_000, n),
+        "volume": np.ones(n),
+    })
+    daily = pd.DataFrame(
+        {"close_price": rng.uniform(40_000, 45_000, 3), "net_pnl": rng.normal(0, 100, 3)},
+        index=pd.Index(pd.date_range("2024-01-01", periods=3).date, name="date")
+    )
+    return CachedResult(trades, daily, {"total_trades": n, "end_balance": 1_000_123.5})
+
+
+def put_aged(cache: ResultCache, keys, seed: int = 0):
+    """写入若干条目，修改时间按写入顺序从旧到新"""
+    now = time.time()
+    for i, key in enumerate(keys):
+        cache.put(key, make_result(seed=seed + i))
+        os.utime(cache.get_path(key), (now - 1000 + i, now - 1000 + i))
+
+
+def test_round_trip(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    result = make_result()
+    cache.put("a", result)
+
+    cached = cache.get("a")
+    pd.testing.assert_frame_equal(cached.trades, result.trades, check_dtype=False)
+    pd.testing.assert_frame_equal(cached.daily, result.daily)
+    assert cached.statistics == result.statistics
+    assert cache.get("missing") is None
+
+
+def test_evicts_least_recently_used_entries(tmp_path):
+    cache = ResultCache(str(tmp_path), max_entries=10)
+    keys = [f"k{i}" for i in range(10)]
+    put_aged(cache, keys)
+
+    # 读取会刷新修改时间，最旧的 k0 变为最近使用
+    assert cache.get("k0") is not None
+    cache.put("k10", make_result())
+
+    # 超过上限后淘汰到上限的90%
+    remaining = {path.stem for path in tmp_path.glob("*.npz")}
+    assert remaining == {"k0", "k3", "k4", "k5", "k6", "k7", "k8", "k9", "k10"}
+    assert cache.count == 9
+
+
+def test_evicts_by_size(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    put_aged(cache, [f"k{i}" for i in range(5)])
+    size = cache.get_path("k0").stat().st_size
+
+    # 新建的实例首次写入时扫描目录，统计已有条目
+    cache = ResultCache(str(tmp_path), max_bytes=int(size * 4.5))
+    cache.put("k5", make_result(seed=5))
+    remaining = sorted(path.stem for path in tmp_path.glob("*.npz"))
+    assert remaining == ["k2", "k3", "k4", "k5"]
+    assert cache.total_bytes == sum(path.stat().st_size for path in tmp_path.glob("*.npz"))
+
+
+def test_engine_reuses_cached_result(tmp_path):
+    def make_engine():
+        return BacktestEngine(
+            data_source="store", store_path=str(tmp_path / "bars"), quiet=True, log_to_file=False,
+            cache_path=str(tmp_path / "cache"), gap_index_path=str(tmp_path / "gaps.json"),
+            checkpoint_path=str(tmp_path / "checkpoints")
+        )
+
+    start, end = datetime(2024, 1, 1), datetime(2024, 1, 3)
+    make_engine().bar_store.append("BTCUSDT", "1m", generate_bars(2 * 1440, start=start))
+    setting = {"fast_window": 5, "slow_window": 10, "rsi_window": 6}
+
+    first = make_engine()
+    first.run_backtest(HighFrequencyStrategy, setting, "BTCUSDT", start, end, cache=True)
+    second = make_engine()
+    second.run_backtest(HighFrequencyStrategy, setting, "BTCUSDT", start, end, cache=True)
+
+    assert second.cached_result is not None
+    assert second.calculate_performance() == first.calculate_performance()
+    assert len(second.engine.get_all_trades()) == len(first.engine.get_all_trades())
+
+
+@pytest.mark.parametrize("code_class", [HighFrequencyStrategy, VectorizedBacktester])
+def test_fingerprint_covers_imported_indicators(monkeypatch, code_class):
+    from src.backtest import result_cache
+
+    original = result_cache.file_fingerprint
+    before = strategy_fingerprint(code_class)
+
+    # 模拟修改指标模块的源文件
+    def file_fingerprint(path):
+        digest = original(path)
+        return digest + "changed" if path.endswith("indicators.py") else digest
+
+    monkeypatch.setattr(result_cache, "file_fingerprint", file_fingerprint)
+    assert strategy_fingerprint(code_class) != before
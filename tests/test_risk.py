@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from src.risk_management.quantile import P2Quantile, StreamingVaR
+from src.risk_management.risk_manager import RiskManager
+
+
+@pytest.mark.parametrize("q", [0.01, 0.05, 0.5, 0.95])
+@pytest.mark.parametrize("distribution", ["normal", "student"])
+def test_p2_quantile_matches_numpy(q, distribution):
+    rng = np.random.default_rng(7)
+    if distribution == "normal":
+        samples = rng.normal(0, 0.01, 50_000)
+    else:
+        samples = rng.standard_t(3, 50_000) * 0.01
+
+    estimator = P2Quantile(q)
+    for value in samples:
+        estimator.update(value)
+
+    assert estimator.value == pytest.approx(np.quantile(samples, q), abs=0.05 * samples.std())
+
+
+def test_p2_quantile_small_samples_interpolate():
+    estimator = P2Quantile(0.25)
+    for value in [3.0, 1.0, 4.0]:
+        estimator.update(value)
+    assert estimator.value == pytest.approx(np.quantile([3.0, 1.0, 4.0], 0.25))
+
+
+def test_streaming_var_and_cvar_match_numpy():
+    rng = np.random.default_rng(11)
+    returns = rng.normal(0, 0.01, 50_000)
+
+    var = StreamingVaR(0.95)
+    for ret in returns:
+        var.update(ret)
+
+    expected_var = np.quantile(returns, 0.05)
+    expected_cvar = returns[returns <= expected_var].mean()
+    assert var.var == pytest.approx(expected_var, abs=0.0005)
+    assert var.cvar == pytest.approx(expected_cvar, abs=0.0005)
+
+
+def test_streaming_cvar_ignores_warmup_samples():
+    var = StreamingVaR(0.95)
+    for ret in [-0.5, 0.01, 0.02, 0.03, 0.04]:
+        var.update(ret)
+    # 初始化阶段没有尾部样本，CVaR 取 VaR
+    assert var.tail_count == 0
+    assert var.cvar == var.var
+
+
+@pytest.mark.parametrize("config", [
+    {"risk_limit": 0.02, "max_positions": 2},
+    {"risk_limit": 0.02, "max_positions": 3, "capital": 100_000},
+    {"risk_limit": 0.5, "max_positions": 1, "capital": 10_000, "var_limit": 0.01},
+])
+def test_check_orders_matches_check_order(config):
+    rng = np.random.default_rng(3)
+    manager = RiskManager(config)
+    manager.update_position("BTCUSDT", 40_000, 0.01, "buy")
+    manager.update_position("ETHUSDT", 2_000, 0.5, "buy")
+    for ret in rng.normal(0, 0.02, 200):
+        manager.update_return(ret)
+
+    symbols = list(rng.choice(["BTCUSDT", "ETHUSDT", "SOLUSDT", "BNBUSDT"], 500))
+    prices = rng.uniform(10, 50_000, 500)
+    volumes = rng.uniform(0.001, 2, 500)
+    directions = list(rng.choice(["buy", "sell"], 500))
+
+    expected = [
+        manager.check_order(symbol, price, volume, direction)
+        for symbol, price, volume, direction in zip(symbols, prices, volumes, directions)
+    ]
+    actual = manager.check_orders(symbols, prices, volumes, directions)
+    np.testing.assert_array_equal(actual, expected)
+    assert 0 < sum(expected) < len(expected) or config.get("var_limit")
@@ -0,0 +1,132 @@
+import math
+
+import numpy as np
+import pytest
+
+from src.backtest.statistics import (
+    NS_PER_DAY,
+    calculate_equity_metrics,
+    calculate_statistics,
+    round_trip_pnl,
+    summarize_statistics,
+)
+
+DAYS = np.arange(5, dtype=np.int64) * NS_PER_DAY
+EQUITY = np.array([100.0, 110.0, 99.0, 105.0, 121.0])
+
+
+def test_equity_metrics_match_hand_computed_values():
+    metrics = calculate_equity_metrics(DAYS, EQUITY, 100)
+
+    returns = [10 / 100, -11 / 110, 6 / 99, 16 / 105]
+    mean = sum(returns) / 4
+    std = math.sqrt(sum((r - mean) ** 2 for r in returns) / 4)
+    downside = math.sqrt((-11 / 110) ** 2 / 4)
+
+    assert metrics["total_bars"] == 5
+    assert metrics["total_days"] == 4
+    assert metrics["end_balance"] == 121
+    assert metrics["total_return"] == pytest.approx(21)
+    assert metrics["annual_return"] == pytest.approx(21 * 365 / 4)
+    assert metrics["sharpe_ratio"] == pytest.approx(mean / std * math.sqrt(365))
+    assert metrics["sortino_ratio"] == pytest.approx(mean / downside * math.sqrt(365))
+    # 110 -> 99 回撤10%，从第1天的高点到第4天创新高，水下最长2天
+    assert metrics["max_drawdown"] == pytest.approx(10)
+    assert metrics["max_drawdown_duration"] == 2
+    assert metrics["calmar_ratio"] == pytest.approx(21 * 365 / 4 / 10)
+
+
+def test_equity_metrics_risk_free_lowers_sharpe():
+    metrics = calculate_equity_metrics(DAYS, EQUITY, 100, risk_free=0.365)
+
+    returns = np.array([10 / 100, -11 / 110, 6 / 99, 16 / 105])
+    excess = returns - 0.001
+    assert metrics["sharpe_ratio"] == pytest.approx(excess.mean() / returns.std() * math.sqrt(365))
+    assert metrics["sharpe_ratio"] < calculate_equity_metrics(DAYS, EQUITY, 100)["sharpe_ratio"]
+
+
+def test_equity_metrics_annualize_by_bar_interval():
+    minutes = np.arange(5, dtype=np.int64) * 60 * 1_000_000_000
+    daily = calculate_equity_metrics(DAYS, EQUITY, 100)
+    minutely = calculate_equity_metrics(minutes, EQUITY, 100)
+
+    assert minutely["sharpe_ratio"] == pytest.approx(daily["sharpe_ratio"] * math.sqrt(1440))
+    assert minutely["max_drawdown_duration"] == pytest.approx(2 / 1440)
+
+
+def test_equity_metrics_flat_equity():
+    metrics = calculate_equity_metrics(DAYS, np.full(5, 100.0), 100)
+
+    assert metrics["sharpe_ratio"] == 0
+    assert metrics["sortino_ratio"] == 0
+    assert metrics["max_drawdown"] == 0
+    assert metrics["max_drawdown_duration"] == 0
+    assert metrics["calmar_ratio"] == 0
+
+
+def test_drawdown_duration_runs_to_end_when_never_recovered():
+    metrics = calculate_equity_metrics(DAYS, np.array([100.0, 120.0, 90.0, 100.0, 110.0]), 100)
+
+    assert metrics["max_drawdown"] == pytest.approx(25)
+    assert metrics["max_drawdown_duration"] == 3
+
+
+def test_round_trip_pnl_splits_when_position_flattens():
+    price = np.array([100.0, 110.0, 120.0, 100.0, 90.0, 95.0])
+    volume = np.array([2.0, -1.0, -1.0, 1.0, -1.0, 1.0])
+
+    pnl = round_trip_pnl(price, volume, rate=0.001)
+
+    # 第一笔: 买2卖1卖1；第二笔: 买1卖1；最后一笔开仓未平，不计入
+    np.testing.assert_allclose(pnl, [30 - 430 * 0.001, -10 - 190 * 0.001])
+
+
+def test_round_trip_pnl_includes_size_and_slippage():
+    pnl = round_trip_pnl(np.array([100.0, 110.0]), np.array([1.0, -1.0]), rate=0.001, size=10, slippage=0.5)
+
+    np.testing.assert_allclose(pnl, [100 - 2100 * 0.001 - 2 * 10 * 0.5])
+
+
+def test_round_trip_pnl_without_closed_trades():
+    assert len(round_trip_pnl(np.array([100.0]), np.array([1.0]), rate=0.001)) == 0
+    assert len(round_trip_pnl(np.empty(0), np.empty(0), rate=0.001)) == 0
+
+
+@pytest.mark.parametrize("pnl, win_rate, profit_factor", [
+    ([30.0, -10.0, 20.0, -15.0], 50, 50 / 25),
+    ([30.0, 20.0], 100, float("inf")),
+    ([-30.0, -20.0], 0, 0),
+    ([], 0, 0),
+])
+def test_summarize_win_rate_and_profit_factor(pnl, win_rate, profit_factor):
+    statistics = summarize_statistics(DAYS, EQUITY, 100, np.array(pnl), 2 * len(pnl), 500)
+
+    assert statistics.round_trips == len(pnl)
+    assert statistics.total_trades == 2 * len(pnl)
+    assert statistics.win_rate == pytest.approx(win_rate)
+    assert statistics.profit_factor == pytest.approx(profit_factor)
+    assert statistics.turnover == 5
+
+
+def test_calculate_statistics_end_to_end():
+    close = np.array([100.0, 105.0, 110.0, 108.0, 112.0])
+    statistics = calculate_statistics(
+        DAYS, close,
+        trade_index=np.array([0, 2, 3]),
+        trade_price=np.array([100.0, 110.0, 108.0]),
+        trade_volume=np.array([1.0, -1.0, 1.0]),
+        capital=1000, rate=0.001
+    )
+
+    # 第0根买入、第2根卖出，第3根重新买入持有到最后
+    fee = (100 + 110 + 108) * 0.001
+    assert statistics.end_balance == pytest.approx(1000 + 10 + 4 - fee)
+    assert statistics.total_trades == 3
+    assert statistics.round_trips == 1
+    assert statistics.win_rate == 100
+    assert statistics.profit_factor == float("inf")
+    assert statistics.turnover == pytest.approx(318 / 1000)
+
+
+def test_calculate_statistics_needs_two_bars():
+    assert calculate_statistics(DAYS[:1], np.array([100.0]), [], [], [], 1000, 0.001) is None
@@ -0,0 +1,133 @@
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from src.backtest.backtest_engine import BacktestEngine
+from src.data.bar_store import BarStore, to_timestamp
+from src.data.resample import resample_bars
+from src.data.stream import prefetch
+from src.data.synthetic import generate_bars
+from src.strategies.trading_strategy import HighFrequencyStrategy
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = BacktestEngine(
+        data_source="mongo", store_path=str(tmp_path / "bars"), quiet=True, log_to_file=False,
+        cache_path=str(tmp_path / "cache"), gap_index_path=str(tmp_path / "gaps.json"),
+        checkpoint_path=str(tmp_path / "checkpoints")
+    )
+    data = BarStore.dataframe_to_columns(generate_bars(3000, start=datetime(2024, 1, 1)))
+
+    def load_mongo_columns(symbol, start, end, batch_size=50_000):
+        timestamps = data["datetime"]
+        left = np.searchsorted(timestamps, to_timestamp(start))
+        right = np.searchsorted(timestamps, to_timestamp(end))
+        return {name: array[left:right] for name, array in data.items()}
+
+    # 以内存中的1分钟K线代替MongoDB
+    engine.load_mongo_columns = load_mongo_columns
+    engine.data = data
+    return engine
+
+
+@pytest.mark.parametrize("interval", ["5m", "15m", "1h"])
+def test_mongo_chunks_keep_buckets_whole(engine, interval):
+    # 起始时间不在周期边界上，按固定时长切分的窗口会把桶切开
+    start = datetime(2024, 1, 1, 0, 7)
+    end = datetime(2024, 1, 2, 23, 0)
+    chunks = list(engine.iter_bar_chunks("BTCUSDT", start, end, interval, chunk_size=7))
+    assert all(len(chunk) <= 7 for chunk in chunks)
+
+    actual = {name: np.concatenate([chunk.columns[name] for chunk in chunks]) for name in engine.data}
+    data = engine.load_mongo_columns("BTCUSDT", start, end)
+    expected = resample_bars(data, interval)
+    for name, array in expected.items():
+        np.testing.assert_array_equal(actual[name], array, err_msg=name)
+
+
+@pytest.fixture
+def store_engine(tmp_path):
+    bars = generate_bars(3 * 1440, start=datetime(2024, 1, 1), seed=3)
+    BarStore(str(tmp_path / "bars")).append("BTCUSDT", "1m", bars)
+    return BacktestEngine(
+        data_source="store", store_path=str(tmp_path / "bars"), quiet=True, log_to_file=False,
+        cache_path=str(tmp_path / "cache"), gap_index_path=str(tmp_path / "gaps.json"),
+        checkpoint_path=str(tmp_path / "checkpoints")
+    )
+
+
+def trade_tuples(engine):
+    return [
+        (trade.datetime, trade.direction, trade.price, trade.volume)
+        for trade in engine.engine.get_all_trades()
+    ]
+
+
+def test_streamed_replay_matches_loaded_replay(store_engine):
+    setting = {"fast_window": 5, "slow_window": 10, "rsi_window": 6}
+    start, end = datetime(2024, 1, 1), datetime(2024, 1, 4)
+
+    loaded = store_engine.run_backtest(HighFrequencyStrategy, setting, "BTCUSDT", start, end)
+    expected = trade_tuples(store_engine)
+
+    streamed = store_engine.run_backtest(HighFrequencyStrategy, setting, "BTCUSDT", start, end,
+                                         stream=True, chunk_size=500)
+
+    assert len(expected) > 10
+    assert trade_tuples(store_engine) == expected
+    np.testing.assert_allclose(streamed["net_pnl"].to_numpy(), loaded["net_pnl"].to_numpy())
+    # 流式回放不保留逐K线序列，只记录每日收盘
+    assert store_engine.bars is None
+    assert len(store_engine.equity_prices["close"]) == 3
+
+
+def test_prefetch_keeps_at_most_depth_chunks_in_flight():
+    produced = []
+    in_flight = []
+
+    def chunks():
+        for i in range(50):
+            produced.append(i)
+            yield [i] * 10
+
+    consumed = 0
+    for item in prefetch(chunks(), depth=2):
+        in_flight.append(len(produced) - consumed // 10)
+        consumed += 1
+        time.sleep(0.0005)
+
+    assert consumed == 500
+    # 队列中 depth 块，加上生产线程正在入队的一块和消费方正在处理的一块
+    assert max(in_flight) <= 2 + 2
+
+
+def test_prefetch_stops_producer_when_consumer_exits():
+    produced = []
+
+    def chunks():
+        for i in range(1000):
+            produced.append(i)
+            yield [i]
+
+    threads = threading.active_count()
+    iterator = prefetch(chunks(), depth=2)
+    assert next(iterator) == 0
+    iterator.close()
+
+    assert threading.active_count() == threads
+    assert len(produced) <= 5
+
+
+def test_prefetch_reraises_producer_errors():
+    def chunks():
+        yield [1, 2]
+        raise ValueError("读取失败")
+
+    iterator = prefetch(chunks())
+    assert list(zip(range(2), iterator)) == [(0, 1), (1, 2)]
+    with pytest.raises(ValueError, match="读取失败"):
+        next(iterator)
@@ -0,0 +1,71 @@
+from datetime import datetime
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data.bar_store import to_timestamp
+from src.data.sync import IncrementalSync
+from src.data.validator import GapIndex
+
+STEP_MS = 60_000
+START = datetime(2024, 1, 1)
+END = datetime(2024, 1, 1, 1)
+
+
+class FakeDownloader:
+    limit = 1000
+
+    def download(self, symbol, timeframe, start, end):
+        timestamps = np.arange(start, end, STEP_MS)
+        return pd.DataFrame({
+            "timestamp": timestamps,
+            "open": 1.0, "high": 1.0, "low": 1.0, "close": 1.0, "volume": 1.0,
+        })
+
+
+class FailingFetcher:
+    collection = None
+    downloader = FakeDownloader()
+
+    def save_to_database(self, df, symbol, interval):
+        raise RuntimeError("数据库不可用")
+
+
+class SavingFetcher(FailingFetcher):
+    def __init__(self):
+        self.saved = []
+
+    def save_to_database(self, df, symbol, interval):
+        self.saved.append(df)
+        return {"inserted": len(df), "updated": 0, "unchanged": 0}
+
+
+def make_sync(fetcher, tmp_path):
+    gap_index = GapIndex(str(tmp_path / "gaps.json"))
+    start, end = to_timestamp(START), to_timestamp(END)
+    gap_index.update("BTCUSDT", "1m", start, end, [(start, end)])
+
+    sync = IncrementalSync(fetcher, gap_index)
+    sync.get_coverage = lambda *args: np.empty(0, dtype=np.int64)
+    return sync
+
+
+def test_failed_save_keeps_gaps(tmp_path):
+    sync = make_sync(FailingFetcher(), tmp_path)
+    with pytest.raises(RuntimeError):
+        sync.sync("BTCUSDT", "1m", START, END)
+
+    reloaded = GapIndex(str(tmp_path / "gaps.json"))
+    assert reloaded.get_gaps("BTCUSDT", "1m") == [(to_timestamp(START), to_timestamp(END))]
+
+
+def test_successful_save_fills_gaps(tmp_path):
+    fetcher = SavingFetcher()
+    sync = make_sync(fetcher, tmp_path)
+    counts = sync.sync("BTCUSDT", "1m", START, END)
+
+    assert counts["inserted"] == 60
+    reloaded = GapIndex(str(tmp_path / "gaps.json"))
+    assert reloaded.get_gaps("BTCUSDT", "1m") == []
@@ -0,0 +1,68 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.backtest.backtest_engine import BacktestEngine
+from src.data.synthetic import generate_ticks
+from src.data.tick_store import TickStore, aggregate_ticks
+from src.strategies.trading_strategy import HighFrequencyStrategy
+
+
+@pytest.fixture
+def ticks():
+    return generate_ticks(200_000, start=datetime(2024, 1, 1))
+
+
+def assert_ticks_equal(actual, expected):
+    np.testing.assert_array_equal(actual["datetime"], expected["datetime"])
+    for name in ("last_price", "bid_price_1", "ask_price_1", "volume"):
+        np.testing.assert_allclose(actual[name], expected[name], rtol=0, atol=1e-9)
+
+
+def test_round_trip_across_chunks(tmp_path, monkeypatch, ticks):
+    monkeypatch.setattr("src.data.tick_store.CHUNK_TICKS", 30_000)
+    store = TickStore(str(tmp_path))
+    assert store.append("BTCUSDT", ticks.iloc[:120_000]) == 120_000
+    # 与已有数据重叠的部分不重复写入
+    assert store.append("BTCUSDT", ticks.iloc[100_000:]) == 80_000
+
+    expected = TickStore.dataframe_to_columns(ticks)
+    assert_ticks_equal(store.load("BTCUSDT"), expected)
+    assert len(store.get_meta("BTCUSDT")["chunks"]) == 7
+
+    # 按时间范围读取只返回 [start, end) 内的Tick
+    start, end = expected["datetime"][45_678], expected["datetime"][123_456]
+    part = store.load("BTCUSDT", pd.Timestamp(start).to_pydatetime(), pd.Timestamp(end).to_pydatetime())
+    assert_ticks_equal(part, {name: array[45_678:123_456] for name, array in expected.items()})
+
+
+def test_aggregate_ticks_matches_pandas(ticks):
+    bars, starts = aggregate_ticks(TickStore.dataframe_to_columns(ticks), "1m")
+
+    grouped = ticks.set_index("datetime").resample("1min")
+    expected = grouped["last_price"].ohlc().assign(volume=grouped["volume"].sum()).dropna()
+    np.testing.assert_array_equal(bars["datetime"], expected.index.as_unit("ns").asi8)
+    for name in ("open", "high", "low", "close", "volume"):
+        np.testing.assert_allclose(bars[name], expected[name].to_numpy())
+    assert starts[0] == 0 and len(starts) == len(bars["datetime"])
+
+
+def test_tick_backtest_on_stored_ticks(tmp_path, ticks):
+    engine = BacktestEngine(
+        data_source="store", store_path=str(tmp_path / "bars"), quiet=True, log_to_file=False,
+        tick_store_path=str(tmp_path / "ticks"), cache_path=str(tmp_path / "cache"),
+        gap_index_path=str(tmp_path / "gaps.json"), checkpoint_path=str(tmp_path / "checkpoints")
+    )
+    engine.tick_store.append("BTCUSDT", ticks)
+
+    setting = {"fast_window": 5, "slow_window": 10, "rsi_window": 6}
+    df = engine.run_tick_backtest(HighFrequencyStrategy, setting, "BTCUSDT",
+                                  datetime(2024, 1, 1), datetime(2024, 1, 2))
+    trades = engine.engine.get_all_trades()
+    assert df is not None and trades
+
+    # 成交时间为撮合所用Tick的时间，落在K线内部而不是K线起点
+    assert any(trade.datetime.second or trade.datetime.microsecond for trade in trades)
+    assert engine.calculate_performance().total_trades == len(trades)
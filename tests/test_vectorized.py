@@ -0,0 +1,66 @@
+from datetime import datetime
+
+import pytest
+
+from src.backtest.backtest_engine import BacktestEngine
+from src.backtest.vectorized import VectorizedBacktester
+from src.data.bar_store import BarStore
+from src.data.synthetic import generate_bars
+from src.strategies.trading_strategy import HighFrequencyStrategy
+
+START = datetime(2024, 1, 1)
+END = datetime(2024, 1, 15)
+
+
+@pytest.fixture
+def engine(tmp_path):
+    BarStore(str(tmp_path / "bars")).append("BTCUSDT", "1m", generate_bars(14 * 1440, start=START, seed=0))
+    return BacktestEngine(
+        data_source="store", store_path=str(tmp_path / "bars"), quiet=True, log_to_file=False,
+        cache_path=str(tmp_path / "cache"), gap_index_path=str(tmp_path / "gaps.json"),
+        checkpoint_path=str(tmp_path / "checkpoints")
+    )
+
+
+@pytest.mark.parametrize("setting", [
+    {"fast_window": 5, "slow_window": 10, "rsi_window": 6},
+    {"fast_window": 3, "slow_window": 20, "rsi_window": 14},
+    {"fast_window": 5, "slow_window": 10, "rsi_window": 6, "rsi_entry": 30},
+])
+def test_cross_check_matches_event_driven_trades(engine, setting):
+    backtester = VectorizedBacktester(
+        rate=engine.commission_rate, size=engine.contract_multiplier,
+        pricetick=engine.price_tick, capital=engine.init_capital
+    )
+    result = backtester.cross_check(engine, HighFrequencyStrategy, setting, "BTCUSDT", START, END)
+
+    assert len(result.trades) > 10
+    assert result.statistics == engine.calculate_performance()
+
+
+def test_cross_check_reports_mismatch(engine):
+    # 向量化回测换用不同的慢均线窗口，成交必然不一致
+    backtester = VectorizedBacktester()
+    setting = {"fast_window": 5, "slow_window": 10, "rsi_window": 6}
+    original = backtester.run
+
+    def run(data, _):
+        return original(data, dict(setting, slow_window=30))
+
+    backtester.run = run
+    with pytest.raises(AssertionError, match="不一致"):
+        backtester.cross_check(engine, HighFrequencyStrategy, setting, "BTCUSDT", START, END)
+
+
+def test_rsi_entry_threshold_filters_entries(engine):
+    data = engine.load_bar_data("BTCUSDT", START, END)
+    backtester = VectorizedBacktester()
+    setting = {"fast_window": 5, "slow_window": 10, "rsi_window": 6}
+
+    entries = {
+        rsi_entry: backtester.calculate_signals(data.columns["close"], dict(setting, rsi_entry=rsi_entry))["entry"]
+        for rsi_entry in (20, 40, 50)
+    }
+
+    assert entries[20].sum() < entries[40].sum() < entries[50].sum()
+    assert not (entries[20] & ~entries[40]).any()
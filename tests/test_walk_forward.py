@@ -0,0 +1,102 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.backtest.statistics import BacktestStatistics
+from src.backtest.walk_forward import WalkForwardOptimizer, split_folds
+from src.data.bar_store import BarStore
+from src.data.synthetic import generate_bars
+
+START = datetime(2024, 1, 1)
+
+
+def test_split_folds_truncates_last_test_window():
+    folds = split_folds(START, START + timedelta(days=10), train_days=3, test_days=3)
+
+    assert [fold.test_start for fold in folds] == [START + timedelta(days=d) for d in (3, 6, 9)]
+    assert [fold.test_end for fold in folds] == [START + timedelta(days=d) for d in (6, 9, 10)]
+    for fold in folds:
+        assert fold.train_end == fold.test_start
+        assert fold.train_end - fold.train_start == timedelta(days=3)
+
+
+def test_split_folds_custom_step_overlaps_test_windows():
+    folds = split_folds(START, START + timedelta(days=10), train_days=4, test_days=3, step_days=2)
+
+    assert [fold.train_start for fold in folds] == [START + timedelta(days=d) for d in (0, 2, 4)]
+    assert [(fold.test_start, fold.test_end) for fold in folds] == [
+        (START + timedelta(days=4), START + timedelta(days=7)),
+        (START + timedelta(days=6), START + timedelta(days=9)),
+        (START + timedelta(days=8), START + timedelta(days=10)),
+    ]
+
+
+def test_split_folds_empty_when_range_shorter_than_train():
+    assert split_folds(START, START + timedelta(days=3), train_days=3, test_days=1) == []
+
+
+def make_record(fold, returns, pnl, trades):
+    index = pd.date_range(START + timedelta(days=fold), periods=len(returns), freq="1D")
+    return {
+        "fold": fold,
+        "setting": {},
+        "test_return": float((np.prod(1 + np.array(returns)) - 1) * 100),
+        "test_trades": trades,
+        "test_value": 1000.0 * trades,
+        "test_pnl": np.array(pnl, dtype=float),
+        "test_returns": pd.Series(returns, index=index),
+    }
+
+
+def test_stitch_chains_out_of_sample_returns():
+    optimizer = WalkForwardOptimizer("unused", "BTCUSDT", [], engine_setting={"capital": 1000})
+    records = [
+        make_record(0, [0.1, -0.5], [50.0], 2),
+        make_record(2, [0.2, 0.0], [-10.0, 30.0], 4),
+    ]
+
+    result = optimizer.stitch(records)
+
+    expected = 1000 * np.cumprod([1.1, 0.5, 1.2, 1.0])
+    np.testing.assert_allclose(result.equity.to_numpy(), expected)
+    assert list(result.equity.index) == list(pd.date_range(START, periods=4, freq="1D"))
+    assert list(result.folds["fold"]) == [0, 2]
+    assert "test_returns" not in result.folds and "test_pnl" not in result.folds
+
+    statistics = result.statistics
+    assert isinstance(statistics, BacktestStatistics)
+    assert statistics.total_return == pytest.approx((expected[-1] / 1000 - 1) * 100)
+    assert statistics.total_trades == 6
+    assert statistics.win_rate == pytest.approx(2 / 3 * 100)
+    assert statistics.profit_factor == pytest.approx(80 / 10)
+    assert statistics.turnover == pytest.approx(6000 / 1000)
+
+
+def test_stitch_without_out_of_sample_bars():
+    optimizer = WalkForwardOptimizer("unused", "BTCUSDT", [])
+    record = make_record(0, [], [], 0)
+    record["test_returns"] = None
+
+    result = optimizer.stitch([record])
+
+    assert result.statistics is None
+    assert result.equity.empty
+
+
+def test_run_reports_out_of_sample_statistics(tmp_path):
+    BarStore(str(tmp_path / "bars")).append("BTCUSDT", "1m", generate_bars(6 * 1440, start=START, seed=1))
+    optimizer = WalkForwardOptimizer(
+        str(tmp_path / "bars"), "BTCUSDT",
+        [{"fast_window": 5, "slow_window": 10}, {"fast_window": 3, "slow_window": 20}],
+        max_workers=2
+    )
+
+    result = optimizer.run(split_folds(START, START + timedelta(days=6), train_days=2, test_days=2))
+
+    assert list(result.folds["fold"]) == [0, 1]
+    assert result.equity.index.is_monotonic_increasing
+    assert result.equity.index[0] >= pd.Timestamp(START + timedelta(days=2))
+    assert isinstance(result.statistics, BacktestStatistics)
+    assert result.statistics.total_trades == result.folds["test_trades"].sum() > 0